@@ -5,8 +5,6 @@ from django.contrib.auth.models import User
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from django.core.cache import cache
-from django.conf import settings
 
 from utilities.utilities import uuid_str
 
@@ -41,7 +39,6 @@ class Profile(models.Model):
     def create_user_profile(sender, instance, created, **kwargs):
         if created:
             Profile.objects.create(user=instance)
-            cache.delete(settings.TOTAL_USER)
 
     @receiver(post_save, sender=User)
     def save_user_profile(sender, instance, **kwargs):
@@ -1,16 +1,12 @@
-import magic
-
 from django.core.files.storage import default_storage
 from django.conf import settings
-from django.core.files.base import ContentFile
 from django.db.models import Avg, Count
 
+from utilities.utilities import sniff_mime
+
 
 def file_upload_saver(user_slug, file, company_slug):
-    file.seek(0)
-    file_type = settings.KNOWN_EXTENSION.get(magic.from_buffer(file.read(), mime=True))
-    file.seek(0)
-    file_byte = file.read()
+    file_type = settings.KNOWN_EXTENSION.get(sniff_mime(file))
     file_name = file.name.split('.')[0]
     if company_slug:
         url = '{}/{}/{}'.format(
@@ -23,7 +19,6 @@ def file_upload_saver(user_slug, file, company_slug):
             str(user_slug),
             str(file_name) + file_type
         )
-    file = ContentFile(file_byte)
     if default_storage.exists(url):
         default_storage.delete(url)
     file = default_storage.save(url, file)
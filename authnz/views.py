@@ -449,6 +449,7 @@ class MyReviewListView(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         try:
             company_review_list = self.model.objects.filter(creator=request.user)
+            company_review_list = utilities.setup_eager_loading(self.get_serializer_class(), company_review_list, request.user)
             data = self.get_serializer(company_review_list, many=True)
             return responses.SuccessResponse(data.data).send()
         except authnz_exceptions.CustomException as e:
@@ -470,6 +471,7 @@ class MyInterviewListView(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         try:
             interview_list = self.model.objects.filter(creator=request.user)
+            interview_list = utilities.setup_eager_loading(self.get_serializer_class(), interview_list, request.user)
             data = self.get_serializer(interview_list, many=True)
             return responses.SuccessResponse(data.data).send()
         except authnz_exceptions.CustomException as e:
@@ -5,10 +5,17 @@ from django import forms
 from django.utils.safestring import mark_safe
 
 from .models import Company, Industry, Benefit, Province, City, Gallery
+from .statics import recompute_company_statics
+from utilities import caching
 
 
 def approve_company(modeladmin, request, queryset):
+    ids = list(queryset.values_list('id', flat=True))
     queryset.update(approved=True)
+    caching.invalidate_model(Company)  # update() skips save
+    caching.invalidate_rows(Company, ids)
+    # and drop the autocomplete snapshot instead of serving the stale one while it is rebuilt, so that the approved
+    # companies are found right away
     cache.delete(settings.COMPANY_NAME_LIST)
 
 
@@ -16,9 +23,8 @@ approve_company.short_description = 'Approve selected companies and clear compan
 
 
 def update_company_statics(modeladmin, request, queryset):
-    for company in queryset.all():
-        company.handle_company_review_statics()
-        company.handle_company_interview_statics()
+    total, changed = recompute_company_statics(queryset.values_list('id', flat=True))
+    modeladmin.message_user(request, '{} companies recomputed, {} changed'.format(total, changed))
 
 
 update_company_statics.short_description = 'Update company static review & interview'
@@ -69,10 +75,6 @@ class CompanyAdmin(admin.ModelAdmin):
         kwargs['widgets'] = {'description': forms.Textarea}
         return super().get_form(request, obj, **kwargs)
 
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        cache.delete(settings.COMPANY_NAME_LIST)
-
 
 @admin.register(Industry)
 class IndustryAdmin(admin.ModelAdmin):
@@ -92,10 +94,6 @@ class ProvinceAdmin(admin.ModelAdmin):
     fields = ('name', 'latitude', 'longitude', 'supported', 'is_deleted')
     list_display = ('name', 'latitude', 'longitude', 'supported', 'is_deleted')
 
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        cache.delete(settings.CITY_CACHE_LIST)
-
 
 @admin.register(City)
 class CityAdmin(admin.ModelAdmin):
@@ -105,10 +103,6 @@ class CityAdmin(admin.ModelAdmin):
                     'priority')
     search_fields = ('name', 'show_name')
 
-    def save_model(self, request, obj, form, change):
-        super().save_model(request, obj, form, change)
-        cache.delete(settings.CITY_CACHE_LIST)
-
 
 admin.register(Company, CompanyAdmin)
 admin.register(Industry, IndustryAdmin)
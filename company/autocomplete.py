@@ -0,0 +1,122 @@
+"""
+in-process company name autocomplete
+
+every worker keeps a CompanyNameIndex built from the COMPANY_NAME_LIST snapshot in cache,
+COMPANY_NAME_LIST_VERSION tells workers when the snapshot was rebuilt after an invalidation, the snapshot is tagged
+with Company so that saving a company marks it stale
+"""
+import itertools
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from company.models import Company
+from company.search import normalize_search_text
+from utilities import caching
+
+GRAM_SIZE = 3
+
+
+def grams(text, size):
+    return {text[start:start + size] for start in range(len(text) - size + 1)}
+
+
+class CompanyNameIndex:
+    """
+    substring index over normalized name and name_en
+
+    every 1..3 character gram of a name maps to the ranks (positions in the total_review ordered snapshot) of
+    companies having it at a word start or only inside words, so short queries are a lookup and longer ones only
+    check the companies of their rarest gram
+    """
+
+    def __init__(self, companies, version=None):
+        self.companies = companies
+        self.version = version
+        self.texts = [normalize_search_text('{} {}'.format(company['name'], company['name_en']))
+                      for company in companies]
+        self.word_start_postings = defaultdict(list)
+        self.inner_postings = defaultdict(list)
+        for rank, text in enumerate(self.texts):
+            text_grams = {}
+            for start in range(len(text)):
+                word_start = start == 0 or text[start - 1] == ' '
+                for size in range(1, min(GRAM_SIZE, len(text) - start) + 1):
+                    gram = text[start:start + size]
+                    text_grams[gram] = text_grams.get(gram, False) or word_start
+            for gram, word_start in text_grams.items():
+                (self.word_start_postings if word_start else self.inner_postings)[gram].append(rank)
+
+    def match(self, query):
+        """
+        ranks of companies containing query, as (word start matches, other matches)
+        """
+        if len(query) <= GRAM_SIZE:
+            return self.word_start_postings.get(query, []), self.inner_postings.get(query, [])
+        rarest = min(grams(query, GRAM_SIZE), key=lambda gram: len(self.word_start_postings.get(gram, [])) +
+                     len(self.inner_postings.get(gram, [])))
+        candidates = sorted(self.word_start_postings.get(rarest, []) + self.inner_postings.get(rarest, []))
+        matches = [rank for rank in candidates if query in self.texts[rank]]
+        word_start = ' ' + query
+        return ([rank for rank in matches if (' ' + self.texts[rank]).find(word_start) != -1],
+                [rank for rank in matches if (' ' + self.texts[rank]).find(word_start) == -1])
+
+    def search(self, text, start=0, stop=None):
+        """
+        companies containing text, the ones with a word starting with text first, then by total_review
+        :return: (number of matches, matched companies[start:stop])
+        """
+        query = normalize_search_text(text)
+        if not query:
+            return len(self.companies), self.companies[start:stop]
+        word_start_matches, other_matches = self.match(query)
+        ranks = itertools.islice(itertools.chain(word_start_matches, other_matches), start, stop)
+        return len(word_start_matches) + len(other_matches), [self.companies[rank] for rank in ranks]
+
+
+def load_company_names():
+    """
+    approved company names by total_review, stored in cache with a new version
+    """
+    caching.start_fill(settings.COMPANY_NAME_LIST, [caching.model_tag(Company)])
+    companies = list(Company.objects.filter(is_deleted=False, approved=True).order_by('-total_review').
+                     values('name', 'name_en', 'company_slug'))
+    version = uuid.uuid4().hex
+    cache.set_many({settings.COMPANY_NAME_LIST: companies, settings.COMPANY_NAME_LIST_VERSION: version},
+                   timeout=None)
+    caching.finish_fill(settings.COMPANY_NAME_LIST, timeout=None)
+    return companies, version
+
+
+_index = CompanyNameIndex([])
+_checked = 0
+
+
+def get_company_name_index():
+    """
+    index of this worker, checked against the cache version at most every COMPANY_NAME_INDEX_CHECK_INTERVAL
+    """
+    global _index, _checked
+    now = time.monotonic()
+    if _index.version is not None and now - _checked < settings.COMPANY_NAME_INDEX_CHECK_INTERVAL:
+        return _index
+    found = cache.get_many([settings.COMPANY_NAME_LIST_VERSION, caching.fresh_key(settings.COMPANY_NAME_LIST)])
+    version, fresh = found.get(settings.COMPANY_NAME_LIST_VERSION), caching.is_fresh(found, settings.COMPANY_NAME_LIST)
+    if version is None or version != _index.version or not fresh:
+        companies = cache.get(settings.COMPANY_NAME_LIST) if version is not None and fresh else None
+        if companies is None:
+            locked = caching.acquire(settings.COMPANY_NAME_LIST)
+            if not locked and _index.version is not None:
+                _checked = now
+                return _index  # another worker is loading the names, serve the previous ones meanwhile
+            try:
+                companies, version = load_company_names()
+            finally:
+                if locked:
+                    caching.release(settings.COMPANY_NAME_LIST)
+        _index = CompanyNameIndex(companies, version)
+    _checked = now
+    return _index
@@ -0,0 +1,52 @@
+import random
+import string
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from company.autocomplete import CompanyNameIndex
+
+PERSIAN_LETTERS = 'ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی'
+
+
+def random_word(letters):
+    return ''.join(random.choice(letters) for _ in range(random.randint(3, 9)))
+
+
+def linear_filter(companies, name):
+    """
+    name_list filter before the index
+    """
+    name = name.lower()
+    return list(filter(lambda x: name in x['name'].lower() or name in x['name_en'].lower(), companies))
+
+
+class Command(BaseCommand):
+    help = 'Compare company name autocomplete index with the linear filter on synthetic company names'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=20000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        companies = [{'name': '{} {}'.format(random_word(PERSIAN_LETTERS), random_word(PERSIAN_LETTERS)),
+                      'name_en': random_word(string.ascii_lowercase).capitalize(),
+                      'company_slug': 'company-{}'.format(number)} for number in range(options['companies'])]
+        queries = []
+        for _ in range(options['queries']):
+            company = random.choice(companies)
+            text = random.choice([company['name'], company['name_en'].lower()])
+            start = random.randint(0, len(text) - 1)
+            queries.append(text[start:start + random.randint(1, 6)])
+
+        build_time = timeit.timeit(lambda: CompanyNameIndex(companies), number=1)
+        index = CompanyNameIndex(companies)
+        linear_time = timeit.timeit(lambda: [linear_filter(companies, query)[:20] for query in queries], number=1)
+        index_time = timeit.timeit(lambda: [index.search(query, 0, 20) for query in queries], number=1)
+
+        self.stdout.write('{} companies, {} queries, first page of 20'.format(len(companies), len(queries)))
+        self.stdout.write('index build: {:.1f} ms'.format(build_time * 1000))
+        self.stdout.write('linear filter: {:.1f} us/query'.format(linear_time / len(queries) * 1000000))
+        self.stdout.write('index search: {:.1f} us/query'.format(index_time / len(queries) * 1000000))
@@ -0,0 +1,74 @@
+import copy
+import datetime
+import random
+import string
+import timeit
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from company import serializers as company_serializers
+from review import serializers as review_serializers
+
+PERSIAN_LETTERS = 'ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی'
+
+
+def random_text(letters, words):
+    return ' '.join(''.join(random.choice(letters) for _ in range(random.randint(2, 8))) for _ in range(words))
+
+
+def company_row(number):
+    return {
+        'name': random_text(PERSIAN_LETTERS, 2), 'company_slug': 'company-{}'.format(number),
+        'founded': datetime.date(2010, 1, 1) if number % 3 else None, 'logo': '/media/logo/{}.png'.format(number),
+        'city__name': random_text(PERSIAN_LETTERS, 1), 'city__show_name': random_text(PERSIAN_LETTERS, 2),
+        'city__city_slug': 'city-{}'.format(number % 30), 'description': random_text(PERSIAN_LETTERS, 60),
+        'total_review': random.randint(0, 500), 'total_interview': random.randint(0, 200),
+        'salary_min': random.randint(1, 10), 'salary_max': random.randint(10, 40),
+        'over_all_rate': round(random.uniform(1, 5), 1), 'size': 'M', 'has_legal_issue': number % 20 == 0,
+    }
+
+
+def review_row(number):
+    return {
+        'id': number, 'company__name': random_text(PERSIAN_LETTERS, 2),
+        'company__name_en': random_text(string.ascii_lowercase, 2), 'company__company_slug': 'company-{}'.format(number),
+        'company__logo': '/media/logo/{}.png'.format(number), 'title': random_text(PERSIAN_LETTERS, 6),
+        'excerpt': random_text(PERSIAN_LETTERS, 50), 'pending_description': None, 'over_all_rate': random.randint(1, 5),
+        'created': datetime.datetime(2020, 1, 1, 10, 0), 'has_legal_issue': number % 20 == 0, 'approved': True,
+        'creator': number, 'type': 'REVIEW',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare rest framework and fast path serializers of public lists per row'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        companies = [company_row(number) for number in range(options['rows'])]
+        reviews = [review_row(number) for number in range(options['rows'])]
+        cases = [
+            ('company list', companies,
+             lambda rows: company_serializers.PublicCompanyListSerializer(rows, many=True).data,
+             company_serializers.public_company_list),
+            ('home feed', reviews,
+             lambda rows: review_serializers.UserHomeReviewListSerializer(rows, many=True,
+                                                                          context={'request': request}).data,
+             review_serializers.home_review_list),
+        ]
+
+        self.stdout.write('{} rows'.format(options['rows']))
+        for name, rows, serializer, fast in cases:
+            # rest framework serializers change their rows
+            copies = copy.deepcopy(rows)
+            serializer_time = timeit.timeit(lambda: serializer(copies), number=1)
+            fast_time = timeit.timeit(lambda: fast(rows), number=1)
+            self.stdout.write('{}: serializer {:.1f} us/row, fast path {:.1f} us/row'.format(
+                name, serializer_time / len(rows) * 1000000, fast_time / len(rows) * 1000000))
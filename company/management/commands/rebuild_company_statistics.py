@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from company.models import CompanyStatistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild company review and interview statistics from scratch and report rollups that had drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('company_ids', nargs='*', type=int, help='companies to rebuild, all if not set')
+        parser.add_argument('--check', action='store_true', help='only report drifted rollups, do not write')
+
+    def handle(self, *args, **options):
+        company_ids = options['company_ids'] or None
+        computed = CompanyStatistics.compute(company_ids)
+        stored = CompanyStatistics.objects.all() if company_ids is None else \
+            CompanyStatistics.objects.filter(company_id__in=company_ids)
+        stored = {statistics.company_id: statistics for statistics in stored}
+        drifted = 0
+        for company_id, statistics in computed.items():
+            if company_id not in stored:
+                continue
+            changes = ['{} {} -> {}'.format(field, getattr(stored[company_id], field), getattr(statistics, field))
+                       for field in CompanyStatistics.ROLLUP_FIELDS
+                       if not self.same(getattr(stored[company_id], field), getattr(statistics, field))]
+            if changes:
+                drifted += 1
+                self.stdout.write('company {}: {}'.format(company_id, ', '.join(changes)))
+        self.stdout.write('{} companies, {} without rollup, {} drifted'.format(
+            len(computed), len(set(computed) - set(stored)), drifted))
+        if not options['check']:
+            CompanyStatistics.rebuild(company_ids)
+            self.stdout.write(self.style.SUCCESS('rebuilt'))
+
+    @staticmethod
+    def same(stored, computed):
+        if isinstance(stored, float) or isinstance(computed, float):
+            return abs((stored or 0) - (computed or 0)) < 1e-6
+        return stored == computed
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from company.statics import recompute_company_statics
+
+
+class Command(BaseCommand):
+    help = 'Recompute review/interview statics and score of companies in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('company_ids', nargs='*', type=int, help='companies to recompute, all if not set')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total, changed = recompute_company_statics(options['company_ids'] or None, options['batch_size'],
+                                                   self.progress)
+        self.stdout.write(self.style.SUCCESS('{} companies recomputed, {} changed'.format(total, changed)))
+
+    def progress(self, done, total):
+        self.stdout.write('{}/{}'.format(done, total))
@@ -0,0 +1,35 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0010_company_user_generated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_count', models.IntegerField(default=0)),
+                ('recommend_count', models.IntegerField(default=0)),
+                ('over_all_rate_sum', models.FloatField(default=0)),
+                ('salaried_count', models.IntegerField(default=0)),
+                ('salary_sum', models.BigIntegerField(default=0)),
+                ('salary_max', models.IntegerField(null=True)),
+                ('salary_min', models.IntegerField(null=True)),
+                ('work_life_balance_sum', models.IntegerField(default=0)),
+                ('salary_benefit_sum', models.IntegerField(default=0)),
+                ('security_sum', models.IntegerField(default=0)),
+                ('management_sum', models.IntegerField(default=0)),
+                ('culture_sum', models.IntegerField(default=0)),
+                ('salaried_over_all_rate_sum', models.FloatField(default=0)),
+                ('interview_count', models.IntegerField(default=0)),
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='company.Company')),
+            ],
+        ),
+    ]
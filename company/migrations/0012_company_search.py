@@ -0,0 +1,64 @@
+# Generated by Django 2.1.5 on 2026-10-18 12:00
+
+import re
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# copy of company.search.normalize_search_text as it was when the fields were added, so that changes to it do not
+# change what this migration does
+PERSIAN_TRANSLATION = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',
+    'ك': 'ک',
+    'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ؤ': 'و',
+    '\u200c': ' ', '\u200f': None, '\u200e': None, 'ـ': None,
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+DIACRITICS_REGEX = re.compile('[\u064b-\u065f\u0670]')
+SPACES_REGEX = re.compile(r'\s+')
+
+
+def normalize_search_text(text):
+    if not text:
+        return ''
+    text = DIACRITICS_REGEX.sub('', text.translate(PERSIAN_TRANSLATION))
+    return SPACES_REGEX.sub(' ', text).strip().lower()
+
+
+def fill_search_fields(apps, schema_editor):
+    Company = apps.get_model('company', 'Company')
+    for company in Company.objects.only('id', 'name', 'name_en', 'description').iterator():
+        Company.objects.filter(id=company.id).update(
+            search_name=normalize_search_text('{} {}'.format(company.name, company.name_en)),
+            search_description=normalize_search_text(company.description),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0011_companystatistics'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='company',
+            name='search_name',
+            field=models.CharField(blank=True, default='', max_length=201),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='search_description',
+            field=models.CharField(blank=True, default='', max_length=3000),
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+        migrations.RunSQL(
+            'CREATE INDEX company_company_search_name_trgm ON company_company USING gin (search_name gin_trgm_ops);'
+            'CREATE INDEX company_company_search_description_trgm ON company_company '
+            'USING gin (search_description gin_trgm_ops);',
+            'DROP INDEX company_company_search_name_trgm; DROP INDEX company_company_search_description_trgm;',
+        ),
+    ]
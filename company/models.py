@@ -1,10 +1,17 @@
-from django.core.cache import cache
+from collections import namedtuple
+
 from django.contrib.gis.db import models
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Greatest, Least
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.gis.geos import Point
 from location_field.models.spatial import LocationField
 
+from company.search import normalize_search_text
+from utilities import caching
+
 
 class Industry(models.Model):
     name = models.CharField(max_length=100, unique=True, db_index=True)
@@ -25,11 +32,6 @@ class Industry(models.Model):
     def __str__(self):
         return self.name
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        cache.delete(settings.INDUSTRY_LIST)
-
-
 class Benefit(models.Model):
     name = models.CharField(max_length=100, unique=True, db_index=True)
     logo = models.CharField(max_length=200, null=True)
@@ -114,34 +116,50 @@ class Company(models.Model):
     has_panel_moderator = models.BooleanField(default=False)  # 1 point
     is_big_company = models.BooleanField(default=False)  # 1 point
     company_score = models.FloatField(default=0)  # company rate for best company
+    search_name = models.CharField(max_length=201, blank=True, default='')  # normalized name and name_en
+    search_description = models.CharField(max_length=3000, blank=True, default='')  # normalized description
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_has_legal_issue = instance.__dict__.get('has_legal_issue')
+        return instance
+
     def save(self, *args, **kwargs):
-        cache.delete(settings.BEST_COMPANY_LIST)
-        cache.delete(settings.DISCUSSED_COMPANY_LIST)
-        cache.delete(settings.TOTAL_COMPANY)
         self.is_big_company = False if self.size in ['VS', 'S'] else True
+        self.search_name = normalize_search_text('{} {}'.format(self.name, self.name_en))
+        self.search_description = normalize_search_text(self.description)
         self.handle_company_score()
-        for review in self.companyreview_set.all():
-            review.has_legal_issue = self.has_legal_issue
-            review.save()
-        for interview in self.interview_set.all():
-            interview.has_legal_issue = self.has_legal_issue
-            interview.save()
+        legal_issue_changed = not self._state.adding and \
+            self.has_legal_issue != getattr(self, '_loaded_has_legal_issue', None)
         super().save(*args, **kwargs)
+        if legal_issue_changed:
+            self.propagate_legal_issue()
+        self._loaded_has_legal_issue = self.has_legal_issue
+
+    def propagate_legal_issue(self):
+        """
+        copy has_legal_issue to reviews and interviews with one update per table, without their save cascade
+        """
+        for related in [self.companyreview_set, self.interview_set]:
+            if related.exclude(has_legal_issue=self.has_legal_issue).update(has_legal_issue=self.has_legal_issue):
+                caching.invalidate_model(related.model)  # update() skips save
+
+    def get_statistics(self):
+        if self.pk is None:
+            return CompanyStatistics(company=self)
+        return CompanyStatistics.ensure([self.pk])[self.pk]
 
-    def handle_company_score(self):
-        review_count = self.companyreview_set.filter(is_deleted=False, approved=True).count()
-        interview_count = self.interview_set.filter(is_deleted=False, approved=True).count()
-        review_point = (review_count + interview_count)
+    def handle_company_score(self, statistics=None):
+        statistics = statistics or self.get_statistics()
+        review_point = (statistics.review_count + statistics.interview_count)
         review_point = 20 if review_point > 20 else review_point
         review_point /= 4  # max must be 5
         bool_point = (2*self.is_famous) + self.has_panel_moderator + self.is_big_company + (not self.is_cheater)
-        over_all_rate = self.companyreview_set.filter(is_deleted=False, approved=True). \
-            aggregate(models.Avg('over_all_rate'))
-        over_all_rate = over_all_rate['over_all_rate__avg'] if over_all_rate['over_all_rate__avg'] else 0
+        over_all_rate = statistics.over_all_rate_sum / statistics.review_count if statistics.review_count else 0
         self.company_score = round((bool_point + review_point + over_all_rate)/3, 1)
 
     @property
@@ -151,47 +169,212 @@ class Company(models.Model):
     def get_absolute_url(self):
         return '/company/{}'.format(self.company_slug)
 
+    def set_review_statics(self, statistics):
+        salaried_count = statistics.salaried_count
+
+        def salaried_avg(total):
+            return total / salaried_count if salaried_count and total else 0
+
+        recommend_to_friend = round(statistics.recommend_count / statistics.review_count) * 100 \
+            if statistics.review_count else 0
+        self.total_review = statistics.review_count
+        self.salary_avg = round(salaried_avg(statistics.salary_sum)/1000000, 1)
+        self.salary_max = round(statistics.salary_max/1000000, 1) if statistics.salary_max else 0
+        self.salary_min = round(statistics.salary_min/1000000, 1) if statistics.salary_min else 0
+        self.work_life_balance = round(salaried_avg(statistics.work_life_balance_sum), 1)
+        self.salary_benefit = round(salaried_avg(statistics.salary_benefit_sum), 1)
+        self.security = round(salaried_avg(statistics.security_sum), 1)
+        self.management = round(salaried_avg(statistics.management_sum), 1)
+        self.culture = round(salaried_avg(statistics.culture_sum), 1)
+        self.over_all_rate = round(salaried_avg(statistics.salaried_over_all_rate_sum), 1)
+        self.recommend_to_friend = round(recommend_to_friend, 2) if recommend_to_friend else 0
+
     def handle_company_review_statics(self):
-        result_company_review = self.companyreview_set.filter(is_deleted=False, approved=True).exclude(salary=0). \
-            aggregate(models.Avg('salary'), models.Max('salary'), models.Min('salary'),
-                      models.Avg('work_life_balance'), models.Avg('salary_benefit'), models.Avg('security'),
-                      models.Avg('management'), models.Avg('culture'), models.Avg('over_all_rate'))
-        result_list = self.companyreview_set.filter(is_deleted=False, approved=True).values_list('recommend_to_friend')
-        total_result_list = len(result_list)
-        total_result_list_true = len(list(filter(lambda x: x[0], result_list)))
-        temp_data = {
-            'total_review': total_result_list,
-            'salary_avg': result_company_review['salary__avg'],
-            'salary_max': result_company_review['salary__max'],
-            'salary_min': result_company_review['salary__min'],
-            'work_life_balance': result_company_review['work_life_balance__avg'],
-            'salary_benefit': result_company_review['salary_benefit__avg'],
-            'security': result_company_review['security__avg'],
-            'management': result_company_review['management__avg'],
-            'culture': result_company_review['culture__avg'],
-            'over_all_rate': result_company_review['over_all_rate__avg'],
-            'recommend_to_friend': round(total_result_list_true / total_result_list) * 100 if total_result_list else 0,
-        }
-        self.total_review = temp_data['total_review']
-        self.salary_avg = round(temp_data['salary_avg']/1000000, 1) if temp_data['salary_avg'] else 0
-        self.salary_max = round(temp_data['salary_max']/1000000, 1) if temp_data['salary_max'] else 0
-        self.salary_min = round(temp_data['salary_min']/1000000, 1) if temp_data['salary_min'] else 0
-        self.work_life_balance = round(temp_data['work_life_balance'], 1) if temp_data['work_life_balance'] else 0
-        self.salary_benefit = round(temp_data['salary_benefit'], 1) if temp_data['salary_benefit'] else 0
-        self.security = round(temp_data['security'], 1) if temp_data['security'] else 0
-        self.management = round(temp_data['management'], 1) if temp_data['management'] else 0
-        self.culture = round(temp_data['culture'], 1) if temp_data['culture'] else 0
-        self.over_all_rate = round(temp_data['over_all_rate'], 1) if temp_data['over_all_rate'] else 0
-        self.recommend_to_friend = round(temp_data['recommend_to_friend'], 2) if temp_data['recommend_to_friend'] else 0
-        self.handle_company_score()
+        statistics = self.get_statistics()
+        self.set_review_statics(statistics)
+        self.handle_company_score(statistics)
         self.save()
 
     def handle_company_interview_statics(self):
-        self.total_interview = self.interview_set.filter(is_deleted=False, approved=True).count()
-        self.handle_company_score()
+        statistics = self.get_statistics()
+        self.total_interview = statistics.interview_count
+        self.handle_company_score(statistics)
         self.save()
 
 
+APPROVED_REVIEW = Q(companyreview__approved=True, companyreview__is_deleted=False)
+SALARIED_REVIEW = APPROVED_REVIEW & ~Q(companyreview__salary=0)
+RECOMMENDED_REVIEW = APPROVED_REVIEW & Q(companyreview__recommend_to_friend=True)
+APPROVED_INTERVIEW = Q(interview__approved=True, interview__is_deleted=False)
+
+ReviewState = namedtuple('ReviewState', ['company_id', 'salary', 'recommend_to_friend', 'work_life_balance',
+                                         'salary_benefit', 'security', 'management', 'culture', 'over_all_rate'])
+InterviewState = namedtuple('InterviewState', ['company_id'])
+
+
+class CompanyStatistics(models.Model):
+    """
+    running counts and sums of approved reviews and interviews of a company
+
+    kept up to date by CompanyReview and Interview save/delete, one update per change,
+    rebuilt from scratch by manage.py rebuild_company_statistics.
+    rating sums are over reviews with salary, as company rating averages have always been
+    """
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, related_name='statistics')
+    review_count = models.IntegerField(default=0)
+    recommend_count = models.IntegerField(default=0)
+    over_all_rate_sum = models.FloatField(default=0)
+    salaried_count = models.IntegerField(default=0)
+    salary_sum = models.BigIntegerField(default=0)
+    salary_max = models.IntegerField(null=True)
+    salary_min = models.IntegerField(null=True)
+    work_life_balance_sum = models.IntegerField(default=0)
+    salary_benefit_sum = models.IntegerField(default=0)
+    security_sum = models.IntegerField(default=0)
+    management_sum = models.IntegerField(default=0)
+    culture_sum = models.IntegerField(default=0)
+    salaried_over_all_rate_sum = models.FloatField(default=0)
+    interview_count = models.IntegerField(default=0)
+
+    ROLLUP_FIELDS = ['review_count', 'recommend_count', 'over_all_rate_sum', 'salaried_count', 'salary_sum',
+                     'salary_max', 'salary_min', 'work_life_balance_sum', 'salary_benefit_sum', 'security_sum',
+                     'management_sum', 'culture_sum', 'salaried_over_all_rate_sum', 'interview_count']
+
+    def __str__(self):
+        return self.company.name
+
+    @staticmethod
+    def review_state(review):
+        """
+        what a review adds to the rollup of its company, None if it is not counted
+        """
+        if not review.approved or review.is_deleted:
+            return None
+        return ReviewState(review.company_id, review.salary, review.recommend_to_friend, review.work_life_balance,
+                           review.salary_benefit, review.security, review.management, review.culture,
+                           review.over_all_rate)
+
+    @staticmethod
+    def interview_state(interview):
+        if not interview.approved or interview.is_deleted:
+            return None
+        return InterviewState(interview.company_id)
+
+    @classmethod
+    def compute(cls, company_ids=None):
+        """
+        rollups from scratch with one grouped query per table, not saved
+        :return: {company id: CompanyStatistics}
+        """
+        companies = Company.objects.all() if company_ids is None else Company.objects.filter(id__in=company_ids)
+        companies = companies.order_by().values('id')
+        result = {}
+        for row in companies.annotate(
+                review_count=Count('companyreview', filter=APPROVED_REVIEW),
+                recommend_count=Count('companyreview', filter=RECOMMENDED_REVIEW),
+                over_all_rate_sum=Sum('companyreview__over_all_rate', filter=APPROVED_REVIEW),
+                salaried_count=Count('companyreview', filter=SALARIED_REVIEW),
+                salary_sum=Sum('companyreview__salary', filter=SALARIED_REVIEW),
+                salary_max=Max('companyreview__salary', filter=SALARIED_REVIEW),
+                salary_min=Min('companyreview__salary', filter=SALARIED_REVIEW),
+                work_life_balance_sum=Sum('companyreview__work_life_balance', filter=SALARIED_REVIEW),
+                salary_benefit_sum=Sum('companyreview__salary_benefit', filter=SALARIED_REVIEW),
+                security_sum=Sum('companyreview__security', filter=SALARIED_REVIEW),
+                management_sum=Sum('companyreview__management', filter=SALARIED_REVIEW),
+                culture_sum=Sum('companyreview__culture', filter=SALARIED_REVIEW),
+                salaried_over_all_rate_sum=Sum('companyreview__over_all_rate', filter=SALARIED_REVIEW)):
+            company_id = row.pop('id')
+            result[company_id] = cls(company_id=company_id, **{key: value for key, value in row.items()
+                                                               if value is not None})  # sums of no rows are null
+        for row in companies.annotate(interview_count=Count('interview', filter=APPROVED_INTERVIEW)):
+            result[row['id']].interview_count = row['interview_count']
+        return result
+
+    @staticmethod
+    def lock(company_ids=None):
+        """
+        lock the company rows, in id order against deadlocks, so that rollups of a company are rebuilt and changed
+        one transaction at a time, must be called in a transaction
+        """
+        companies = Company.objects.all() if company_ids is None else Company.objects.filter(id__in=company_ids)
+        list(companies.select_for_update().order_by('id').values_list('id', flat=True))
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls, company_ids=None):
+        cls.lock(company_ids)
+        statistics = cls.compute(company_ids)
+        existing = cls.objects.all() if company_ids is None else cls.objects.filter(company_id__in=statistics.keys())
+        existing.delete()
+        cls.objects.bulk_create(statistics.values())
+        return statistics
+
+    @classmethod
+    @transaction.atomic
+    def ensure(cls, company_ids):
+        """
+        lock companies and get their rollups, missing ones are built from scratch, changes to the rollups must be
+        made in the same transaction so that a concurrent rebuild does not overwrite them
+        :return: {company id: CompanyStatistics}
+        """
+        cls.lock(company_ids)
+        statistics = {item.company_id: item for item in cls.objects.filter(company_id__in=company_ids)}
+        missing = set(company_ids) - set(statistics.keys())
+        if missing:
+            statistics.update(cls.rebuild(missing))
+        return statistics
+
+    @classmethod
+    def add_review(cls, state, sign):
+        updates = {
+            'review_count': F('review_count') + sign,
+            'recommend_count': F('recommend_count') + sign * state.recommend_to_friend,
+            'over_all_rate_sum': F('over_all_rate_sum') + sign * state.over_all_rate,
+        }
+        if state.salary != 0:
+            updates.update({
+                'salaried_count': F('salaried_count') + sign,
+                'salary_sum': F('salary_sum') + sign * state.salary,
+                'work_life_balance_sum': F('work_life_balance_sum') + sign * state.work_life_balance,
+                'salary_benefit_sum': F('salary_benefit_sum') + sign * state.salary_benefit,
+                'security_sum': F('security_sum') + sign * state.security,
+                'management_sum': F('management_sum') + sign * state.management,
+                'culture_sum': F('culture_sum') + sign * state.culture,
+                'salaried_over_all_rate_sum': F('salaried_over_all_rate_sum') + sign * state.over_all_rate,
+            })
+            if sign > 0:  # greatest/least skip null on postgres
+                updates['salary_max'] = Greatest('salary_max', Value(state.salary))
+                updates['salary_min'] = Least('salary_min', Value(state.salary))
+        cls.objects.filter(company_id=state.company_id).update(**updates)
+
+    @classmethod
+    def apply_review_change(cls, old_state, new_state):
+        """
+        move the rollup from old to new state of a review, the review must be saved already
+        """
+        if old_state == new_state:
+            return
+        if old_state:
+            cls.add_review(old_state, -1)
+        if new_state:
+            cls.add_review(new_state, 1)
+        if old_state and old_state.salary != 0:
+            statistics = cls.objects.get(company_id=old_state.company_id)
+            if old_state.salary in [statistics.salary_max, statistics.salary_min]:  # removed an extreme
+                cls.objects.filter(company_id=old_state.company_id).update(**Company.objects.filter(
+                    id=old_state.company_id).aggregate(salary_max=Max('companyreview__salary', filter=SALARIED_REVIEW),
+                                                       salary_min=Min('companyreview__salary', filter=SALARIED_REVIEW)))
+
+    @classmethod
+    def apply_interview_change(cls, old_state, new_state):
+        if old_state == new_state:
+            return
+        if old_state:
+            cls.objects.filter(company_id=old_state.company_id).update(interview_count=F('interview_count') - 1)
+        if new_state:
+            cls.objects.filter(company_id=new_state.company_id).update(interview_count=F('interview_count') + 1)
+
+
 class Gallery(models.Model):
     path = models.CharField(max_length=200)
     description = models.CharField(max_length=1000, null=True, blank=True)
@@ -200,3 +383,6 @@ class Gallery(models.Model):
 
     def __str__(self):
         return self.company.name
+
+    def cache_tags(self):
+        return [caching.row_tag(Company, self.company_id)]
@@ -0,0 +1,45 @@
+"""
+company search
+
+name, name_en and description are kept normalized in search_name and search_description (Company.save),
+both have a trigram gin index so contains filters do not scan the table
+"""
+import re
+
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Q
+
+PERSIAN_TRANSLATION = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی',  # arabic yeh, alef maksura, yeh with hamza
+    'ك': 'ک',  # arabic kaf
+    'ة': 'ه', 'ۀ': 'ه',  # teh marbuta, heh with yeh
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ؤ': 'و',  # hamza forms
+    '\u200c': ' ', '\u200f': None, '\u200e': None, 'ـ': None,  # zwnj, rtl/ltr marks, tatweel
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},  # persian digits
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # arabic digits
+})
+DIACRITICS_REGEX = re.compile('[\u064b-\u065f\u0670]')
+SPACES_REGEX = re.compile(r'\s+')
+
+
+def normalize_search_text(text):
+    """
+    one spelling for persian/arabic letters and digits, lower case, single spaces
+    """
+    if not text:
+        return ''
+    text = DIACRITICS_REGEX.sub('', text.translate(PERSIAN_TRANSLATION))
+    return SPACES_REGEX.sub(' ', text).strip().lower()
+
+
+def search_companies(queryset, text, with_description=False):
+    """
+    companies matching text, annotated with search_rank (name similarity) for ordering
+    """
+    text = normalize_search_text(text)
+    if not text:
+        return queryset.none()
+    query = Q(search_name__contains=text)
+    if with_description:
+        query |= Q(search_description__contains=text)
+    return queryset.filter(query).annotate(search_rank=TrigramSimilarity('search_name', text))
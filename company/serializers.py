@@ -2,7 +2,6 @@ import json
 import re
 from datetime import datetime, timedelta
 
-from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import transaction
@@ -13,10 +12,11 @@ from django.utils.translation import ugettext
 from company.models import Benefit, Company, Industry, Province, City, Gallery
 from review.models import Cons, Pros
 from utilities import utilities
+from utilities.serializers import MediaPathsMixin
 from utilities.exceptions import CustomException
 
 
-class IndustrySerializer(serializers.Serializer):
+class IndustrySerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=100, min_length=3)
     industry_slug = serializers.ReadOnlyField()
@@ -26,7 +26,7 @@ class IndustrySerializer(serializers.Serializer):
     supported = serializers.BooleanField(default=True)
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
     def to_representation(self, instance):
@@ -72,7 +72,7 @@ class ComapnyIndustrySerializer(serializers.Serializer):
     industry_slug = serializers.CharField(max_length=100, min_length=3)
 
 
-class BenefitSerializer(serializers.Serializer):
+class BenefitSerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=100, min_length=2)
     logo = serializers.CharField(max_length=200, required=False)
@@ -80,7 +80,7 @@ class BenefitSerializer(serializers.Serializer):
     supported = serializers.BooleanField(default=True)
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
     def to_representation(self, instance):
@@ -112,14 +112,14 @@ class UserBenefitSerializer(serializers.Serializer):
     icon = serializers.ReadOnlyField()
 
 
-class GallerySerializer(serializers.Serializer):
+class GallerySerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     path = serializers.CharField(max_length=200)
     description = serializers.CharField(max_length=1000, required=False)
     is_deleted = serializers.BooleanField(default=False)
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
 
@@ -221,11 +221,18 @@ class UserCitySerializer(serializers.Serializer):
     city_slug = serializers.CharField(max_length=50)
 
 
+def user_city_list(rows):
+    """
+    UserCitySerializer of values('name', 'show_name', 'city_slug') rows without rest framework fields
+    """
+    return [{'name': row['name'], 'show_name': row['show_name'], 'city_slug': row['city_slug']} for row in rows]
+
+
 class ApproveCompaniesSerializer(serializers.Serializer):
     count = serializers.IntegerField()
 
 
-class CompanySerializer(serializers.Serializer):
+class CompanySerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=100, min_length=2)
     name_en = serializers.CharField(max_length=100, min_length=2)
@@ -251,11 +258,11 @@ class CompanySerializer(serializers.Serializer):
     approved = serializers.BooleanField(required=False)
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
     def validate_cover(self, cover):
-        utilities.check_file_exist(cover)
+        self.check_media('cover', cover)
         return cover
 
     def validate_site(self, site):
@@ -318,7 +325,6 @@ class CompanySerializer(serializers.Serializer):
             item['company'] = company
             gallery_item = Gallery(**item)
             gallery_item.save()
-        cache.delete(settings.COMPANY_NAME_LIST)
         return company
 
     @transaction.atomic
@@ -359,11 +365,10 @@ class CompanySerializer(serializers.Serializer):
         if validated_data.get('approved'):
             instance.approved = validated_data.pop('approved')
         instance.save()
-        cache.delete(settings.COMPANY_NAME_LIST)
         return instance
 
 
-class InsertCompanySerializer(serializers.Serializer):
+class InsertCompanySerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=100, min_length=2)
     description = serializers.CharField(max_length=3000, required=False)
@@ -381,7 +386,7 @@ class InsertCompanySerializer(serializers.Serializer):
     address = serializers.CharField(max_length=100, required=False)
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
     def validate_site(self, site):
@@ -440,11 +445,10 @@ class InsertCompanySerializer(serializers.Serializer):
             item['company'] = company
             gallery_item = Gallery(**item)
             gallery_item.save()
-        cache.delete(settings.COMPANY_NAME_LIST)
         return company
 
 
-class UserInsertCompanySerializer(serializers.Serializer):
+class UserInsertCompanySerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=100, min_length=2)
     name_en = serializers.CharField(max_length=100, min_length=2)
@@ -463,7 +467,7 @@ class UserInsertCompanySerializer(serializers.Serializer):
     address = serializers.CharField(max_length=100, required=False)
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
     def validate_site(self, site):
@@ -524,7 +528,6 @@ class UserInsertCompanySerializer(serializers.Serializer):
             item['company'] = company
             gallery_item = Gallery(**item)
             gallery_item.save()
-        cache.delete(settings.COMPANY_NAME_LIST)
         return company
 
 
@@ -555,16 +558,21 @@ class UserCompanySerializer(serializers.Serializer):
     view_count = serializers.ReadOnlyField()
     # review_result = serializers.ReadOnlyField()
 
+    @staticmethod
+    def get_seconds_to_next_review(instance, user):
+        if isinstance(user, User):
+            has_review = instance.companyreview_set.filter(creator=user)
+            if has_review:
+                return -round((datetime.now() - (has_review.last().created + timedelta(days=90))).total_seconds())
+        return 0
+
     def to_representation(self, instance):
         instance.founded = instance.founded.strftime('%Y') if instance.founded else 'سال نامشخص'
         instance.view_count = instance.view.count() + instance.total_view
         instance.total_companyview = instance.total_review
         instance.total_review = instance.total_review + instance.total_interview
-        if isinstance(self.context['request'].user, User):
-            has_review = instance.companyreview_set.filter(creator=self.context['request'].user)
-            instance.seconds_to_next_review = -round((datetime.now() - (has_review.last().created + timedelta(days=90))).total_seconds()) if has_review else 0
-        else:
-            instance.seconds_to_next_review = 0
+        request = self.context.get('request')
+        instance.seconds_to_next_review = self.get_seconds_to_next_review(instance, request.user) if request else 0
         if instance.has_legal_issue:
             is_deleted_text = settings.IS_DELETED_TEXT % instance.name
             instance.gallery = []
@@ -629,6 +637,43 @@ class PublicCompanyListSerializer(serializers.Serializer):
         return instance
 
 
+def public_company(row):
+    """
+    PublicCompanyListSerializer of a values() row without rest framework fields, row is not changed
+    """
+    if row['has_legal_issue']:
+        description, salary_min, salary_max, over_all_rate = settings.IS_DELETED_TEXT % row['name'], 0, 0, 0
+    else:
+        description, salary_min, salary_max, over_all_rate = (row.get('description'), row['salary_min'],
+                                                              row['salary_max'], row['over_all_rate'])
+        if not description:
+            description = ''
+        elif len(description) > 180:
+            description = ' '.join(description[:180].split(' ')[:-1]) + ' ...'
+    company = {
+        'name': row['name'],
+        'company_slug': row['company_slug'],
+        'founded': row['founded'].strftime('%Y') if row['founded'] else 'سال نامشخص',
+        'logo': row['logo'],
+        'city': {'name': row['city__name'], 'show_name': row['city__show_name'], 'city_slug': row['city__city_slug']},
+        'description': description,
+        'total_review': row['total_review'] + row['total_interview'],
+        'total_interview': row['total_interview'],
+        'total_companyreview': row['total_review'],
+        'salary_min': salary_min,
+        'salary_max': salary_max,
+        'over_all_rate': over_all_rate,
+        'size': row['size'],
+    }
+    if 'view_count' in row:
+        company['view_count'] = row['view_count']
+    return company
+
+
+def public_company_list(rows):
+    return [public_company(row) for row in rows]
+
+
 class CompanyNameListSerializer(serializers.Serializer):
     name = serializers.ReadOnlyField()
     name_en = serializers.ReadOnlyField()
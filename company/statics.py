@@ -0,0 +1,48 @@
+"""
+bulk recompute of company statics and scores
+
+rebuilds the statistics rollups with grouped queries, derives the company fields from them in memory and
+writes the changed companies back in batches, instead of several aggregates and a save() per company
+"""
+
+from company.models import Company, CompanyStatistics
+from utilities import caching
+from utilities.utilities import bulk_update
+
+STATICS_FIELDS = ['total_review', 'total_interview', 'salary_avg', 'salary_max', 'salary_min', 'work_life_balance',
+                  'salary_benefit', 'security', 'management', 'culture', 'over_all_rate', 'recommend_to_friend',
+                  'is_big_company', 'company_score']
+SCORE_FIELDS = ['id', 'size', 'is_famous', 'has_panel_moderator', 'is_cheater']
+
+
+def recompute_company_statics(company_ids=None, batch_size=500, progress=None):
+    """
+    :param company_ids: companies to recompute, all if None
+    :param batch_size: companies loaded and updated per query
+    :param progress: called with (done, total) after each batch
+    :return: (number of companies, number of changed companies)
+    """
+    statistics = CompanyStatistics.rebuild(company_ids)
+    ids = sorted(statistics.keys())
+    changed_ids = []
+    for start in range(0, len(ids), batch_size):
+        changed = []
+        for company in Company.objects.filter(id__in=ids[start:start + batch_size]).only(*SCORE_FIELDS,
+                                                                                          *STATICS_FIELDS):
+            before = [getattr(company, field) for field in STATICS_FIELDS]
+            company_statistics = statistics[company.id]
+            company.set_review_statics(company_statistics)
+            company.total_interview = company_statistics.interview_count
+            company.is_big_company = False if company.size in ['VS', 'S'] else True
+            company.handle_company_score(company_statistics)
+            if before != [getattr(company, field) for field in STATICS_FIELDS]:
+                changed.append(company)
+        bulk_update(Company, changed, STATICS_FIELDS, batch_size)
+        changed_ids += [company.id for company in changed]
+        if progress:
+            progress(min(start + batch_size, len(ids)), len(ids))
+    if changed_ids:
+        # bulk_update skips save
+        caching.invalidate_model(Company)
+        caching.invalidate_rows(Company, changed_ids)
+    return len(ids), len(changed_ids)
@@ -1,3 +1,51 @@
-from django.test import TestCase
+import copy
+import datetime
+import json
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from company import serializers
+
+COMPANY_ROW = {
+    'name': 'اسنپ', 'company_slug': 'snapp', 'founded': datetime.date(2014, 5, 1), 'logo': '/media/logo/snapp.png',
+    'city__name': 'تهران', 'city__show_name': 'تهران، تهران', 'city__city_slug': 'tehran',
+    'description': 'شرکت ' * 60, 'total_review': 12, 'total_interview': 3, 'salary_min': 8, 'salary_max': 20,
+    'over_all_rate': 3.8, 'size': 'L', 'has_legal_issue': False,
+}
+
+
+class PublicCompanyListTests(SimpleTestCase):
+    """
+    fast path serializers must return what the rest framework serializers return, in the same order
+    """
+
+    def assertSameOutput(self, rows):
+        expected = serializers.PublicCompanyListSerializer(copy.deepcopy(rows), many=True).data
+        self.assertEqual(json.dumps(serializers.public_company_list(rows)), json.dumps(expected))
+
+    def test_company(self):
+        self.assertSameOutput([COMPANY_ROW, dict(COMPANY_ROW, description='کوتاه')])
+
+    def test_company_without_optional_fields(self):
+        self.assertSameOutput([dict(COMPANY_ROW, founded=None, description=None, city__name=None,
+                                    city__show_name=None, city__city_slug=None)])
+
+    def test_company_with_legal_issue(self):
+        self.assertSameOutput([dict(COMPANY_ROW, has_legal_issue=True)])
+
+    def test_extra_fields(self):
+        self.assertSameOutput([dict(COMPANY_ROW, company_score=12.5, created=datetime.datetime(2020, 1, 1)),
+                               dict(COMPANY_ROW, view_count=40)])
+
+    def test_row_is_not_changed(self):
+        row = dict(COMPANY_ROW, has_legal_issue=True)
+        serializers.public_company_list([row])
+        self.assertEqual(row, dict(COMPANY_ROW, has_legal_issue=True))
+
+
+class UserCityListTests(SimpleTestCase):
+
+    def test_city(self):
+        rows = [{'name': 'رشت', 'show_name': 'رشت، گیلان', 'city_slug': 'rasht'}]
+        expected = serializers.UserCitySerializer(copy.deepcopy(rows), many=True).data
+        self.assertEqual(json.dumps(serializers.user_city_list(rows)), json.dumps(expected))
@@ -4,10 +4,9 @@ import itertools
 from querystring_parser import parser
 from django.contrib.auth.models import User
 from django.core.exceptions import FieldError
-from django.core.cache import cache
-from django.db.models import Count, Q, F, Case, When, Prefetch, Value, CharField
+from django.db.models import Count, DecimalField, F, Case, When, Prefetch
+from django.db.models.functions import Cast
 from django.conf import settings
-from django.contrib.auth.models import AnonymousUser
 from rest_framework import decorators, generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
@@ -19,14 +18,30 @@ from company import serializers as company_serialzier
 from review import serializers as review_serialzier
 from question import serializers as question_serializer
 from company import models
+from company.autocomplete import get_company_name_index
+from company.search import search_companies
 from donate.models import Donate
 from donate.serializers import DonateSerializer
+from review import timeline
+from review.excerpt import pending_description
 from review.models import CompanyReview, Interview
 from utilities.tools import create, delete, list_result, update
-from utilities.utilities import CUSTOM_PAGINATION_SCHEMA, back_months_by_3, avg_by_key
-from utilities import permissions, responses
+from utilities.utilities import CUSTOM_PAGINATION_SCHEMA, back_months_by_3, avg_by_key, setup_eager_loading
+from utilities import caching, cursor, permissions, responses, view_counter
 from utilities.exceptions import CustomException
 
+# models the cached home lists are computed from
+COMPANY_LIST_TAGS = [caching.model_tag(models.Company), caching.model_tag(models.City)]
+INDUSTRY_LIST_TAGS = [caching.model_tag(models.Industry), caching.model_tag(models.Company)]
+REVIEW_TAGS = [caching.model_tag(CompanyReview), caching.model_tag(models.Company)]
+INTERVIEW_TAGS = [caching.model_tag(Interview), caching.model_tag(models.Company)]
+# models whose versions make the etags of responses read from database
+PUBLIC_COMPANY_LIST_TAGS = [caching.model_tag(models.Company), caching.model_tag(models.City),
+                            caching.model_tag(models.Industry), caching.model_tag(models.Gallery)]
+HOME_TAGS = [caching.model_tag(models.Company), caching.model_tag(models.City), caching.model_tag(models.Industry),
+             caching.model_tag(CompanyReview), caching.model_tag(Interview), caching.model_tag(Donate),
+             caching.rows_tag(User)]
+
 
 # Benefit
 @decorators.authentication_classes([JSONWebTokenAuthentication])
@@ -116,11 +131,10 @@ class UserCityListView(list_result.UserListView):
             index = int(arguments.pop('index', 0))
             size = index + size
 
-            result = cache.get(settings.CITY_CACHE_LIST)
-            if not result:
-                result = self.model.objects.filter(is_deleted=False).order_by('-priority').all()
-                result = self.get_serializer(result, many=True).data
-                cache.set(settings.CITY_CACHE_LIST, result, timeout=None)
+            result = caching.get_or_fill(settings.CITY_CACHE_LIST, lambda: company_serialzier.user_city_list(
+                self.model.objects.filter(is_deleted=False).order_by('-priority').values('name', 'show_name',
+                                                                                        'city_slug')),
+                tags=[caching.model_tag(models.City), caching.model_tag(models.Province)], local=True)
 
             if arguments.get('name'):
                 city_name = arguments.get('name').lower()
@@ -128,7 +142,7 @@ class UserCityListView(list_result.UserListView):
             total = len(result)
             result = result[index:size]
 
-            return responses.SuccessResponse(result, index=index, total=total).send()
+            return responses.SuccessResponse(result, index=index, total=total).send(request)
         except FieldError as e:
             return responses.ErrorResponse(message=str(e)).send()
 
@@ -292,15 +306,38 @@ class CompanyRetrieveView(generics.RetrieveAPIView):
     model = models.Company
     throttle_classes = []
 
+    def profile(self, slug):
+        """
+        representation of the company for anonymous users, data is None if it is not approved, with the row tags
+        of the rows it shows
+        :raise Company.DoesNotExist: unknown slug, not cached so that crawled junk slugs do not fill redis
+        """
+        company = self.model.objects.filter(company_slug=slug).values('id', 'approved').get()
+        tags = [caching.row_tag(self.model, company['id'])]
+        if not company['approved']:
+            return {'id': company['id'], 'data': None, 'tags': tags}
+        instance = self.model.objects.select_related('industry', 'city').prefetch_related('benefit').get(
+            id=company['id'])
+        tags += [caching.row_tag(models.Industry, instance.industry_id), caching.row_tag(models.City, instance.city_id),
+                 *[caching.instance_tag(benefit) for benefit in instance.benefit.all()]]
+        return {'id': instance.id, 'data': self.get_serializer_class()(instance).data, 'tags': tags}
+
+    def profile_tags(self, profile):
+        # row tags only, a model tag would clear every profile on each save of a company
+        return profile['tags']
+
     def get(self, request, slug, *args, **kwargs):
         try:
-            instance = self.model.objects.filter(approved=True).get(company_slug=slug)
-            if not isinstance(request.user, AnonymousUser):  # view of company
-                instance.view.add(request.user)
-            instance.total_view += 1
-            instance.save()
-            serialize_data = self.get_serializer(instance)
-            return responses.SuccessResponse(serialize_data.data).send()
+            profile = caching.get_or_fill(settings.COMPANY_PROFILE + slug, lambda: self.profile(slug),
+                                          tags=self.profile_tags)
+            if profile['data'] is None:
+                raise models.Company.DoesNotExist
+            instance = self.model(id=profile['id'])
+            view_counter.register_view(instance, request.user)
+            data = dict(profile['data'])
+            data['seconds_to_next_review'] = self.get_serializer_class().get_seconds_to_next_review(instance,
+                                                                                                 request.user)
+            return responses.SuccessResponse(data).send(request)
         except models.Company.DoesNotExist as e:
             return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
 
@@ -326,17 +363,17 @@ class CompanyReviewListView(generics.ListAPIView):
     def get(self, request, slug, *args, **kwargs):
         try:
             instance = self.model.objects.filter(is_deleted=False, approved=True).get(company_slug=slug)
-            serialize_data = self.get_serializer(instance.companyreview_set.filter(
-                is_deleted=False, approved=True
-            ).all(), many=True)
             arguments = parser.parse(request.GET.urlencode())
 
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            data = serialize_data.data
-            return responses.SuccessResponse(data[index:size], index=index, total=len(data)).send()
+            result = instance.companyreview_set.filter(is_deleted=False, approved=True)
+            total = result.count()
+            result = setup_eager_loading(self.get_serializer_class(), result, request.user)
+            serialize_data = self.get_serializer(result[index:size], many=True)
+            return responses.SuccessResponse(serialize_data.data, index=index, total=total).send()
         except models.Company.DoesNotExist as e:
             return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
 
@@ -357,16 +394,18 @@ class AdminCompanyReviewListView(generics.ListAPIView):
             instance = self.model.objects.filter(is_deleted=False).get(company_slug=slug)
             if request.user != instance.user:
                 return responses.ErrorResponse(message='No permission.', status=403).send()
-            serialize_data = self.get_serializer(instance.companyreview_set.filter(is_deleted=False,).all(), many=True)
             arguments = parser.parse(request.GET.urlencode())
 
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            data = serialize_data.data
-            data = sorted(data, key=lambda x: x['vote_count'], reverse=True)
-            return responses.SuccessResponse(data[index:size], index=index, total=len(data)).send()
+            result = instance.companyreview_set.filter(is_deleted=False)
+            total = result.count()
+            result = setup_eager_loading(self.get_serializer_class(), result, request.user)
+            result = result.order_by('-vote_count', '-created')
+            serialize_data = self.get_serializer(result[index:size], many=True)
+            return responses.SuccessResponse(serialize_data.data, index=index, total=total).send()
         except models.Company.DoesNotExist as e:
             return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
 
@@ -392,17 +431,17 @@ class CompanyInterReviewListView(generics.ListAPIView):
     def get(self, request, slug, *args, **kwargs):
         try:
             instance = self.model.objects.filter(is_deleted=False, approved=True).get(company_slug=slug)
-            serialize_data = self.get_serializer(instance.interview_set.filter(
-                is_deleted=False, approved=True
-            ).all(), many=True)
             arguments = parser.parse(request.GET.urlencode())
 
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            data = serialize_data.data
-            return responses.SuccessResponse(data[index:size], index=index, total=len(data)).send()
+            result = instance.interview_set.filter(is_deleted=False, approved=True)
+            total = result.count()
+            result = setup_eager_loading(self.get_serializer_class(), result, request.user)
+            serialize_data = self.get_serializer(result[index:size], many=True)
+            return responses.SuccessResponse(serialize_data.data, index=index, total=total).send()
         except models.Company.DoesNotExist as e:
             return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
 
@@ -423,16 +462,18 @@ class AdminCompanyInterReviewListView(generics.ListAPIView):
             instance = self.model.objects.filter(is_deleted=False).get(company_slug=slug)
             if request.user != instance.user:
                 return responses.ErrorResponse(message='No permission.', status=403).send()
-            serialize_data = self.get_serializer(instance.interview_set.filter(is_deleted=False).all(), many=True)
             arguments = parser.parse(request.GET.urlencode())
 
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            data = serialize_data.data
-            data = sorted(data, key=lambda x: x['vote_count'], reverse=True)
-            return responses.SuccessResponse(data[index:size], index=index, total=len(data)).send()
+            result = instance.interview_set.filter(is_deleted=False)
+            total = result.count()
+            result = setup_eager_loading(self.get_serializer_class(), result, request.user)
+            result = result.order_by('-vote_count', '-created')
+            serialize_data = self.get_serializer(result[index:size], many=True)
+            return responses.SuccessResponse(serialize_data.data, index=index, total=total).send()
         except models.Company.DoesNotExist as e:
             return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
 
@@ -458,17 +499,18 @@ class CompanyQuestionListView(generics.ListAPIView):
     def get(self, request, slug, *args, **kwargs):
         try:
             instance = self.model.objects.filter(is_deleted=False, approved=True).get(company_slug=slug)
-            serialize_data = self.get_serializer(instance.question_set.filter(
-                is_deleted=False, approved=True
-            ), many=True)
             arguments = parser.parse(request.GET.urlencode())
 
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            data = serialize_data.data
-            return responses.SuccessResponse(data[index:size], index=index, total=len(data)).send()
+            # in insertion order like before pagination, by id so that pages do not overlap
+            result = instance.question_set.filter(is_deleted=False, approved=True).order_by('id')
+            total = result.count()
+            result = setup_eager_loading(self.get_serializer_class(), result, request.user)
+            serialize_data = self.get_serializer(result[index:size], many=True)
+            return responses.SuccessResponse(serialize_data.data, index=index, total=total).send()
         except models.Company.DoesNotExist as e:
             return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
 
@@ -489,15 +531,18 @@ class AdminCompanyQuestionListView(generics.ListAPIView):
             instance = self.model.objects.filter(is_deleted=False).get(company_slug=slug)
             if request.user != instance.user:
                 return responses.ErrorResponse(message='No permission.', status=403).send()
-            serialize_data = self.get_serializer(instance.question_set.filter(is_deleted=False), many=True)
             arguments = parser.parse(request.GET.urlencode())
 
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            data = serialize_data.data
-            return responses.SuccessResponse(data[index:size], index=index, total=len(data)).send()
+            # in insertion order like before pagination, by id so that pages do not overlap
+            result = instance.question_set.filter(is_deleted=False).order_by('id')
+            total = result.count()
+            result = setup_eager_loading(self.get_serializer_class(), result, request.user)
+            serialize_data = self.get_serializer(result[index:size], many=True)
+            return responses.SuccessResponse(serialize_data.data, index=index, total=total).send()
         except models.Company.DoesNotExist as e:
             return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
 
@@ -525,7 +570,11 @@ class UserCompanyListView(list_result.UserListView):
 
     salary will * 1,000,000
 
-    order_by HOTTEST, SALARY, RATE
+    order_by HOTTEST, SALARY, RATE, by relevance to name if not set
+
+    name searches name, name_en and description, persian/arabic spelling and digits are normalized
+
+    cursor instead of index for cursor pagination, empty for the first page then next_cursor of the previous page
     """
     serializer_class = company_serialzier.PublicCompanyListSerializer
     model = models.Company
@@ -536,8 +585,14 @@ class UserCompanyListView(list_result.UserListView):
             arguments = parser.parse(request.GET.urlencode())
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
+            page_cursor = arguments.pop('cursor', None)
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
+            # versions read before the rows, the body read from database below is at least as new as its etag
+            etag = responses.request_etag(request, size, index, caching.tag_versions(*PUBLIC_COMPANY_LIST_TAGS))
+            response = responses.not_modified(request, etag)
+            if response is not None:
+                return response
             query_filter = {'approved': True, 'is_deleted': False, 'is_cheater': False}
             if arguments.get('city'):
                 query_filter['city__city_slug'] = arguments.get('city')
@@ -555,9 +610,10 @@ class UserCompanyListView(list_result.UserListView):
                 query_filter['over_all_rate__lte'] = float(arguments.get('rate_lte'))
             result = self.model.objects.filter(**query_filter)
             if arguments.get('name'):
-                result = result.filter(Q(name__icontains=arguments.get('name')) |
-                                       Q(name_en__icontains=arguments.get('name')))
-            if arguments.get('order_by'):
+                result = search_companies(result, arguments.get('name'), with_description=True)
+            if arguments.get('name') and not arguments.get('order_by'):
+                result = result.order_by('-search_rank', '-total_review')
+            elif arguments.get('order_by'):
                 if arguments.get('order_by') == 'HOTTEST':
                     result = result.order_by('-total_review', '-created')
                 elif arguments.get('order_by') == 'SALARY':
@@ -571,13 +627,30 @@ class UserCompanyListView(list_result.UserListView):
             result = result.prefetch_related(Prefetch('gallery_set',
                                                       queryset=models.Gallery.objects.filter(is_deleted=False),
                                                       to_attr='gallery'))
-            result = result.values('name', 'company_slug', 'founded', 'logo', 'city__name', 'city__show_name',
-                                   'city__city_slug', 'description', 'total_review', 'total_interview', 'salary_min',
-                                   'salary_max', 'over_all_rate', 'size',  'has_legal_issue')
-            total = len(result)
-            result = self.get_serializer(result[index:size], many=True).data
-
-            return responses.SuccessResponse(result, index=index, total=total).send()
+            fields = ['name', 'company_slug', 'founded', 'logo', 'city__name', 'city__show_name', 'city__city_slug',
+                      'description', 'total_review', 'total_interview', 'salary_min', 'salary_max', 'over_all_rate',
+                      'size', 'has_legal_issue']
+            if page_cursor is not None:
+                ordering = list(result.query.order_by)
+                if '-search_rank' in ordering:
+                    # the float4 similarity does not come back equal from the cursor, rows tied with the last row
+                    # of a page would be dropped or repeated, so page by it rounded to an exact numeric
+                    result = result.annotate(search_rank_key=Cast('search_rank', DecimalField(max_digits=7,
+                                                                                              decimal_places=6)))
+                    ordering[ordering.index('-search_rank')] = '-search_rank_key'
+                ordering = cursor.cursor_ordering(ordering)
+                result = result.order_by(*ordering).values(*fields, *[key.lstrip('-') for key in ordering
+                                                                      if key.lstrip('-') not in fields])
+                total = None if page_cursor else result.count()
+                result, next_cursor = cursor.paginate(result, ordering, page_cursor, size - index)
+                result = company_serialzier.public_company_list(result)
+                return responses.SuccessResponse(result, total=total, next_cursor=next_cursor).send(request, etag)
+
+            result = result.values(*fields)
+            total = result.count()
+            result = company_serialzier.public_company_list(result[index:size])
+
+            return responses.SuccessResponse(result, index=index, total=total).send(request, etag)
         except FieldError as e:
             return responses.ErrorResponse(message=str(e)).send()
 
@@ -589,7 +662,9 @@ class CompanyNameListView(generics.ListAPIView):
     """
     Company names for search in home
 
-    /public/company/name_list/?name__icontains=sn
+    /public/company/name_list/?name=sn
+
+    names with a word starting with name first, then by total_review
     """
     serializer_class = company_serialzier.CompanyNameListSerializer
     model = models.Company
@@ -603,24 +678,8 @@ class CompanyNameListView(generics.ListAPIView):
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            result = cache.get(settings.COMPANY_NAME_LIST)
-            if not result:
-                result = self.model.objects.filter(is_deleted=False, approved=True)
-                result = result.order_by('-total_review')
-                result = self.get_serializer(result, many=True).data
-                cache.set(settings.COMPANY_NAME_LIST, result, timeout=None)
-
-            if arguments.get('name'):
-                name = arguments.get('name').lower()
-                result = list(filter(lambda x: name in x['name'].lower() or name in x['name_en'].lower(), result))
-            # if arguments.get('name__icontains'):
-            #     result = result.filter(Q(name__icontains=arguments.get('name__icontains'))|
-            #                            Q(name_en__icontains=arguments.get('name__icontains')))
-            # result = result.order_by('-total_review')
-            # result = result.all()
-            total = len(result)
-
-            return responses.SuccessResponse(result[index:size], index=index, total=total).send()
+            total, result = get_company_name_index().search(arguments.get('name'), index, size)
+            return responses.SuccessResponse(result, index=index, total=total).send()
         except FieldError as e:
             return responses.ErrorResponse(message=str(e)).send()
 
@@ -719,15 +778,13 @@ class UserIndustryListView(list_result.UserListView):
             index = int(arguments.pop('index', 0))
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
-            result = cache.get(settings.INDUSTRY_LIST)
-            if not result:
-                result = models.Industry.objects.filter(is_deleted=False).values('name', 'industry_slug', 'logo', 'icon')\
-                    .distinct().annotate(Count('company', distinct=True)).order_by('-company__count')
-                result = self.get_serializer(result, many=True).data
-                cache.set(settings.INDUSTRY_LIST, result, timeout=None)
+            result = caching.get_or_fill(settings.INDUSTRY_LIST, lambda: self.get_serializer(
+                models.Industry.objects.filter(is_deleted=False).values('name', 'industry_slug', 'logo', 'icon')
+                .distinct().annotate(Count('company', distinct=True)).order_by('-company__count'), many=True).data,
+                tags=INDUSTRY_LIST_TAGS, local=True)
             total = len(result)
             result = result[index:size]
-            return responses.SuccessResponse(result, index=index, total=total).send()
+            return responses.SuccessResponse(result, index=index, total=total).send(request)
         except FieldError as e:
             return responses.ErrorResponse(message=str(e)).send()
 
@@ -793,95 +850,89 @@ class HomeView(generics.ListAPIView):
     """
     throttle_classes = []
 
+    @staticmethod
+    def industry_list():
+        return company_serialzier.PublicIndustrySerializer(
+            models.Industry.objects.filter(company__approved=True).values('name', 'industry_slug', 'icon', 'logo')
+            .distinct().annotate(Count('company', distinct=True)).order_by('-company__count'),
+            many=True).data
+
+    @staticmethod
+    def best_company_list():
+        return company_serialzier.public_company_list(
+            models.Company.objects.filter(is_deleted=False, approved=True, is_cheater=False).order_by('-company_score').
+            values('name', 'company_slug', 'founded', 'logo', 'city__name', 'city__show_name',
+                   'city__city_slug', 'description', 'total_review', 'total_interview', 'salary_min',
+                   'salary_max', 'over_all_rate', 'size',  'has_legal_issue', 'company_score').distinct()[:10])
+
+    @staticmethod
+    def discussed_company_list():
+        return company_serialzier.public_company_list(
+            models.Company.objects.filter(is_deleted=False, approved=True, is_cheater=False).
+            annotate(total_sum=F('total_review') + F('total_interview')).
+            order_by('-total_sum').values('name', 'company_slug', 'founded', 'logo', 'city__name',
+                                          'city__show_name', 'city__city_slug', 'description',
+                                          'total_review', 'total_interview', 'salary_min', 'salary_max',
+                                          'over_all_rate', 'size',  'has_legal_issue').distinct()[:10])
+
+    @staticmethod
+    def last_reviews(user):
+        return review_serialzier.home_company_review_list(
+            CompanyReview.objects.filter(approved=True, is_deleted=False).order_by('-created')
+            .annotate(pending_description=pending_description())
+            .values('id', 'company__name', 'company__name_en', 'company__company_slug', 'company__logo',
+                    'title', 'excerpt', 'pending_description', 'over_all_rate', 'created', 'has_legal_issue',
+                    'approved', 'creator').distinct()[:10], user)
+
+    @staticmethod
+    def last_interviews():
+        return review_serialzier.home_interview_list(
+            Interview.objects.filter(approved=True, is_deleted=False).order_by('-created')
+            .annotate(pending_description=pending_description())
+            .values('id', 'company__name', 'company__name_en', 'company__company_slug', 'company__logo',
+                    'title', 'excerpt', 'pending_description', 'created', 'total_rate', 'approved', 'has_legal_issue',
+                    'creator').distinct()[:10])
+
+    @staticmethod
+    def donate_list():
+        donates = Donate.objects.filter(is_active=True).exclude(cost__lte=0)
+        return {'THE_MOST': DonateSerializer(donates.order_by('-cost')[:24], many=True).data,
+                'THE_LAST': DonateSerializer(donates.order_by('-created')[:24], many=True).data}
+
     def get(self, request, *args, **kwargs):
         try:
-            industry_list = cache.get(settings.INDUSTRY_LIST)
-            if not industry_list:
-                industry_list = company_serialzier.PublicIndustrySerializer(
-                    models.Industry.objects.filter(company__approved=True).values('name', 'industry_slug', 'icon', 'logo')
-                        .distinct().annotate(Count('company', distinct=True)).order_by('-company__count'),
-                    many=True).data
-                cache.set(settings.INDUSTRY_LIST, industry_list, timeout=None)
-
-            company_list = cache.get(settings.BEST_COMPANY_LIST)
-            if not company_list:
-                company_list = company_serialzier.PublicCompanyListSerializer(
-                    models.Company.objects.filter(is_deleted=False, approved=True, is_cheater=False).order_by('-company_score').
-                        values('name', 'company_slug', 'founded', 'logo', 'city__name', 'city__show_name',
-                               'city__city_slug', 'description', 'total_review', 'total_interview', 'salary_min',
-                               'salary_max', 'over_all_rate', 'size',  'has_legal_issue', 'company_score').distinct()[:10],
-                    many=True).data
-                cache.set(settings.BEST_COMPANY_LIST, company_list, timeout=None)
-
-            discussed_company_list = cache.get(settings.DISCUSSED_COMPANY_LIST)
-            if not discussed_company_list:
-                discussed_company_list = company_serialzier.PublicCompanyListSerializer(
-                    models.Company.objects.filter(is_deleted=False, approved=True, is_cheater=False).
-                        annotate(total_sum=F('total_review') + F('total_interview')).
-                        order_by('-total_sum').values('name', 'company_slug', 'founded', 'logo', 'city__name',
-                                                      'city__show_name', 'city__city_slug', 'description',
-                                                      'total_review', 'total_interview', 'salary_min', 'salary_max',
-                                                      'over_all_rate', 'size',  'has_legal_issue').distinct()[:10],
-                    many=True).data
-                cache.set(settings.DISCUSSED_COMPANY_LIST, discussed_company_list, timeout=None)
-
-            context = {'request': request}
+            etag = responses.request_etag(request, caching.tag_versions(*HOME_TAGS))
+            response = responses.not_modified(request, etag)
+            if response is not None:
+                return response
+            freshness = caching.Freshness()
+            industry_list = caching.get_or_fill(settings.INDUSTRY_LIST, self.industry_list, tags=INDUSTRY_LIST_TAGS,
+                                                local=True, freshness=freshness)
+            company_list = caching.get_or_fill(settings.BEST_COMPANY_LIST, self.best_company_list,
+                                               tags=COMPANY_LIST_TAGS, local=True, freshness=freshness)
+            discussed_company_list = caching.get_or_fill(settings.DISCUSSED_COMPANY_LIST, self.discussed_company_list,
+                                                         tags=COMPANY_LIST_TAGS, local=True, freshness=freshness)
+
             if version.parse(request.version) < version.parse('1.0.1'):
-                last_reviews = cache.get(settings.LAST_REVIEWS)
-                if not last_reviews:
-                    last_reviews = review_serialzier.UserHomeCompanyReviewListSerializer(
-                        CompanyReview.objects.filter(approved=True, is_deleted=False).order_by('-created')
-                            .values('id', 'company__name', 'company__name_en', 'company__company_slug', 'company__logo',
-                                    'title', 'description', 'over_all_rate', 'created', 'has_legal_issue',
-                                    'approved', 'creator').distinct()[:10],
-                        many=True, context=context).data
-                    cache.set(settings.LAST_REVIEWS, last_reviews, timeout=None)
-
-                last_interviews = cache.get(settings.LAST_INTERVIEWS)
-                if not last_interviews:
-                    last_interviews = review_serialzier.UserHomeInterviewListSerializer(
-                        Interview.objects.filter(approved=True, is_deleted=False).order_by('-created')
-                        .values('id', 'company__name', 'company__name_en', 'company__company_slug', 'company__logo',
-                                'title', 'description', 'created', 'total_rate', 'approved', 'has_legal_issue', 'creator',
-                                ).distinct()[:10],
-                        many=True, context=context).data
-                    cache.set(settings.LAST_INTERVIEWS, last_interviews, timeout=None)
+                last_reviews = caching.get_or_fill(settings.LAST_REVIEWS, lambda: self.last_reviews(request.user),
+                                                   tags=REVIEW_TAGS, freshness=freshness)
+                last_interviews = caching.get_or_fill(settings.LAST_INTERVIEWS, self.last_interviews,
+                                                      tags=INTERVIEW_TAGS, freshness=freshness)
             else:
                 arguments = parser.parse(request.GET.urlencode())
                 size = int(arguments.pop('size', 20))
                 index = int(arguments.pop('index', 0))
+                page_cursor = arguments.pop('cursor', None)
                 size, index = permissions.pagination_permission(request.user, size, index)
                 size = index + size
-                lcr = CompanyReview.objects.filter(approved=True,
-                                                   is_deleted=False).annotate(
-                    type=Value('REVIEW', output_field=CharField())) \
-                    .values('id', 'company__name', 'company__name_en',
-                            'company__company_slug', 'company__logo',
-                            'title', 'description', 'over_all_rate', 'created',
-                            'has_legal_issue',
-                            'approved', 'creator', 'type').distinct()
-                lir = Interview.objects.filter(approved=True, is_deleted=False).annotate(
-                    type=Value('INTERVIEW', output_field=CharField())) \
-                    .values('id', 'company__name', 'company__name_en',
-                            'company__company_slug', 'company__logo',
-                            'title', 'description', 'total_rate', 'created',
-                            'has_legal_issue',
-                            'approved', 'creator', 'type').distinct()
-
-                lqq = lcr.union(lir, all=True)
-                lqq = lqq.order_by('-created')
-                total = lqq.count()
-                reviews = review_serialzier.UserHomeReviewListSerializer(
-                    lqq[index:size], many=True, context=context
-                ).data
-
-            donate = cache.get(settings.DONATE_LIST, None)
-            if donate is None:
-                donate = {'THE_MOST': DonateSerializer(Donate.objects.filter(is_active=True).exclude(cost__lte=0).order_by('-cost')[:24],
-                                                       many=True).data,
-                          'THE_LAST': DonateSerializer(Donate.objects.filter(is_active=True).exclude(cost__lte=0).order_by('-created')[:24],
-                                                       many=True).data}
-                cache.set(settings.DONATE_LIST, donate)
+                if page_cursor is not None:
+                    lqq, next_cursor, total = timeline.window_after(page_cursor, size - index)
+                else:
+                    lqq, total = timeline.window(index, size)
+                reviews = review_serialzier.home_review_list(lqq)
+
+            donate = caching.get_or_fill(settings.DONATE_LIST, self.donate_list, tags=[caching.model_tag(Donate)],
+                                         local=True, freshness=freshness)
 
             quote_list = [
                 {
@@ -958,27 +1009,19 @@ class HomeView(generics.ListAPIView):
                 'به بهبود شرایط کاری در شرکت های ایرانی کمک کن'
             ]
 
-            total_review = cache.get(settings.TOTAL_REVIEW)
-            if not total_review:
-                total_review = CompanyReview.objects.filter(company__approved=True, company__is_deleted=False,
-                                                            is_deleted=False, approved=True).count()
-                cache.set(settings.TOTAL_REVIEW, total_review, timeout=None)
-
-            total_interview = cache.get(settings.TOTAL_INTERVIEW)
-            if not total_interview:
-                total_interview = Interview.objects.filter(company__approved=True, company__is_deleted=False,
-                                                           is_deleted=False, approved=True).count()
-                cache.set(settings.TOTAL_INTERVIEW, total_interview, timeout=None)
-
-            total_user = cache.get(settings.TOTAL_USER)
-            if not total_user:
-                total_user = User.objects.count()
-                cache.set(settings.TOTAL_USER, total_user, timeout=None)
-
-            total_company = cache.get(settings.TOTAL_COMPANY)
-            if not total_company:
-                total_company = models.Company.objects.filter(is_deleted=False, approved=True).count()
-                cache.set(settings.TOTAL_COMPANY, total_company, timeout=None)
+            total_review = caching.get_or_fill(settings.TOTAL_REVIEW, lambda: CompanyReview.objects.filter(
+                company__approved=True, company__is_deleted=False, is_deleted=False, approved=True).count(),
+                tags=REVIEW_TAGS, freshness=freshness)
+            total_interview = caching.get_or_fill(settings.TOTAL_INTERVIEW, lambda: Interview.objects.filter(
+                company__approved=True, company__is_deleted=False, is_deleted=False, approved=True).count(),
+                tags=INTERVIEW_TAGS, freshness=freshness)
+            total_user = caching.get_or_fill(settings.TOTAL_USER, User.objects.count, tags=[caching.rows_tag(User)],
+                                             freshness=freshness)
+            total_company = caching.get_or_fill(settings.TOTAL_COMPANY, models.Company.objects.filter(
+                is_deleted=False, approved=True).count, tags=[caching.model_tag(models.Company)], freshness=freshness)
+            if not freshness.fresh:
+                # the body is older than the versions, it gets an etag of its content instead
+                etag = None
 
             temp_data = {
                 'industries': industry_list[:8],
@@ -997,12 +1040,15 @@ class HomeView(generics.ListAPIView):
                     'last_reviews': last_reviews,
                     'last_interviews': last_interviews,
                 })
-                return responses.SuccessResponse(temp_data).send()
+                return responses.SuccessResponse(temp_data).send(request, etag)
             else:
                 temp_data.update({
                     'reviews': reviews,
                 })
-                return responses.SuccessResponse(temp_data, index=index, total=total).send()
+                if page_cursor is not None:
+                    return responses.SuccessResponse(temp_data, total=total, next_cursor=next_cursor).send(request,
+                                                                                                          etag)
+                return responses.SuccessResponse(temp_data, index=index, total=total).send(request, etag)
         except Exception as e:
             return responses.ErrorResponse(message=str(e)).send()
 
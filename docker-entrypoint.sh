@@ -1,5 +1,13 @@
 #!/bin/bash
 cd /srv
+export SECRET_KEY=supersecretkey
+
+if [ "$1" = "outbox" ]; then
+    # its own container, restarted by docker when it exits
+    echo Starting outbox worker.
+    exec python3 manage.py deliver_outbox
+fi
+
 python3 manage.py makemigrations
 python3 manage.py migrate
 python3 manage.py collectstatic --clear --noinput
@@ -9,8 +17,6 @@ touch /srv/logs/gunicorn.log
 touch /srv/logs/access.log
 tail -n 0 -f /srv/logs/*.log &
 
-export SECRET_KEY=supersecretkey
-
 echo Starting Gunicorn.
 exec gunicorn ratecompany.wsgi:application \
     --name ratecompany \
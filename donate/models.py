@@ -1,7 +1,5 @@
 from datetime import datetime
 
-from django.core.cache import cache
-from django.conf import settings
 from django.db import models
 
 
@@ -50,7 +48,3 @@ class Donate(models.Model):
 
     def __str__(self):
         return 'Donate: {} - {} by {}'.format(self.amount, self.coin, self.name)
-
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        cache.delete(settings.DONATE_LIST)
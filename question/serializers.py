@@ -1,4 +1,5 @@
 from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
 
 from question.models import Question, Answer
@@ -15,6 +16,10 @@ class PublicAnswerSerializer(serializers.Serializer):
     down_vote_count = serializers.ReadOnlyField()
     vote_state = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return utilities.annotate_vote_state(queryset, user)
+
     def to_representation(self, instance):
         instance.vote_count = instance.vote.count()
         instance.down_vote_count = instance.down_vote.count()
@@ -64,6 +69,10 @@ class QuestionSerializer(serializers.Serializer):
         ), instance.id, 'question', instance.title, instance.body)
         return instance
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return utilities.annotate_vote_state(queryset, user)
+
     def to_representation(self, instance):
         # instance.answer = instance.answer_set.all()
         instance.answer_count = instance.answer_set.count()
@@ -108,6 +117,10 @@ class AnswerSerializer(serializers.Serializer):
         ), instance.id, 'answer', None, instance.body)
         return instance
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return utilities.annotate_vote_state(queryset, user)
+
     def to_representation(self, instance):
         instance.vote_count = instance.vote.count()
         instance.down_vote_count = instance.down_vote.count()
@@ -134,9 +147,14 @@ class PublicQuestionSerializer(serializers.Serializer):
     answer_count = serializers.ReadOnlyField()
     vote_state = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        answers = utilities.annotate_vote_state(Answer.objects.all(), user)
+        return utilities.annotate_vote_state(queryset, user).prefetch_related(Prefetch('answer_set', queryset=answers))
+
     def to_representation(self, instance):
         instance.answers = instance.answer_set.all()
-        instance.answer_count = instance.answer_set.count()
+        instance.answer_count = len(instance.answers)
         instance.vote_count = instance.vote.count()
         instance.down_vote_count = instance.down_vote.count()
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
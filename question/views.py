@@ -1,14 +1,13 @@
 from django.core.exceptions import FieldError
-from django.contrib.auth.models import AnonymousUser
 from rest_framework import generics
 from rest_framework import decorators
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from querystring_parser import parser
 
-from utilities import responses
+from utilities import responses, view_counter
 from utilities.tools import create, delete, list_result, update
-from utilities.utilities import CUSTOM_PAGINATION_SCHEMA
+from utilities.utilities import CUSTOM_PAGINATION_SCHEMA, setup_eager_loading
 from utilities import permissions
 from question.models import Question, Answer
 from question.serializers import QuestionSerializer, AnswerSerializer, PublicAnswerSerializer, PublicQuestionSerializer
@@ -71,16 +70,13 @@ class UserQuestionAnswersListView(generics.ListAPIView):
                                               is_deleted=False,
                                               approved=True,
                                               )
-            if not isinstance(request.user, AnonymousUser):
-                question.view.add(request.user)
-            question.total_view += 1
-            question.save()
+            view_counter.register_view(question, request.user)
             result = question.answer_set
             result = result.filter(is_deleted=False)
             if sort:
                 result = result.order_by(sort)
-            result = result.all()
-            total = len(result)
+            total = result.count()
+            result = setup_eager_loading(self.get_serializer_class(), result, request.user)
             result = result[index:size]
             data = self.get_serializer(result, many=True)
             return responses.SuccessResponse(data.data, index=index, total=total).send()
@@ -160,8 +156,7 @@ class AddVoteQuestionView(generics.RetrieveAPIView):
     def get(self, request, question_slug, *args, **kwargs):
         try:
             instance = self.model.objects.get(question_slug=question_slug)
-            if request.user in instance.down_vote.all():
-                instance.down_vote.remove(request.user)
+            instance.down_vote.remove(request.user)
             instance.vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -196,8 +191,7 @@ class AddDownVoteQuestionView(generics.RetrieveAPIView):
     def get(self, request, question_slug, *args, **kwargs):
         try:
             instance = self.model.objects.get(question_slug=question_slug)
-            if request.user in instance.vote.all():
-                instance.vote.remove(request.user)
+            instance.vote.remove(request.user)
             instance.down_vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -232,8 +226,7 @@ class AddVoteAnswerView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.down_vote.all():
-                instance.down_vote.remove(request.user)
+            instance.down_vote.remove(request.user)
             instance.vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -268,8 +261,7 @@ class AddDownVoteAnswerView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.vote.all():
-                instance.vote.remove(request.user)
+            instance.vote.remove(request.user)
             instance.down_vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -4,6 +4,7 @@ import os
 WEB_BASE_PATH = 'https://jobguy.work'
 MEDIA_BASE_PATH = 'https://media.jobguy.work'
 MEDIA_UPLOAD_PATH = 'https://upload.jobguy.work/company'
+MEDIA_VALIDATE_PATH = 'https://upload.jobguy.work/validate/'
 
 # cache
 CACHE_FORGOT_PASSWORD_TOKEN = '_FORGOT_PASSWORD_TOKEN'
@@ -14,7 +15,10 @@ MAX_EMAIL_SEND_COUNT = 3
 MAX_EMAIL_SEND_TIMEOUT = 60 * 60
 
 COMPANY_LIST = 'COMPANY_LIST'
+COMPANY_PROFILE = 'COMPANY_PROFILE_'
 COMPANY_NAME_LIST = 'COMPANY_NAME_LIST'
+COMPANY_NAME_LIST_VERSION = 'COMPANY_NAME_LIST_VERSION'
+COMPANY_NAME_INDEX_CHECK_INTERVAL = 1  # seconds a worker trusts its autocomplete index without checking cache
 CITY_CACHE_LIST = 'CITY_CACHE_LIST'
 
 TOTAL = 'TOTAL'
@@ -27,12 +31,66 @@ TOTAL_INTERVIEW = 'TOTAL_INTERVIEW'
 TOTAL_REVIEW = 'TOTAL_REVIEW'
 TOTAL_USER = 'TOTAL_USER'
 TOTAL_COMPANY = 'TOTAL_COMPANY'
+HOME_TIMELINE = 'HOME_TIMELINE'
+HOME_TIMELINE_READY = 'HOME_TIMELINE_READY'
+
+CACHE_FRESH = '_FRESH'
+CACHE_FILL_LOCK = '_FILL_LOCK'
+CACHE_FRESH_TIMEOUT = 15 * 60  # seconds a cached list is served before one worker recomputes it
+CACHE_TIMEOUT_JITTER = 0.1
+CACHE_FILL_LOCK_TIMEOUT = 30
+CACHE_FILL_WAIT = 2  # seconds a worker waits on a missing value being filled by another one
+CACHE_FILL_POLL_INTERVAL = 0.05
+CACHE_VERSION = '_VERSION'
+CACHE_TAG = 'CACHE_TAG_'
+CACHE_TAG_VERSION = 'CACHE_TAG_VERSION_'
+LOCAL_CACHE_SIZE = 64  # lists kept in memory of every worker
+LOCAL_CACHE_TTL = 60 * 60
+LOCAL_CACHE_CHECK_INTERVAL = 1  # seconds a worker trusts its copy of a list without checking redis
+
+VIEW_COUNTER_TOTAL = 'VIEW_COUNTER_TOTAL_'
+VIEW_COUNTER_DIRTY = 'VIEW_COUNTER_DIRTY_'
+VIEW_COUNTER_VIEWERS = 'VIEW_COUNTER_VIEWERS_'
+VIEW_COUNTER_FLUSHING = '_FLUSHING'
+
+# http client of media and bot services
+HTTP_TIMEOUT = (3.05, 10)  # connect, read seconds
+HTTP_UPLOAD_TIMEOUT = (3.05, 60)
+HTTP_RETRIES = 2
+HTTP_RETRY_BACKOFF = 0.2  # seconds before the first retry, doubled on every next one
+HTTP_CIRCUIT_FAILURES = 5  # failures in a row that open the circuit of a service
+HTTP_CIRCUIT_RESET = 30  # seconds calls fail fast before the next try
+HTTP_POOL_SIZE = 10
+HTTP_METRICS = 'HTTP_METRICS_'
+MEDIA_EXISTS_CACHE = 'MEDIA_EXISTS_'
+MEDIA_EXISTS_TIMEOUT = 24 * 60 * 60
+
+# outbox of telegram messages, emails and tasks
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 30  # seconds after the first failure, doubled on every next one
+OUTBOX_MAX_RETRY_DELAY = 60 * 60
+OUTBOX_SEND_TIMEOUT = 10
+OUTBOX_LEASE = 15 * 60  # seconds a worker has to send a batch before other workers take it over
+OUTBOX_POLL_INTERVAL = 2  # seconds deliver_outbox sleeps while there is nothing to send
+OUTBOX_KEEP_DAYS = 7
+
+BOT_BULK_APPROVE_MAX_ITEMS = 200  # items the moderation bot can approve or reject in one request
+BACKLOG_CHUNK_SIZE = 100  # items of the moderation backlog loaded and sent together
+BACKLOG_CONCURRENCY = 4  # concurrent calls to the bot while sending the backlog, at most HTTP_POOL_SIZE
+BACKLOG_CHECKPOINT = 'MODERATION_BACKLOG_CHECKPOINT'
+
+# response json encoders by preference, the first installed one is used
+JSON_ENCODERS = os.environ.get('JSON_ENCODERS', 'orjson,ujson,simplejson,json').split(',')
 
 # types
 MESSAGE_SHOW_TYPE = {'TOAST': 'TOAST', 'NONE': 'NONE'}
 EMAIL_USERNAME = {'EMAIL': 'EMAIL', 'USERNAME': 'USERNAME'}
 WORK_TIME_KIND = [('NORMAL', 'NORMAL'), ('OVERTIME', 'OVERTIME')]
 
+MIME_SNIFF_SIZE = 8 * 1024  # bytes of an upload read to find its mime type
+UPLOAD_CHUNK_SIZE = 64 * 1024  # uploads are sent to the media server in chunks of this size
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # larger uploads are written to a temporary file instead of memory
 KNOWN_EXTENSION = {'image/png': '.png', 'image/jpeg': '.jpeg', 'image/webp': '.webp'}
 
 # model choices
@@ -3,19 +3,30 @@ from django import forms
 from django.urls import reverse
 from django.utils.html import format_html
 
+from company.models import Company, CompanyStatistics
+from review import timeline
+from utilities import caching
 from .models import Pros, Cons, CompanyReview, Interview, ReviewComment, InterviewComment
 
 
 def approve_company_review(modeladmin, request, queryset):
     queryset.update(approved=True)
-    for item in queryset:
-        item.company.handle_company_review_statics()
+    timeline.add_many(queryset)
+    caching.invalidate_model(queryset.model)
+    companies = Company.objects.filter(id__in=queryset.values('company'))
+    CompanyStatistics.rebuild(companies.values_list('id', flat=True))  # update() skips save
+    for company in companies:
+        company.handle_company_review_statics()
 
 
 def approve_company_interview(modeladmin, request, queryset):
     queryset.update(approved=True)
-    for item in queryset:
-        item.company.handle_company_interview_statics()
+    timeline.add_many(queryset)
+    caching.invalidate_model(queryset.model)
+    companies = Company.objects.filter(id__in=queryset.values('company'))
+    CompanyStatistics.rebuild(companies.values_list('id', flat=True))  # update() skips save
+    for company in companies:
+        company.handle_company_interview_statics()
 
 
 approve_company_review.short_description = 'Approve selected company reviews and update company statics'
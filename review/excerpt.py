@@ -0,0 +1,48 @@
+"""
+plain text excerpts of review and interview descriptions
+
+lists show the first EXCERPT_LENGTH characters of the text of a description, it is stored in the excerpt column
+when a review or interview is saved, so lists neither load the description (up to 40000 characters) nor parse
+its html
+"""
+from bs4 import BeautifulSoup
+from django.db.models import Case, CharField, F, When
+
+EXCERPT_LENGTH = 300
+
+
+def make_excerpt(description):
+    """
+    text of description cut at the last word before EXCERPT_LENGTH, '' if there is none
+    """
+    if not description:
+        return ''
+    body = BeautifulSoup(description.replace('<br>', '<br>\n'), 'html.parser').get_text()
+    if len(body) > EXCERPT_LENGTH:
+        return ' '.join(body[:EXCERPT_LENGTH].split(' ')[:-1]) + ' ...'
+    return body
+
+
+def pending_description():
+    """
+    description of rows whose excerpt is not stored yet (see backfill_excerpts), None for the others
+    """
+    return Case(When(excerpt__isnull=True, then=F('description')), default=None, output_field=CharField())
+
+
+def row_excerpt(excerpt, pending):
+    """
+    stored excerpt, or the excerpt of the pending description of a row that is not backfilled yet
+    """
+    return make_excerpt(pending) if excerpt is None else excerpt
+
+
+def instance_excerpt(instance):
+    """
+    excerpt of a review or interview, its description is read only if the excerpt is not stored yet
+    """
+    if instance.excerpt is not None:
+        return instance.excerpt
+    if hasattr(instance, 'pending_description'):
+        return make_excerpt(instance.pending_description)
+    return make_excerpt(instance.description)
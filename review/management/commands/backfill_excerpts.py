@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from review.excerpt import make_excerpt
+from review.models import CompanyReview, Interview
+from utilities.utilities import bulk_update
+
+
+class Command(BaseCommand):
+    help = 'Store the excerpt of reviews and interviews saved before it existed, lists parse them until then'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help='recompute stored excerpts too')
+
+    def handle(self, *args, **options):
+        for model in [CompanyReview, Interview]:
+            queryset = model.objects.all() if options['all'] else model.objects.filter(excerpt__isnull=True)
+            last_id, total = 0, 0
+            while True:
+                batch = list(queryset.filter(id__gt=last_id).order_by('id').only('id', 'description')
+                             [:options['batch_size']])
+                if not batch:
+                    break
+                for instance in batch:
+                    instance.excerpt = make_excerpt(instance.description)
+                total += bulk_update(model, batch, ['excerpt'], options['batch_size'])
+                last_id = batch[-1].id
+            self.stdout.write('{}: {} excerpts stored'.format(model.__name__, total))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from review import timeline
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the home timeline of approved reviews and interviews in redis from database'
+
+    def handle(self, *args, **options):
+        self.stdout.write('{} items in home timeline'.format(timeline.rebuild()))
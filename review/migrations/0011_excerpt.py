@@ -0,0 +1,23 @@
+# Generated by Django 2.1.5 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('review', '0010_auto_20210627_0913'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companyreview',
+            name='excerpt',
+            field=models.CharField(max_length=400, null=True),
+        ),
+        migrations.AddField(
+            model_name='interview',
+            name='excerpt',
+            field=models.CharField(max_length=400, null=True),
+        ),
+    ]
@@ -1,11 +1,13 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.cache import cache
+from django.db import transaction
 
 from authnz.utilities import handle_user_total_rate
-from company.models import Company
+from company.models import Company, CompanyStatistics
 from job.models import Job
+from review import timeline
+from review.excerpt import make_excerpt
 
 
 class ProsConsBase(models.Model):
@@ -33,7 +35,71 @@ class Cons(ProsConsBase):
         return self.name
 
 
-class CompanyReview(models.Model):
+class CompanyStatisticsModel(models.Model):
+    """
+    review or interview, keeps CompanyStatistics of its company up to date on save and delete
+    """
+    STATISTICS_FIELDS = []
+    STATISTICS_STATE = None  # function of an instance to what it adds to the rollup of its company
+    APPLY_STATISTICS_CHANGE = None  # function of the old and new state that moves the rollup
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields().intersection(cls.STATISTICS_FIELDS):
+            instance._loaded_statistics_state = instance.statistics_state()
+        return instance
+
+    def statistics_state(self):
+        return self.STATISTICS_STATE(self)
+
+    def apply_statistics_change(self, old_state, new_state):
+        self.APPLY_STATISTICS_CHANGE(old_state, new_state)
+
+    def loaded_statistics_state(self):
+        """
+        statistics state as it is in database, None for a new instance
+        """
+        if self._state.adding:
+            return None
+        if not hasattr(self, '_loaded_statistics_state'):
+            self._loaded_statistics_state = type(self).objects.get(pk=self.pk).statistics_state()
+        return self._loaded_statistics_state
+
+    def save(self, *args, **kwargs):
+        old_state, new_state = self.loaded_statistics_state(), self.statistics_state()
+        with transaction.atomic():
+            if old_state != new_state:
+                CompanyStatistics.ensure([state.company_id for state in [old_state, new_state] if state])
+            super().save(*args, **kwargs)
+            self.apply_statistics_change(old_state, new_state)
+        self._loaded_statistics_state = new_state
+
+    def delete(self, *args, **kwargs):
+        old_state = self.loaded_statistics_state()
+        with transaction.atomic():
+            if old_state:
+                CompanyStatistics.ensure([old_state.company_id])
+            result = super().delete(*args, **kwargs)
+            self.apply_statistics_change(old_state, None)
+        return result
+
+
+def set_excerpt(instance, save_kwargs):
+    """
+    excerpt of the description of a review or interview being saved
+    """
+    update_fields = save_kwargs.get('update_fields')
+    if update_fields is None or 'description' in update_fields:
+        instance.excerpt = make_excerpt(instance.description)
+        if update_fields is not None:
+            save_kwargs['update_fields'] = {*update_fields, 'excerpt'}
+
+
+class CompanyReview(CompanyStatisticsModel):
     YEAR = 'YEAR'
     MONTH = 'MONTH'
     DAY = 'DAY'
@@ -61,6 +127,7 @@ class CompanyReview(models.Model):
     anonymous_job = models.BooleanField()
     title = models.CharField(max_length=100)
     description = models.CharField(max_length=40000, null=True)
+    excerpt = models.CharField(max_length=400, null=True)  # plain text of description for lists, see review.excerpt
     salary = models.IntegerField()
     salary_type = models.CharField(choices=SALARY_CHOICES, max_length=10)
     is_deleted = models.BooleanField(default=False)
@@ -79,6 +146,11 @@ class CompanyReview(models.Model):
     reply = models.CharField(max_length=40000, null=True, blank=True)
     reply_created = models.DateTimeField(null=True)
 
+    STATISTICS_FIELDS = ['company_id', 'approved', 'is_deleted', 'salary', 'recommend_to_friend', 'work_life_balance',
+                         'salary_benefit', 'security', 'management', 'culture', 'over_all_rate']
+    STATISTICS_STATE = staticmethod(CompanyStatistics.review_state)
+    APPLY_STATISTICS_CHANGE = staticmethod(CompanyStatistics.apply_review_change)
+
     class Meta:
         ordering = ('-created',)
 
@@ -88,16 +160,19 @@ class CompanyReview(models.Model):
     def get_absolute_url(self):
         return '/review/{}'.format(self.id)
 
-    def save(self, *args, **kwargs):
-        cache.delete(settings.BEST_COMPANY_LIST)
-        cache.delete(settings.DISCUSSED_COMPANY_LIST)
-        cache.delete(settings.TOTAL_REVIEW)
+    def save(self, *args, update_creator=True, **kwargs):
+        """
+        :param update_creator: recompute the review count and rate of the creator, moderation does not change them
+        """
+        set_excerpt(self, kwargs)
         super().save(*args, **kwargs)
-        self.creator.profile.total_review, self.creator.profile.rate_avg = handle_user_total_rate(self.creator)
-        self.creator.save()
+        transaction.on_commit(lambda: timeline.sync(self))
+        if update_creator:
+            self.creator.profile.total_review, self.creator.profile.rate_avg = handle_user_total_rate(self.creator)
+            self.creator.save()
 
 
-class Interview(models.Model):
+class Interview(CompanyStatisticsModel):
     YEAR = 'YEAR'
     MONTH = 'MONTH'
     DAY = 'DAY'
@@ -127,6 +202,7 @@ class Interview(models.Model):
     total_rate = models.IntegerField(choices=settings.RATE_CHOICES)
     title = models.CharField(max_length=100)
     description = models.CharField(max_length=40000, null=True)
+    excerpt = models.CharField(max_length=400, null=True)  # plain text of description for lists, see review.excerpt
     asked_salary = models.IntegerField()
     offered_salary = models.IntegerField()
     is_deleted = models.BooleanField(default=False)
@@ -145,6 +221,10 @@ class Interview(models.Model):
     reply = models.CharField(max_length=40000, null=True, blank=True)
     reply_created = models.DateTimeField(null=True)
 
+    STATISTICS_FIELDS = ['company_id', 'approved', 'is_deleted']
+    STATISTICS_STATE = staticmethod(CompanyStatistics.interview_state)
+    APPLY_STATISTICS_CHANGE = staticmethod(CompanyStatistics.apply_interview_change)
+
     class Meta:
         ordering = ('-created',)
 
@@ -154,13 +234,16 @@ class Interview(models.Model):
     def get_absolute_url(self):
         return '/interview/{}'.format(self.id)
 
-    def save(self, *args, **kwargs):
-        cache.delete(settings.BEST_COMPANY_LIST)
-        cache.delete(settings.DISCUSSED_COMPANY_LIST)
-        cache.delete(settings.TOTAL_INTERVIEW)
+    def save(self, *args, update_creator=True, **kwargs):
+        """
+        :param update_creator: recompute the review count and rate of the creator, moderation does not change them
+        """
+        set_excerpt(self, kwargs)
         super().save(*args, **kwargs)
-        self.creator.profile.total_review, self.creator.profile.rate_avg = handle_user_total_rate(self.creator)
-        self.creator.save()
+        transaction.on_commit(lambda: timeline.sync(self))
+        if update_creator:
+            self.creator.profile.total_review, self.creator.profile.rate_avg = handle_user_total_rate(self.creator)
+            self.creator.save()
 
 
 class ReviewComment(models.Model):
@@ -0,0 +1,123 @@
+"""
+moderation of reviews, interviews, questions, answers and comments by the bot
+
+moderate commits the approved state of the items in the request, the work derived from it, company statics and
+score, the telegram channel post and the rejection email, is queued as one outbox task and done by deliver_outbox
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from question.models import Answer, Question
+from review.models import CompanyReview, Interview, InterviewComment, ReviewComment
+from review.utilities import check_notify_to_telegram_channel, get_compnay, send_notice_instance_rejected
+from utilities import outbox, utilities
+
+MODELS = {
+    'review': CompanyReview,
+    'interview': Interview,
+    'question': Question,
+    'answer': Answer,
+    'review_comment': ReviewComment,
+    'interview_comment': InterviewComment,
+}
+RELATED = {
+    'review': ['company__city', 'creator'],
+    'interview': ['company__city', 'creator'],
+    'question': ['company', 'creator'],
+    'answer': ['question__company', 'creator'],
+    'review_comment': ['review__company', 'creator'],
+    'interview_comment': ['interview__company', 'creator'],
+}
+TYPE_NAMES_FA = {
+    'review': 'تجربه کاری',
+    'interview': 'تجربه مصاحبه',
+    'question': 'سوال',
+    'answer': 'پاسخ',
+    'review_comment': 'نظر',
+    'interview_comment': 'نظر',
+}
+STATISTICS_TYPES = ('review', 'interview')
+
+
+def load(items, related=False):
+    """
+    :param items: dicts with type and id
+    :return: {(type, id): instance} of items that exist, one query per type
+    """
+    ids = defaultdict(set)
+    for item in items:
+        ids[item['type']].add(item['id'])
+    instances = {}
+    for instance_type, type_ids in ids.items():
+        queryset = MODELS[instance_type].objects.all()
+        if related:
+            queryset = queryset.select_related(*RELATED[instance_type])
+        for instance_id, instance in queryset.in_bulk(type_ids).items():
+            instances[instance_type, instance_id] = instance
+    return instances
+
+
+def lock_order(instances):
+    """
+    sort key of items, every request saves them in this order so that concurrent ones lock rows and company
+    statistics in the same order and do not deadlock
+    """
+    return lambda item: (getattr(instances[item['type'], item['id']], 'company_id', 0), item['type'], item['id'])
+
+
+@transaction.atomic
+def moderate(items):
+    """
+    set approved of items, each a dict with type, id and approved, and queue their derived work
+    :return: items that do not exist
+    """
+    instances = load(items)
+    missing = [item for item in items if (item['type'], item['id']) not in instances]
+    found = sorted((item for item in items if (item['type'], item['id']) in instances), key=lock_order(instances))
+    for item in found:
+        instance = instances[item['type'], item['id']]
+        instance.approved = item['approved']
+        if item['type'] in STATISTICS_TYPES:
+            instance.save(update_fields=['approved'], update_creator=False)
+        else:
+            instance.save(update_fields=['approved'])
+    if found:
+        outbox.enqueue_task(apply_moderation, items=[{'type': item['type'], 'id': item['id'],
+                                                      'approved': item['approved']} for item in found])
+    return missing
+
+
+def channel_message(instance_type, instance):
+    if instance_type == 'review':
+        return 'تجربه کاری {} در {}, را در جابگای بخوانید. \n {} \n {} \n {}'.format(
+            instance.title, instance.company.name, '{}/review/{}'.format(settings.WEB_BASE_PATH, instance.id),
+            '#' + instance.company.city.city_slug, '#review')
+    return 'تجربه مصاحبه {} در {}, را در جابگای بخوانید. \n {} \n {} \n {}'.format(
+        instance.title, instance.company.name, '{}/interview/{}'.format(settings.WEB_BASE_PATH, instance.id),
+        '#' + instance.company.city.city_slug, '#interview')
+
+
+def apply_moderation(items):
+    """
+    outbox task of moderate, recomputes statics of every company once however many of its items were moderated
+    """
+    instances = load(items, related=True)
+    companies = {}
+    for item in items:
+        instance = instances.get((item['type'], item['id']))
+        if instance is None:  # deleted since
+            continue
+        if item['type'] in STATISTICS_TYPES:
+            companies.setdefault(instance.company_id, (instance.company, set()))[1].add(item['type'])
+            if check_notify_to_telegram_channel(item):
+                utilities.telegram_notify_channel(channel_message(item['type'], instance))
+        if not item['approved']:
+            send_notice_instance_rejected(instance.creator, TYPE_NAMES_FA[item['type']],
+                                          get_compnay(instance, item['type']))
+    for company, types in companies.values():
+        if 'review' in types:
+            company.handle_company_review_statics()
+        if 'interview' in types:
+            company.handle_company_interview_statics()
@@ -0,0 +1,77 @@
+"""
+queryset preparation for review and interview serializers
+
+every prepare function adds the joins, prefetches and annotations its serializer reads,
+so serializing a page of reviews runs a constant number of queries instead of 10+ per row
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from review.excerpt import pending_description
+from review.models import CompanyReview, Interview, ReviewComment
+from utilities import utilities
+
+
+def count_subquery(queryset, field_name):
+    """
+    count rows of queryset that point to the outer row through field_name, 0 if there is none
+    """
+    queryset = queryset.filter(**{field_name: OuterRef('pk')}).order_by().values(field_name)
+    return Coalesce(Subquery(queryset.annotate(count=Count('*')).values('count'), output_field=IntegerField()), 0)
+
+
+def m2m_count_subquery(model, field_name):
+    field = model._meta.get_field(field_name)
+    return count_subquery(field.remote_field.through.objects.all(), field.m2m_field_name())
+
+
+def annotate_votes(queryset, user):
+    """
+    vote_count, down_vote_count and the user vote (voted_up, voted_down) used by check_vote_status
+    """
+    model = queryset.model
+    queryset = queryset.annotate(vote_count=m2m_count_subquery(model, 'vote'),
+                                 down_vote_count=m2m_count_subquery(model, 'down_vote'))
+    return utilities.annotate_vote_state(queryset, user)
+
+
+def get_annotated(instance, name, default):
+    """
+    annotated value of instance if its queryset was prepared, else default() (single instances)
+    """
+    value = getattr(instance, name, None)
+    return default() if value is None else value
+
+
+def defer_description(queryset):
+    """
+    lists show the stored excerpt, descriptions are read only for rows not backfilled yet
+    """
+    return queryset.defer('description').annotate(pending_description=pending_description())
+
+
+def prepare_company_review_queryset(queryset, user):
+    queryset = queryset.select_related('company', 'job', 'creator__profile').prefetch_related('pros', 'cons')
+    return annotate_votes(queryset, user).annotate(
+        view_user_count=m2m_count_subquery(CompanyReview, 'view'),
+        comment_count=count_subquery(ReviewComment.objects.all(), 'review'),
+    )
+
+
+def prepare_company_review_list_queryset(queryset, user):
+    queryset = defer_description(queryset.select_related('company', 'job'))
+    return annotate_votes(queryset, user).annotate(view_user_count=m2m_count_subquery(CompanyReview, 'view'))
+
+
+def prepare_interview_queryset(queryset, user):
+    queryset = queryset.select_related('company', 'job', 'creator__profile').prefetch_related('pros', 'cons')
+    return annotate_votes(queryset, user).annotate(view_user_count=m2m_count_subquery(Interview, 'view'))
+
+
+def prepare_interview_list_queryset(queryset, user):
+    queryset = defer_description(queryset.select_related('company', 'job'))
+    return annotate_votes(queryset, user).annotate(view_user_count=m2m_count_subquery(Interview, 'view'))
+
+
+def prepare_comment_queryset(queryset, user):
+    return annotate_votes(queryset, user)
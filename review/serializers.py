@@ -5,7 +5,6 @@ from django.db import transaction
 from django.db.models import Q
 from django.conf import settings
 from rest_framework import serializers
-from bs4 import BeautifulSoup
 
 from review.models import Pros, Cons, CompanyReview, Interview, ReviewComment, InterviewComment
 from review.permissions import (check_create_company_review_permission, check_create_interview_permission,
@@ -14,11 +13,14 @@ from company.models import Company
 from job.models import Job
 from company.serializers import PublicUserCompanySerializer
 from job.serializers import PublicUserJobSerializer
+from review import excerpt
+from review import querysets as review_querysets
 from review import utilities as review_utilities
 from utilities import utilities
+from utilities.serializers import MediaPathsMixin
 
 
-class ProsSerializer(serializers.Serializer):
+class ProsSerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=100, min_length=2)
     icon = serializers.CharField(max_length=50, required=False)
@@ -26,7 +28,7 @@ class ProsSerializer(serializers.Serializer):
     is_deleted = serializers.ReadOnlyField()
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
     @transaction.atomic
@@ -58,7 +60,7 @@ class UserProsSerializer(serializers.Serializer):
     priority = serializers.ReadOnlyField()
 
 
-class ConsSerializer(serializers.Serializer):
+class ConsSerializer(MediaPathsMixin, serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.CharField(max_length=100, min_length=2)
     icon = serializers.CharField(max_length=50, required=False)
@@ -66,7 +68,7 @@ class ConsSerializer(serializers.Serializer):
     is_deleted = serializers.ReadOnlyField()
 
     def validate_logo(self, logo):
-        utilities.check_file_exist(logo)
+        self.check_media('logo', logo)
         return logo
 
     @transaction.atomic
@@ -174,6 +176,7 @@ class CompanyReviewSerializer(serializers.Serializer):
                                                  validated_data['culture']) / 5, 1)
         validated_data['ip'] = utilities.get_client_ip(self.context['request'])
         validated_data['approved'] = False
+        validated_data['has_legal_issue'] = validated_data['company'].has_legal_issue
         company_review = CompanyReview(**validated_data)
         company_review.save()
         for pros_data in pros_list:
@@ -316,24 +319,31 @@ class UserCompanyReviewSerializer(serializers.Serializer):
     total_review = serializers.ReadOnlyField()
     rate_avg = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_company_review_queryset(queryset, user)
+
     def to_representation(self, instance):
-        if self.context['request'].user != instance.creator and instance.anonymous_job:
+        if self.context['request'].user.id != instance.creator_id and instance.anonymous_job:
             instance.job = Job(name='تخصص مخفی', job_slug='')
 
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
-        instance.view_count = instance.view.count() + instance.total_view
+        instance.view_count = review_querysets.get_annotated(instance, 'view_user_count',
+                                                             instance.view.count) + instance.total_view
         instance.over_all_rate = round((instance.work_life_balance + instance.salary_benefit +
                                         instance.security + instance.management + instance.culture) / 5, 1)
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
-        instance.my_review = instance.creator == self.context['request'].user
+        instance.my_review = instance.creator_id == self.context['request'].user.id
         instance.start_date = instance.start_date.strftime('%Y-%m-%d') if instance.start_date else 'نامشخص'
         instance.end_date = instance.end_date.strftime('%Y-%m-%d') if instance.end_date else 'نامشخص'
         instance.reply_created = instance.reply_created.strftime('%Y-%m-%d %H:%M') if instance.reply_created else None
         if instance.description is None:
             instance.description = ''
-        instance.comment_count = instance.reviewcomment_set.count()
+        instance.comment_count = review_querysets.get_annotated(instance, 'comment_count',
+                                                                instance.reviewcomment_set.count)
         if instance.has_legal_issue:
             is_deleted_text = settings.IS_DELETED_TEXT % instance.company.name
             instance.title = is_deleted_text
@@ -373,17 +383,23 @@ class UserCompanyReviewListSerializer(serializers.Serializer):
     approved = serializers.ReadOnlyField()
     has_legal_issue = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_company_review_list_queryset(queryset, user)
+
     def to_representation(self, instance):
         if instance.anonymous_job:
             instance.job = Job(name='تخصص مخفی', job_slug='')
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
-        instance.view_count = instance.view.count() + instance.total_view
+        instance.view_count = review_querysets.get_annotated(instance, 'view_user_count',
+                                                             instance.view.count) + instance.total_view
         instance.over_all_rate = round((instance.work_life_balance + instance.salary_benefit +
                                         instance.security + instance.management + instance.culture) / 5, 1)
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
-        instance.my_review = instance.creator == self.context['request'].user
+        instance.my_review = instance.creator_id == self.context['request'].user.id
         if instance.has_legal_issue:
             is_deleted_text = settings.IS_DELETED_TEXT % instance.company.name
             instance.title = is_deleted_text
@@ -391,16 +407,7 @@ class UserCompanyReviewListSerializer(serializers.Serializer):
             instance.over_all_rate = 0
             instance.salary = 0
         else:
-            if instance.description:
-                instance.description = instance.description.replace('<br>', '<br>\n')
-                soup = BeautifulSoup(instance.description, 'html.parser')
-                body = soup.get_text()
-                if len(body) > 300:
-                    instance.description = ' '.join(body[:300].split(' ')[:-1]) + ' ...'
-                else:
-                    instance.description = body
-            else:
-                instance.description = ''
+            instance.description = excerpt.instance_excerpt(instance)
         instance = super().to_representation(instance)
         return instance
 
@@ -432,21 +439,47 @@ class UserHomeCompanyReviewListSerializer(serializers.Serializer):
             instance['description'] = is_deleted_text
             instance['over_all_rate'] = 0
         else:
-            if instance['description']:
-                instance['description'] = instance['description'].replace('<br>', '<br>\n')
-                soup = BeautifulSoup(instance['description'], 'html.parser')
-                body = soup.get_text()
-                if len(body) > 300:
-                    instance['description'] = ' '.join(body[:300].split(' ')[:-1]) + ' ...'
-                else:
-                    instance['description'] = body
-            else:
-                instance['description'] = ''
+            instance['description'] = excerpt.row_excerpt(instance['excerpt'], instance['pending_description'])
 
         instance = super().to_representation(instance)
         return instance
 
 
+def home_item(row, item):
+    """
+    add id, company, title and description of a home review or interview values() row to item, row is not changed
+    """
+    item['id'] = row['id']
+    item['company'] = {
+        'name': row['company__name'],
+        'name_en': row['company__name_en'],
+        'company_slug': row['company__company_slug'],
+        'logo': row['company__logo'],
+    }
+    if row['has_legal_issue']:
+        item['title'] = item['description'] = settings.IS_DELETED_TEXT % row['company__name']
+    else:
+        item['title'] = row['title']
+        item['description'] = excerpt.row_excerpt(row['excerpt'], row['pending_description'])
+    return item
+
+
+def home_company_review_list(rows, user):
+    """
+    UserHomeCompanyReviewListSerializer of values() rows without rest framework fields
+    """
+    items = []
+    for row in rows:
+        item = home_item(row, {})
+        item['over_all_rate'] = 0 if row['has_legal_issue'] else row['over_all_rate']
+        item['created'] = row['created'].strftime('%Y-%m-%d %H:%M')
+        item['my_review'] = row['creator'] == user.id
+        item['approved'] = row['approved']
+        item['has_legal_issue'] = row['has_legal_issue']
+        items.append(item)
+    return items
+
+
 class InterviewSerializer(serializers.Serializer):
     id = serializers.ReadOnlyField()
     company = PublicUserCompanySerializer()
@@ -515,6 +548,7 @@ class InterviewSerializer(serializers.Serializer):
         validated_data['offered_salary'] = validated_data['offered_salary']
         validated_data['ip'] = utilities.get_client_ip(self.context['request'])
         validated_data['approved'] = False
+        validated_data['has_legal_issue'] = validated_data['company'].has_legal_issue
         interview = Interview(**validated_data)
         interview.save()
         for pros_data in pros_list:
@@ -651,13 +685,19 @@ class UserInterviewSerializer(serializers.Serializer):
     total_review = serializers.ReadOnlyField()
     rate_avg = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_interview_queryset(queryset, user)
+
     def to_representation(self, instance):
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
-        instance.view_count = instance.view.count() + instance.total_view
+        instance.view_count = review_querysets.get_annotated(instance, 'view_user_count',
+                                                             instance.view.count) + instance.total_view
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
-        instance.my_review = instance.creator == self.context['request'].user
+        instance.my_review = instance.creator_id == self.context['request'].user.id
         instance.interview_date = instance.interview_date.strftime('%Y-%m-%d') if instance.interview_date else 'نامشخص'
         instance.reply_created = instance.reply_created.strftime('%Y-%m-%d %H:%M') if instance.reply_created else None
         if instance.description is None:
@@ -700,13 +740,19 @@ class UserInterviewListSerializer(serializers.Serializer):
     approved = serializers.ReadOnlyField()
     has_legal_issue = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_interview_list_queryset(queryset, user)
+
     def to_representation(self, instance):
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
-        instance.view_count = instance.view.count() + instance.total_view
+        instance.view_count = review_querysets.get_annotated(instance, 'view_user_count',
+                                                             instance.view.count) + instance.total_view
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
-        instance.my_review = instance.creator == self.context['request'].user
+        instance.my_review = instance.creator_id == self.context['request'].user.id
         if instance.has_legal_issue:
             is_deleted_text = settings.IS_DELETED_TEXT % instance.company.name
             instance.title = is_deleted_text
@@ -714,16 +760,7 @@ class UserInterviewListSerializer(serializers.Serializer):
             instance.interviewer_rate = 0
             instance.total_rate = 0
         else:
-            if instance.description:
-                instance.description = instance.description.replace('<br>', '<br>\n')
-                soup = BeautifulSoup(instance.description, 'html.parser')
-                body = soup.get_text()
-                if len(body) > 300:
-                    instance.description = ' '.join(body[:300].split(' ')[:-1]) + ' ...'
-                else:
-                    instance.description = body
-            else:
-                instance.description = ''
+            instance.description = excerpt.instance_excerpt(instance)
 
         instance = super().to_representation(instance)
         return instance
@@ -755,21 +792,26 @@ class UserHomeInterviewListSerializer(serializers.Serializer):
             instance['description'] = is_deleted_text
             instance['total_rate'] = 0
         else:
-            if instance['description']:
-                instance['description'] = instance['description'].replace('<br>', '<br>\n')
-                soup = BeautifulSoup(instance['description'], 'html.parser')
-                body = soup.get_text()
-                if len(body) > 300:
-                    instance['description'] = ' '.join(body[:300].split(' ')[:-1]) + ' ...'
-                else:
-                    instance['description'] = body
-            else:
-                instance['description'] = ''
+            instance['description'] = excerpt.row_excerpt(instance['excerpt'], instance['pending_description'])
 
         instance = super().to_representation(instance)
         return instance
 
 
+def home_interview_list(rows):
+    """
+    UserHomeInterviewListSerializer of values() rows without rest framework fields
+    """
+    items = []
+    for row in rows:
+        item = home_item(row, {'total_rate': 0 if row['has_legal_issue'] else row['total_rate']})
+        item['created'] = row['created'].strftime('%Y-%m-%d %H:%M')
+        item['approved'] = row['approved']
+        item['has_legal_issue'] = row['has_legal_issue']
+        items.append(item)
+    return items
+
+
 class ReviewSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     title = serializers.ReadOnlyField()
@@ -811,9 +853,14 @@ class ReviewCommentSerializer(serializers.Serializer):
         ), instance.id, 'review_comment', None, instance.body)
         return instance
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_comment_queryset(queryset, user)
+
     def to_representation(self, instance):
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
         instance = super().to_representation(instance)
@@ -828,9 +875,14 @@ class UserReviewCommentSerializer(serializers.Serializer):
     down_vote_count = serializers.ReadOnlyField()
     created = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_comment_queryset(queryset, user)
+
     def to_representation(self, instance):
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
         instance = super().to_representation(instance)
@@ -873,18 +925,22 @@ class InterviewCommentSerializer(serializers.Serializer):
         ), instance.id, 'interview_comment', None, instance.body)
         return instance
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_comment_queryset(queryset, user)
+
     def to_representation(self, instance):
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
         instance = super().to_representation(instance)
         return instance
 
 
-class BotApproveReviewSerializer(serializers.Serializer):
+class BotApproveItemSerializer(serializers.Serializer):
     id = serializers.IntegerField()
-    key = serializers.CharField(max_length=100)
     type = serializers.ChoiceField(choices=(
         ('review', 'review'),
         ('interview', 'interview'),
@@ -896,6 +952,20 @@ class BotApproveReviewSerializer(serializers.Serializer):
     approved = serializers.BooleanField()
 
 
+class BotApproveReviewSerializer(BotApproveItemSerializer):
+    key = serializers.CharField(max_length=100)
+
+
+class BotBulkApproveReviewSerializer(serializers.Serializer):
+    key = serializers.CharField(max_length=100)
+    items = serializers.ListField(child=BotApproveItemSerializer(), min_length=1,
+                                  max_length=settings.BOT_BULK_APPROVE_MAX_ITEMS)
+
+    def validate_items(self, items):
+        # one decision per item, the last one wins
+        return list({(item['type'], item['id']): item for item in items}.values())
+
+
 class ReplyCompanyReviewSerializer(serializers.Serializer):
     id = serializers.ReadOnlyField()
     company = PublicUserCompanySerializer(read_only=True)
@@ -934,24 +1004,30 @@ class ReplyCompanyReviewSerializer(serializers.Serializer):
     total_review = serializers.ReadOnlyField()
     rate_avg = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_company_review_queryset(queryset, user)
+
     def to_representation(self, instance):
-        if self.context['request'].user != instance.creator and instance.anonymous_job:
+        if self.context['request'].user.id != instance.creator_id and instance.anonymous_job:
             instance.job = Job(name='تخصص مخفی', job_slug='')
 
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
-        instance.view_count = instance.view.count()
+        instance.view_count = review_querysets.get_annotated(instance, 'view_user_count', instance.view.count)
         instance.total_view = instance.total_view
         instance.over_all_rate = round((instance.work_life_balance + instance.salary_benefit +
                                         instance.security + instance.management + instance.culture) / 5, 1)
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
-        instance.my_review = instance.creator == self.context['request'].user
+        instance.my_review = instance.creator_id == self.context['request'].user.id
         instance.start_date = instance.start_date.strftime('%Y-%m-%d') if instance.start_date else 'نامشخص'
         instance.end_date = instance.end_date.strftime('%Y-%m-%d') if instance.end_date else 'نامشخص'
         if instance.description is None:
             instance.description = ''
-        instance.comment_count = instance.reviewcomment_set.count()
+        instance.comment_count = review_querysets.get_annotated(instance, 'comment_count',
+                                                                instance.reviewcomment_set.count)
         instance.salary = round(review_utilities.salary_handler(instance.salary, instance.salary_type, resp=True))
         instance.reply_created = instance.reply_created.strftime('%Y-%m-%d %H:%M') if instance.reply_created else None
         instance.total_review = instance.creator.profile.total_review
@@ -998,14 +1074,19 @@ class ReplyInterviewSerializer(serializers.Serializer):
     total_review = serializers.ReadOnlyField()
     rate_avg = serializers.ReadOnlyField()
 
+    @staticmethod
+    def setup_eager_loading(queryset, user):
+        return review_querysets.prepare_interview_queryset(queryset, user)
+
     def to_representation(self, instance):
-        instance.vote_count = instance.vote.count()
-        instance.down_vote_count = instance.down_vote.count()
+        instance.vote_count = review_querysets.get_annotated(instance, 'vote_count', instance.vote.count)
+        instance.down_vote_count = review_querysets.get_annotated(instance, 'down_vote_count',
+                                                                  instance.down_vote.count)
         instance.vote_state = utilities.check_vote_status(instance, self.context['request'].user)
-        instance.view_count = instance.view.count()
+        instance.view_count = review_querysets.get_annotated(instance, 'view_user_count', instance.view.count)
         instance.total_view = instance.total_view
         instance.created = instance.created.strftime('%Y-%m-%d %H:%M')
-        instance.my_review = instance.creator == self.context['request'].user
+        instance.my_review = instance.creator_id == self.context['request'].user.id
         instance.interview_date = instance.interview_date.strftime('%Y-%m-%d') if instance.interview_date else 'نامشخص'
         if instance.description is None:
             instance.description = ''
@@ -1053,15 +1134,26 @@ class UserHomeReviewListSerializer(serializers.Serializer):
             instance['description'] = is_deleted_text
             instance['over_all_rate'] = 0
         else:
-            if instance['description']:
-                instance['description'] = instance['description'].replace('<br>', '<br>\n')
-                soup = BeautifulSoup(instance['description'], 'html.parser')
-                body = soup.get_text()
-                if len(body) > 300:
-                    instance['description'] = ' '.join(body[:300].split(' ')[:-1]) + ' ...'
-                else:
-                    instance['description'] = body
-            else:
-                instance['description'] = ''
+            instance['description'] = excerpt.row_excerpt(instance['excerpt'], instance['pending_description'])
         instance = super().to_representation(instance)
         return instance
+
+
+def home_review_list(rows):
+    """
+    UserHomeReviewListSerializer of home timeline rows without rest framework fields, interview rows have no
+    over_all_rate unless their company has legal issue
+    """
+    items = []
+    for row in rows:
+        if row['has_legal_issue']:
+            item = {'over_all_rate': 0}
+        else:
+            item = {'over_all_rate': row['over_all_rate']} if 'over_all_rate' in row else {}
+        item = home_item(row, item)
+        item['created'] = row['created'].strftime('%Y-%m-%d %H:%M')
+        item['approved'] = row['approved']
+        item['has_legal_issue'] = row['has_legal_issue']
+        item['type'] = row['type']
+        items.append(item)
+    return items
@@ -1,3 +1,124 @@
-from django.test import TestCase
+import copy
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase
+from rest_framework.test import APIRequestFactory
+
+from review import excerpt, moderation, serializers, views
+
+DESCRIPTION = '<p>محیط کاری خوب<br>حقوق به موقع</p>' + '<b>تجربه</b> ' * 80
+REVIEW_ROW = {
+    'id': 1, 'company__name': 'اسنپ', 'company__name_en': 'Snapp', 'company__company_slug': 'snapp',
+    'company__logo': '/media/logo/snapp.png', 'title': 'تجربه کاری', 'excerpt': None,
+    'pending_description': DESCRIPTION, 'over_all_rate': 4, 'created': datetime.datetime(2020, 3, 1, 10, 30, 15),
+    'has_legal_issue': False, 'approved': True, 'creator': 7,
+}
+INTERVIEW_ROW = dict({key: value for key, value in REVIEW_ROW.items() if key != 'over_all_rate'}, id=2,
+                     total_rate=3)
+
+
+class HomeListTests(SimpleTestCase):
+    """
+    fast path serializers must return what the rest framework serializers return, in the same order
+    """
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+
+    def assertSameOutput(self, output, serializer_class, rows):
+        expected = serializer_class(copy.deepcopy(rows), many=True, context={'request': self.request}).data
+        self.assertEqual(json.dumps(output), json.dumps(expected))
+
+    def test_company_reviews(self):
+        rows = [REVIEW_ROW, dict(REVIEW_ROW, id=3, pending_description=None),
+                dict(REVIEW_ROW, id=4, excerpt='کوتاه', pending_description=None),
+                dict(REVIEW_ROW, id=5, has_legal_issue=True), dict(REVIEW_ROW, id=6, creator=None)]
+        self.assertSameOutput(serializers.home_company_review_list(rows, self.request.user),
+                              serializers.UserHomeCompanyReviewListSerializer, rows)
+
+    def test_interviews(self):
+        rows = [INTERVIEW_ROW, dict(INTERVIEW_ROW, id=3, excerpt='', pending_description=None),
+                dict(INTERVIEW_ROW, id=4, has_legal_issue=True)]
+        self.assertSameOutput(serializers.home_interview_list(rows), serializers.UserHomeInterviewListSerializer,
+                              rows)
+
+    def test_home_feed(self):
+        rows = [dict(REVIEW_ROW, type='REVIEW'), dict(INTERVIEW_ROW, type='INTERVIEW'),
+                dict(REVIEW_ROW, id=3, has_legal_issue=True, type='REVIEW'),
+                dict(INTERVIEW_ROW, id=4, has_legal_issue=True, type='INTERVIEW')]
+        self.assertSameOutput(serializers.home_review_list(rows), serializers.UserHomeReviewListSerializer, rows)
+
+    def test_row_is_not_changed(self):
+        row = dict(REVIEW_ROW, type='REVIEW')
+        serializers.home_review_list([row])
+        self.assertEqual(row, dict(REVIEW_ROW, type='REVIEW'))
+
+
+class ExcerptTests(SimpleTestCase):
+
+    def test_excerpt(self):
+        self.assertEqual(excerpt.make_excerpt('<p>خوب<br>بد</p>'), 'خوب\nبد')
+        self.assertEqual(excerpt.make_excerpt(None), '')
+
+    def test_long_description_is_cut_at_a_word(self):
+        text = excerpt.make_excerpt(DESCRIPTION)
+        self.assertTrue(text.endswith(' ...'))
+        self.assertLessEqual(len(text), excerpt.EXCERPT_LENGTH + len(' ...'))
+        self.assertTrue(text.startswith('محیط کاری خوب\nحقوق به موقع'))
+
+    def test_stored_excerpt_is_read(self):
+        self.assertEqual(excerpt.row_excerpt('stored', DESCRIPTION), 'stored')
+        self.assertEqual(excerpt.row_excerpt(None, DESCRIPTION), excerpt.make_excerpt(DESCRIPTION))
+
+
+class BotBulkApproveTests(SimpleTestCase):
+    """
+    bot_review/bulk/ with the database mocked, moderation.load finds the instances and the derived work is queued
+    """
+
+    def setUp(self):
+        self.instances = {('review', 1): mock.Mock(company_id=2), ('review', 2): mock.Mock(company_id=1),
+                          ('question', 3): mock.Mock(company_id=1)}
+
+    def load(self, items, related=False):
+        keys = {(item['type'], item['id']) for item in items}
+        return {key: instance for key, instance in self.instances.items() if key in keys}
+
+    def post(self, items):
+        request = APIRequestFactory().post('/review/bot_review/bulk/', {'key': settings.BOT_APPROVE_KEY,
+                                                                        'items': items}, format='json')
+        with mock.patch.object(moderation, 'load', side_effect=self.load), \
+                mock.patch.object(moderation.outbox, 'enqueue_task') as enqueue_task, \
+                mock.patch.object(transaction.Atomic, '__enter__'), \
+                mock.patch.object(transaction.Atomic, '__exit__', return_value=False):
+            response = views.BotBulkApproveReviewView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode())['data'], enqueue_task
+
+    def test_bulk_approve(self):
+        data, enqueue_task = self.post([
+            {'type': 'review', 'id': 1, 'approved': True}, {'type': 'review', 'id': 2, 'approved': True},
+            {'type': 'answer', 'id': 9, 'approved': True}, {'type': 'question', 'id': 3, 'approved': False},
+            {'type': 'review', 'id': 1, 'approved': False},
+        ])
+        self.assertEqual(data['not_found'], [{'id': 9, 'type': 'answer', 'approved': True}])
+        # one decision per item, the last one, saved once
+        self.assertIs(self.instances['review', 1].approved, False)
+        self.instances['review', 1].save.assert_called_once_with(update_fields=['approved'], update_creator=False)
+        self.instances['question', 3].save.assert_called_once_with(update_fields=['approved'])
+        # one task for all items, in the order they were saved, by company, type and id
+        enqueue_task.assert_called_once_with(moderation.apply_moderation, items=[
+            {'type': 'question', 'id': 3, 'approved': False}, {'type': 'review', 'id': 2, 'approved': True},
+            {'type': 'review', 'id': 1, 'approved': False},
+        ])
+
+    def test_nothing_found(self):
+        data, enqueue_task = self.post([{'type': 'answer', 'id': 9, 'approved': True}])
+        self.assertEqual(data['not_found'], [{'id': 9, 'type': 'answer', 'approved': True}])
+        enqueue_task.assert_not_called()
@@ -0,0 +1,222 @@
+"""
+home timeline
+
+approved, not deleted reviews and interviews are kept in a redis sorted set scored by created, updated when a
+review or interview is saved, so the home feed reads a window of it and loads only the rows of that window
+instead of ordering and counting the union of both tables on every hit
+
+members are type:id with zero padded ids, so items created at the same time are in one order, (type, id), in redis
+and in cursors, HOME_TIMELINE_READY is set once the set is built, saves update the set even while it is being built
+and the build is merged into it, one worker builds it while the others read the window from database
+"""
+import datetime
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q, Value, CharField
+from django.utils.dateparse import parse_datetime
+from django_redis import get_redis_connection
+
+from review.excerpt import pending_description
+from utilities import caching, cursor
+
+TYPES = {'REVIEW': 'review.CompanyReview', 'INTERVIEW': 'review.Interview'}
+FIELDS = {
+    'REVIEW': ['id', 'company__name', 'company__name_en', 'company__company_slug', 'company__logo', 'title',
+               'excerpt', 'pending_description', 'over_all_rate', 'created', 'has_legal_issue', 'approved', 'creator', 'type'],
+    'INTERVIEW': ['id', 'company__name', 'company__name_en', 'company__company_slug', 'company__logo', 'title',
+                  'excerpt', 'pending_description', 'total_rate', 'created', 'has_legal_issue', 'approved', 'creator', 'type'],
+}
+EPOCH = datetime.datetime(1970, 1, 1)
+REBUILD_BATCH_SIZE = 5000
+
+
+def score(created):
+    """
+    microseconds of created, exact in a double so equal scores mean equal created
+    """
+    return (created - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def member(type_name, item_id):
+    return '{}:{:012d}'.format(type_name, item_id)
+
+
+def item_type(model):
+    return 'REVIEW' if model._meta.label == TYPES['REVIEW'] else 'INTERVIEW'
+
+
+def published(model):
+    return apps.get_model(model).objects.filter(approved=True, is_deleted=False)
+
+
+def sync(instance):
+    """
+    add instance to the timeline if it is shown in home, remove it otherwise
+    """
+    connection = get_redis_connection('default')
+    value = member(item_type(type(instance)), instance.id)
+    if instance.approved and not instance.is_deleted:
+        connection.zadd(settings.HOME_TIMELINE, {value: score(instance.created)})
+    else:
+        connection.zrem(settings.HOME_TIMELINE, value)
+
+
+def add_many(queryset):
+    """
+    add published items of a review or interview queryset, for updates that skip save
+    """
+    connection = get_redis_connection('default')
+    items = {member(item_type(queryset.model), item_id): score(created) for item_id, created in
+             queryset.filter(approved=True, is_deleted=False).values_list('id', 'created')}
+    if items:
+        connection.zadd(settings.HOME_TIMELINE, items)
+
+
+def rebuild():
+    """
+    build the timeline from database aside and merge it with what was saved meanwhile
+    :return: number of items
+    """
+    connection = get_redis_connection('default')
+    building_key = '{}_{}'.format(settings.HOME_TIMELINE, uuid.uuid4().hex)
+    # from here on saves are collected in an empty set, rows read below may be older than them
+    connection.delete(settings.HOME_TIMELINE_READY, settings.HOME_TIMELINE)
+    total = 0
+    for type_name, model in TYPES.items():
+        items = published(model).order_by().values_list('id', 'created').iterator(chunk_size=REBUILD_BATCH_SIZE)
+        batch = {}
+        for item_id, created in items:
+            batch[member(type_name, item_id)] = score(created)
+            if len(batch) == REBUILD_BATCH_SIZE:
+                connection.zadd(building_key, batch)
+                total, batch = total + len(batch), {}
+        if batch:
+            connection.zadd(building_key, batch)
+            total += len(batch)
+    pipe = connection.pipeline()
+    if total:
+        # members removed meanwhile may come back from the build, load drops them on read
+        pipe.zunionstore(settings.HOME_TIMELINE, [settings.HOME_TIMELINE, building_key], aggregate='MAX')
+        pipe.delete(building_key)
+    pipe.set(settings.HOME_TIMELINE_READY, 1)
+    pipe.execute()
+    return total
+
+
+def load(members):
+    """
+    home feed rows of members in their order, members whose row is not published anymore are dropped from the
+    timeline
+    """
+    ids = {type_name: [] for type_name in TYPES}
+    for value in members:
+        type_name, item_id = value.decode().split(':')
+        ids[type_name].append(int(item_id))
+    rows = {}
+    for type_name, model in TYPES.items():
+        if ids[type_name]:
+            for row in published(model).filter(id__in=ids[type_name]).annotate(
+                    type=Value(type_name, output_field=CharField()),
+                    pending_description=pending_description()).values(*FIELDS[type_name]):
+                rows[member(type_name, row['id'])] = row
+    stale = [value for value in members if value.decode() not in rows]
+    if stale:
+        get_redis_connection('default').zrem(settings.HOME_TIMELINE, *stale)
+    return [rows[value.decode()] for value in members if value.decode() in rows]
+
+
+def ready(connection):
+    """
+    whether the timeline can be read, built here if it is missing and no other worker is building it
+    """
+    if connection.exists(settings.HOME_TIMELINE_READY):
+        return True
+    if not caching.acquire(settings.HOME_TIMELINE):
+        return False
+    try:
+        rebuild()
+    finally:
+        caching.release(settings.HOME_TIMELINE)
+    return True
+
+
+def database_window(limit, last=None):
+    """
+    the first limit (member, score) of the timeline after the item last (created, type, id), read from database
+    while the timeline is being built
+    """
+    items = []
+    for type_name, model in TYPES.items():
+        queryset = published(model)
+        if last is not None:
+            created, last_type, last_id = last
+            if type_name < last_type:
+                queryset = queryset.filter(created__lte=created)
+            elif type_name == last_type:
+                queryset = queryset.filter(Q(created__lt=created) | Q(created=created, id__lt=last_id))
+            else:
+                queryset = queryset.filter(created__lt=created)
+        items += [(member(type_name, item_id).encode(), score(created)) for item_id, created in
+                  queryset.order_by('-created', '-id').values_list('id', 'created')[:limit]]
+    items.sort(key=lambda item: (item[1], item[0]), reverse=True)
+    return items[:limit]
+
+
+def database_total():
+    return sum(published(model).count() for model in TYPES.values())
+
+
+def window(start, stop):
+    """
+    :return: (rows of timeline[start:stop], timeline length)
+    """
+    connection = get_redis_connection('default')
+    if not ready(connection):
+        return load([value for value, _ in database_window(stop)[start:]]), database_total()
+    pipe = connection.pipeline()
+    pipe.zrevrange(settings.HOME_TIMELINE, start, stop - 1)
+    pipe.zcard(settings.HOME_TIMELINE)
+    members, total = pipe.execute()
+    return load(members), total
+
+
+def window_after(page_cursor, size):
+    """
+    cursor pagination over (created, type, id) like the union query of the home feed
+    :return: (rows, cursor of the next page or None on the last page, timeline length)
+    """
+    ordering = ['-created', '-type', '-id']
+    last = None
+    if page_cursor:
+        created, last_type, last_id = cursor.decode_cursor(page_cursor, ordering)
+        last = (parse_datetime(created), last_type, last_id)
+    connection = get_redis_connection('default')
+    if not ready(connection):
+        members, total = database_window(size + 1, last), database_total()
+    else:
+        pipe = connection.pipeline()
+        if last is not None:
+            last_score = score(last[0])
+            pipe.zrangebyscore(settings.HOME_TIMELINE, last_score, last_score)
+            pipe.zrevrangebyscore(settings.HOME_TIMELINE, '({}'.format(last_score), '-inf', start=0, num=size + 1,
+                                  withscores=True)
+        else:
+            pipe.zrevrange(settings.HOME_TIMELINE, 0, size, withscores=True)
+        pipe.zcard(settings.HOME_TIMELINE)
+        *windows, total = pipe.execute()
+        if last is not None:
+            # items created at the same time as the last one, members sort like (type, id)
+            last_member = member(last[1], last[2]).encode()
+            members = [(value, last_score) for value in sorted(windows[0], reverse=True) if value < last_member]
+            members += windows[1]
+        else:
+            members = windows[0]
+    if len(members) <= size:
+        return load([value for value, _ in members]), None, total
+    members = members[:size]
+    type_name, item_id = members[-1][0].decode().split(':')
+    next_cursor = cursor.encode_cursor([EPOCH + datetime.timedelta(microseconds=int(members[-1][1])), type_name,
+                                        int(item_id)])
+    return load([value for value, _ in members]), next_cursor, total
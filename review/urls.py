@@ -61,4 +61,5 @@ urlpatterns = [
     path('interview_comment/<int:id>/remove_down_vote/', views.RemoveDownVoteInterviewCommentView.as_view()),
     # bot
     path('bot_review/', views.BotApproveReviewView.as_view()),
+    path('bot_review/bulk/', views.BotBulkApproveReviewView.as_view()),
     ]
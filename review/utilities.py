@@ -1,8 +1,9 @@
 from django.core.cache import cache
-from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 
 from review.models import CompanyReview
+from utilities import outbox
 
 
 def salary_handler(salary, salary_type, resp=False):
@@ -29,11 +30,11 @@ def salary_handler(salary, salary_type, resp=False):
 def check_notify_to_telegram_channel(data):
     if not data["approved"]:
         return False
-    notified = cache.get("CHANNEL_NOTIFY_{}_{}".format(data["type"], data["id"]))
-    if notified:
+    key = "CHANNEL_NOTIFY_{}_{}".format(data["type"], data["id"])
+    if cache.get(key):
         return False
-    cache.set("CHANNEL_NOTIFY_{}_{}".format(data["type"], data["id"]), True,
-              timeout=7*24*60*60)
+    # marked once the channel message is committed, a task rolled back and retried notifies again
+    transaction.on_commit(lambda: cache.set(key, True, timeout=7*24*60*60))
     return True
 
 
@@ -44,8 +45,7 @@ def send_notice_instance_rejected(user, instance_type_fa, company):
         "company_name": company.name,
         "company_slug": company.company_slug,
     })
-    send_mail(subject=subject, message='', from_email=None,
-              recipient_list=[user.email], html_message=message)
+    outbox.enqueue_email(subject, message, [user.email])
 
 
 def get_compnay(instance, instance_type):
@@ -1,25 +1,22 @@
 from querystring_parser import parser
 from django.conf import settings
-from django.core.cache import cache
 from rest_framework import decorators, generics
 from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from rest_framework.throttling import UserRateThrottle
 
-from question.models import Answer, Question
 from review.models import Pros, Cons, CompanyReview, Interview, ReviewComment, InterviewComment
 from review.serializers import (ProsSerializer, UserProsSerializer, ConsSerializer, UserConsSerializer,
                                 CompanyReviewSerializer, UserCompanyReviewSerializer, InterviewSerializer,
                                 UserInterviewSerializer, ReviewCommentSerializer, UserReviewCommentSerializer,
-                                InterviewCommentSerializer, BotApproveReviewSerializer, ReplyCompanyReviewSerializer,
-                                ReplyInterviewSerializer)
-from review.utilities import (check_notify_to_telegram_channel, get_compnay,
-                              send_notice_instance_rejected)
-from utilities import responses, utilities
+                                InterviewCommentSerializer, BotApproveReviewSerializer, BotBulkApproveReviewSerializer,
+                                ReplyCompanyReviewSerializer, ReplyInterviewSerializer)
+from review import moderation
+from utilities import responses, view_counter
 from utilities.exceptions import CustomException
 from utilities.tools import create, delete, list_result, update, retrieve
-from utilities.utilities import CUSTOM_PAGINATION_SCHEMA
+from utilities.utilities import CUSTOM_PAGINATION_SCHEMA, setup_eager_loading
 from utilities import permissions
 
 # Pros
@@ -183,9 +180,10 @@ class AdminCompanyReviewRetrieveView(generics.RetrieveAPIView):
 
     def get(self, request, id, *args, **kwargs):
         try:
-            instance = self.model.objects.get(id=id, is_deleted=False)
+            queryset = setup_eager_loading(self.get_serializer_class(), self.model.objects.all(), request.user)
+            instance = queryset.get(id=id, is_deleted=False)
             if instance.approved or request.user == instance.company.user:
-                instance.view.add(request.user)
+                instance.total_view += view_counter.register_view(instance, request.user, count=False)
                 serialize_data = self.get_serializer(instance)
                 return responses.SuccessResponse(serialize_data.data).send()
             else:
@@ -220,8 +218,7 @@ class AddVoteCompanyReviewView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.down_vote.all():
-                instance.down_vote.remove(request.user)
+            instance.down_vote.remove(request.user)
             instance.vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -243,6 +240,8 @@ class CompanyReviewReplyView(generics.UpdateAPIView):
             serialize_data = self.get_serializer(instance, data=request.data)
             if serialize_data.is_valid(raise_exception=True):
                 self.perform_update(serialize_data)
+                instance = setup_eager_loading(self.get_serializer_class(), self.model.objects.all(),
+                                               request.user).get(id=instance.id)
                 data = self.get_serializer(instance)
                 return responses.SuccessResponse(data.data).send()
         except self.model.DoesNotExist as e:
@@ -280,8 +279,7 @@ class AddDownVoteCompanyReviewView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.vote.all():
-                instance.vote.remove(request.user)
+            instance.vote.remove(request.user)
             instance.down_vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -379,9 +377,10 @@ class AdminInterviewRetrieveView(generics.RetrieveAPIView):
 
     def get(self, request, id, *args, **kwargs):
         try:
-            instance = self.model.objects.get(id=id, is_deleted=False)
+            queryset = setup_eager_loading(self.get_serializer_class(), self.model.objects.all(), request.user)
+            instance = queryset.get(id=id, is_deleted=False)
             if instance.approved or request.user == instance.company.user:
-                instance.view.add(request.user)
+                instance.total_view += view_counter.register_view(instance, request.user, count=False)
                 serialize_data = self.get_serializer(instance)
                 return responses.SuccessResponse(serialize_data.data).send()
             else:
@@ -420,6 +419,8 @@ class CompanyInterReviewReplyView(generics.UpdateAPIView):
             serialize_data = self.get_serializer(instance, data=request.data)
             if serialize_data.is_valid(raise_exception=True):
                 self.perform_update(serialize_data)
+                instance = setup_eager_loading(self.get_serializer_class(), self.model.objects.all(),
+                                               request.user).get(id=instance.id)
                 data = self.get_serializer(instance)
                 return responses.SuccessResponse(data.data).send()
         except self.model.DoesNotExist as e:
@@ -440,8 +441,7 @@ class AddVoteInterviewView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.down_vote.all():
-                instance.down_vote.remove(request.user)
+            instance.down_vote.remove(request.user)
             instance.vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -476,8 +476,7 @@ class AddDownVoteInterviewView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.vote.all():
-                instance.vote.remove(request.user)
+            instance.vote.remove(request.user)
             instance.down_vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -568,9 +567,9 @@ class ReviewCommentListView(generics.ListAPIView):
                         pass
                     else:
                         raise self.model.DoesNotExist
-                serialize_data = self.get_serializer(instance.reviewcomment_set.filter(
-                    is_deleted=False, approved=True
-                ).all(), many=True)
+                comments = instance.reviewcomment_set.filter(is_deleted=False, approved=True)
+                comments = setup_eager_loading(self.get_serializer_class(), comments, request.user)
+                serialize_data = self.get_serializer(comments, many=True)
                 data = serialize_data.data
                 data = sorted(data, key=lambda x: x['vote_count'], reverse=True)
             else:
@@ -599,7 +598,9 @@ class AdminReviewCommentListView(generics.ListAPIView):
                     pass
                 else:
                     raise self.model.DoesNotExist
-            serialize_data = self.get_serializer(instance.reviewcomment_set.filter(is_deleted=False).all(), many=True)
+            comments = setup_eager_loading(self.get_serializer_class(), instance.reviewcomment_set.filter(is_deleted=False),
+                                           request.user)
+            serialize_data = self.get_serializer(comments, many=True)
             arguments = parser.parse(request.GET.urlencode())
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
@@ -624,8 +625,7 @@ class AddVoteReviewCommentView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.down_vote.all():
-                instance.down_vote.remove(request.user)
+            instance.down_vote.remove(request.user)
             instance.vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -660,8 +660,7 @@ class AddDownVoteReviewCommentView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.vote.all():
-                instance.vote.remove(request.user)
+            instance.vote.remove(request.user)
             instance.down_vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -751,9 +750,9 @@ class InterviewCommentListView(generics.ListAPIView):
                         pass
                     else:
                         raise self.model.DoesNotExist
-                serialize_data = self.get_serializer(instance.interviewcomment_set.filter(
-                    is_deleted=False, approved=True
-                ).all(), many=True)
+                comments = instance.interviewcomment_set.filter(is_deleted=False, approved=True)
+                comments = setup_eager_loading(self.get_serializer_class(), comments, request.user)
+                serialize_data = self.get_serializer(comments, many=True)
 
                 data = serialize_data.data
                 data = sorted(data, key=lambda x: x['vote_count'], reverse=True)
@@ -783,7 +782,9 @@ class AdminInterviewCommentListView(generics.ListAPIView):
                     pass
                 else:
                     raise self.model.DoesNotExist
-            serialize_data = self.get_serializer(instance.interviewcomment_set.filter(is_deleted=False).all(), many=True)
+            comments = setup_eager_loading(self.get_serializer_class(), instance.interviewcomment_set.filter(is_deleted=False),
+                                           request.user)
+            serialize_data = self.get_serializer(comments, many=True)
             arguments = parser.parse(request.GET.urlencode())
 
             size = int(arguments.pop('size', 20))
@@ -810,8 +811,7 @@ class AddVoteInterviewCommentView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.down_vote.all():
-                instance.down_vote.remove(request.user)
+            instance.down_vote.remove(request.user)
             instance.vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -846,8 +846,7 @@ class AddDownVoteInterviewCommentView(generics.RetrieveAPIView):
     def get(self, request, id, *args, **kwargs):
         try:
             instance = self.model.objects.get(id=id)
-            if request.user in instance.vote.all():
-                instance.vote.remove(request.user)
+            instance.vote.remove(request.user)
             instance.down_vote.add(request.user)
             serialize_data = self.get_serializer(instance)
             return responses.SuccessResponse(serialize_data.data).send()
@@ -875,6 +874,9 @@ class RemoveDownVoteInterviewCommentView(generics.RetrieveAPIView):
 @decorators.authentication_classes([])
 @decorators.permission_classes([])
 class BotApproveReviewView(generics.CreateAPIView):
+    """
+    approve or reject an item, company statics and notifications are updated in the background
+    """
     serializer_class = BotApproveReviewSerializer
     model = CompanyReview
     throttle_classes = []
@@ -884,64 +886,33 @@ class BotApproveReviewView(generics.CreateAPIView):
             serialize_data = self.get_serializer(data=request.data)
             if serialize_data.is_valid(raise_exception=True):
                 if serialize_data.data["key"] == settings.BOT_APPROVE_KEY:
-                    instance_map = {
-                        "review": CompanyReview,
-                        "interview": Interview,
-                        "question": Question,
-                        "answer": Answer,
-                        "review_comment": ReviewComment,
-                        "interview_comment": InterviewComment,
-                    }
-                    if serialize_data.data["type"] in instance_map.keys():
-                        try:
-                            instance = instance_map[serialize_data.data["type"]].objects.get(
-                                id=serialize_data.data["id"]
-                            )
-                        except (
-                                CompanyReview.DoesNotExist, Interview.DoesNotExist,
-                                Question.DoesNotExist, Answer.DoesNotExist,
-                                ReviewComment.DoesNotExist, InterviewComment.DoesNotExist
-                                ) as e:
-                            raise CustomException(detail="Instance does not Found.",
-                                                  code=404)
-                    else:
-                        raise CustomException(detail="Instance type does not exist.")
-                    instance.approved = serialize_data.data["approved"]
-                    instance.save()
-                    if serialize_data.data["type"] in ["review", "interview"]:
-                        cache.delete(settings.LAST_REVIEWS)
-                        cache.delete(settings.LAST_INTERVIEWS)
-                        if check_notify_to_telegram_channel(serialize_data.data):
-                            if serialize_data.data["type"] == "review":
-                                review_link = "{}/review/{}".format(settings.WEB_BASE_PATH, instance.id)
-                                utilities.telegram_notify_channel(
-                                    "تجربه کاری {} در {}, را در جابگای بخوانید. \n {} \n {} \n {}".format(
-                                        instance.title, instance.company.name, review_link,
-                                        "#" + instance.company.city.city_slug, "#review"))
-                                instance.company.handle_company_review_statics()
-                            elif serialize_data.data["type"] == "interview":
-                                review_link = "{}/interview/{}".format(settings.WEB_BASE_PATH, instance.id)
-                                utilities.telegram_notify_channel(
-                                    "تجربه مصاحبه {} در {}, را در جابگای بخوانید. \n {} \n {} \n {}".format(
-                                        instance.title, instance.company.name, review_link,
-                                        "#"+instance.company.city.city_slug, "#interview"))
-                                instance.company.handle_company_interview_statics()
-                    if not instance.approved:
-                        instance_type = serialize_data.data["type"]
-                        fa_map = {
-                            "review": "تجربه کاری",
-                            "interview": "تجربه مصاحبه",
-                            "question": "سوال",
-                            "answer": "پاسخ",
-                            "review_comment": "نظر",
-                            "interview_comment": "نظر",
-                        }
-                        company = get_compnay(instance, instance_type)
-                        send_notice_instance_rejected(
-                            instance.creator, fa_map[instance_type], company
-                        )
+                    item = {field: serialize_data.data[field] for field in ("type", "id", "approved")}
+                    if moderation.moderate([item]):
+                        raise CustomException(detail="Instance does not Found.", code=404)
                     return responses.SuccessResponse().send()
                 else:
                     raise CustomException(detail="Instance does not Found.", code=404)
         except CustomException as e:
             return responses.ErrorResponse(message=e.detail, status=e.status_code).send()
+
+
+@decorators.authentication_classes([])
+@decorators.permission_classes([])
+class BotBulkApproveReviewView(generics.CreateAPIView):
+    """
+    approve or reject a list of items in one request, items that do not exist are returned in not_found
+    """
+    serializer_class = BotBulkApproveReviewSerializer
+    throttle_classes = []
+
+    def post(self, request):
+        try:
+            serialize_data = self.get_serializer(data=request.data)
+            if serialize_data.is_valid(raise_exception=True):
+                if serialize_data.data["key"] == settings.BOT_APPROVE_KEY:
+                    missing = moderation.moderate(serialize_data.data["items"])
+                    return responses.SuccessResponse({"not_found": missing}).send()
+                else:
+                    raise CustomException(detail="Instance does not Found.", code=404)
+        except CustomException as e:
+            return responses.ErrorResponse(message=e.detail, status=e.status_code).send()
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class UtilitiesConfig(AppConfig):
+    name = 'utilities'
+
+    def ready(self):
+        from utilities import caching
+        caching.connect_signals()
@@ -0,0 +1,310 @@
+"""
+single-flight cache fill
+
+a cached value is kept until it is replaced, next to it a freshness marker expires after a jittered timeout or
+on invalidate, only the worker holding the fill lock recomputes a stale value while the others keep serving the
+previous one, so an invalidation does not make every worker recompute at once
+
+a cached value declares the models or rows it depends on as tags when it is filled, saving or deleting a model of
+TAGGED_MODELS or changing its many to many relations marks the values of its tags stale, a model can add tags of
+rows it belongs to with a cache_tags method, updates that skip save call invalidate_model, values are marked
+stale when the transaction of the change commits
+
+the freshness marker is False while a value is filled and set to True after only if no invalidation deleted it
+meanwhile, so a change committed during the fill is not hidden behind a fresh marker
+
+hot read-only lists can also be kept in a small per-worker cache in front of redis, a worker compares the version
+stamp of its copy with the one in redis at most every LOCAL_CACHE_CHECK_INTERVAL, so most requests neither
+reach redis nor unpickle the list
+"""
+import random
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+from cachetools import TTLCache
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django_redis import get_redis_connection
+
+# models whose tags cached values use, saving other models does not reach redis
+TAGGED_MODELS = ['company.Company', 'company.City', 'company.Province', 'company.Industry', 'company.Benefit',
+                 'company.Gallery', 'review.CompanyReview', 'review.Interview', 'donate.Donate', 'auth.User']
+
+LocalEntry = namedtuple('LocalEntry', ['value', 'version', 'checked'])
+
+
+class Freshness:
+    """
+    whether every value read with get_or_fill(freshness=) was fresh, a response built from a stale value is older
+    than the tag versions and must not be sent with an etag made of them
+    """
+    def __init__(self):
+        self.fresh = True
+
+
+def served_stale(freshness):
+    if freshness is not None:
+        freshness.fresh = False
+
+_local = TTLCache(maxsize=settings.LOCAL_CACHE_SIZE, ttl=settings.LOCAL_CACHE_TTL)
+_local_lock = threading.Lock()
+
+
+def fresh_key(key):
+    return key + settings.CACHE_FRESH
+
+
+def version_key(key):
+    return key + settings.CACHE_VERSION
+
+
+def lock_key(key):
+    return key + settings.CACHE_FILL_LOCK
+
+
+def tag_key(tag):
+    return settings.CACHE_TAG + tag
+
+
+def model_tag(model):
+    """
+    any change of a row of model
+    """
+    return model._meta.label
+
+
+def rows_tag(model):
+    """
+    rows of model created or deleted, for values like counts that do not show the rows
+    """
+    return '{}:rows'.format(model._meta.label)
+
+
+def row_tag(model, pk):
+    return '{}:{}'.format(model._meta.label, pk)
+
+
+def instance_tag(instance):
+    return row_tag(type(instance), instance.pk)
+
+
+def row_tags(instance):
+    """
+    tags of instance and of the rows it belongs to
+    """
+    return [instance_tag(instance), *getattr(instance, 'cache_tags', list)()]
+
+
+def jittered(timeout):
+    """
+    timeout moved randomly by CACHE_TIMEOUT_JITTER, so keys filled together do not expire together
+    """
+    return int(timeout * random.uniform(1 - settings.CACHE_TIMEOUT_JITTER, 1 + settings.CACHE_TIMEOUT_JITTER))
+
+
+def acquire(key):
+    return cache.add(lock_key(key), True, timeout=settings.CACHE_FILL_LOCK_TIMEOUT)
+
+
+def release(key):
+    cache.delete(lock_key(key))
+
+
+def add_to_tags(key, tags):
+    """
+    invalidate_tags of any of tags marks key stale
+    """
+    if tags:
+        pipe = get_redis_connection('default').pipeline()
+        for tag in tags:
+            pipe.sadd(tag_key(tag), key)
+        pipe.execute()
+
+
+def is_fresh(found, key):
+    """
+    :param found: result of cache.get_many with fresh_key(key)
+    """
+    return found.get(fresh_key(key)) is True
+
+
+def start_fill(key, tags=()):
+    """
+    add key to tags and mark it filling, an invalidation of them from here on keeps it stale after finish_fill
+    """
+    add_to_tags(key, tags)
+    cache.set(fresh_key(key), False, timeout=settings.CACHE_FILL_LOCK_TIMEOUT)
+
+
+def finish_fill(key, timeout):
+    # only over the filling marker, an invalidation deleted it
+    cache.set(fresh_key(key), True, timeout=timeout, xx=True)
+
+
+def fill_locked(key, fill, timeout, tags):
+    """
+    :return: (value, version)
+    """
+    try:
+        # tags that are a function of the value are added once it is filled, a change during the first fill of
+        # such a value shows after its fresh timeout
+        start_fill(key, () if callable(tags) else tags)
+        value, version = fill(), uuid.uuid4().hex
+        if callable(tags):
+            add_to_tags(key, tags(value))
+        cache.set_many({key: value, version_key(key): version}, timeout=None)
+        finish_fill(key, jittered(timeout))
+        return value, version
+    finally:
+        release(key)
+
+
+def get_shared(key, fill, timeout, tags, freshness=None):
+    """
+    value from redis, filled by one worker at a time
+    :return: (value, version)
+    """
+    found = cache.get_many([key, fresh_key(key), version_key(key)])
+    if key in found:
+        if not is_fresh(found, key):
+            if acquire(key):
+                return fill_locked(key, fill, timeout, tags)
+            served_stale(freshness)
+        return found[key], found.get(version_key(key))
+    if acquire(key):
+        return fill_locked(key, fill, timeout, tags)
+    deadline = time.monotonic() + settings.CACHE_FILL_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.CACHE_FILL_POLL_INTERVAL)
+        found = cache.get_many([key, fresh_key(key), version_key(key)])
+        if key in found:
+            if not is_fresh(found, key):
+                served_stale(freshness)
+            return found[key], found.get(version_key(key))
+    return fill(), None  # the filling worker is too slow or died, do not keep the request waiting on it
+
+
+def get_or_fill(key, fill, timeout=settings.CACHE_FRESH_TIMEOUT, tags=(), local=False, freshness=None):
+    """
+    :param fill: computes the value on a miss or when it is stale
+    :param timeout: seconds a value is fresh, jittered
+    :param tags: model_tag, rows_tag or instance_tag of everything the value depends on, or a function of the
+    filled value returning them
+    :param local: keep a copy in this worker too, the value is shared between requests so callers must not
+    change it
+    :param freshness: Freshness marked stale if the value returned is stale, a local copy is then checked against
+    redis on every call
+    """
+    if not local:
+        return get_shared(key, fill, timeout, tags, freshness)[0]
+    now = time.monotonic()
+    with _local_lock:
+        entry = _local.get(key)
+    if entry is not None and freshness is None and now - entry.checked < settings.LOCAL_CACHE_CHECK_INTERVAL:
+        return entry.value
+    value = version = None
+    if entry is not None:
+        # only the stamps are read while the local copy is current, not the whole list
+        found = cache.get_many([fresh_key(key), version_key(key)])
+        if found.get(version_key(key)) == entry.version:
+            if is_fresh(found, key):
+                value, version = entry.value, entry.version
+            elif acquire(key):
+                value, version = fill_locked(key, fill, timeout, tags)
+            else:
+                served_stale(freshness)
+                value, version = entry.value, entry.version
+    if version is None:
+        value, version = get_shared(key, fill, timeout, tags, freshness)
+    with _local_lock:
+        if version is None:
+            _local.pop(key, None)
+        else:
+            _local[key] = LocalEntry(value, version, now)
+    return value
+
+
+def invalidate(*keys):
+    """
+    mark values stale, they are served until one worker has recomputed them
+    """
+    cache.delete_many([fresh_key(key) for key in keys])
+
+
+def invalidate_tags(*tags):
+    """
+    mark values of tags stale once the transaction commits, before it a fill would read the old rows again and keep
+    them fresh for the whole timeout
+    """
+    def invalidate_committed():
+        keys = get_redis_connection('default').sunion([tag_key(tag) for tag in tags])
+        if keys:
+            invalidate(*[key.decode() for key in keys])
+
+    transaction.on_commit(invalidate_committed)
+
+
+def invalidate_rows(model, pks):
+    """
+    mark values of rows of model stale, for update() that skips save
+    """
+    invalidate_tags(*[row_tag(model, pk) for pk in pks])
+
+
+def tag_versions(*tags):
+    """
+    version counters of model_tag and rows_tag tags, they change after every committed change of the model, for
+    etags of responses read from database
+    """
+    return [int(version or 0) for version in
+            get_redis_connection('default').mget([settings.CACHE_TAG_VERSION + tag for tag in tags])]
+
+
+def invalidate_model(model, rows=False):
+    """
+    mark values depending on model stale and count a new version of it
+    :param rows: rows of model were created or deleted
+    """
+    tags = [model_tag(model), *([rows_tag(model)] if rows else [])]
+    invalidate_tags(*tags)
+
+    def count_version():
+        pipe = get_redis_connection('default').pipeline()
+        for tag in tags:
+            pipe.incr(settings.CACHE_TAG_VERSION + tag)
+        pipe.execute()
+
+    # after commit and after the invalidation above, so whoever reads the new version also reads the new rows and
+    # finds the values of the old ones stale
+    transaction.on_commit(count_version)
+
+
+def invalidate_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        invalidate_model(sender, rows=created)
+        invalidate_tags(*row_tags(instance))
+
+
+def invalidate_deleted(sender, instance, **kwargs):
+    invalidate_model(sender, rows=True)
+    invalidate_tags(*row_tags(instance))
+
+
+def invalidate_related(sender, instance, action, **kwargs):
+    if action in ['post_add', 'post_remove', 'post_clear']:
+        invalidate_tags(*row_tags(instance))  # not the model tag, votes and views would clear every list
+
+
+def connect_signals():
+    for label in TAGGED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(invalidate_saved, sender=model, dispatch_uid='invalidate_saved_' + label)
+        post_delete.connect(invalidate_deleted, sender=model, dispatch_uid='invalidate_deleted_' + label)
+        for field in model._meta.many_to_many:
+            m2m_changed.connect(invalidate_related, sender=field.remote_field.through,
+                                dispatch_uid='invalidate_related_{}_{}'.format(label, field.name))
@@ -0,0 +1,107 @@
+"""
+keyset (cursor) pagination
+
+the cursor is an opaque token holding the ordering keys of the last row of a page, the next page filters rows
+after it instead of skipping index rows, so every page costs the same as the first one
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.db.models import Q
+from django.utils.translation import ugettext as _
+
+from utilities.exceptions import CustomException
+
+
+def cursor_ordering(ordering):
+    """
+    ordering with a trailing id, so the keys of a row are unique
+    """
+    ordering = [field for field in ordering if field.lstrip('-') not in ['id', 'pk']]
+    return ordering + ['-id' if ordering and ordering[-1].startswith('-') else 'id']
+
+
+def json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError('{} is not a cursor value'.format(type(value).__name__))
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=json_default).encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeError, ValueError):
+        raise CustomException(detail=_('Invalid cursor'), code=400)
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise CustomException(detail=_('Invalid cursor'), code=400)
+    return values
+
+
+def row_value(row, field):
+    if isinstance(row, dict):
+        return row[field]
+    for attr in field.split('__'):
+        row = getattr(row, attr) if row is not None else None
+    return row
+
+
+def after_condition(field, value, descending):
+    """
+    rows whose field comes after value, None if there is none
+    """
+    if value is None:
+        return Q(**{field + '__isnull': False}) if descending else None
+    if descending:
+        return Q(**{field + '__lt': value})
+    return Q(**{field + '__gt': value}) | Q(**{field + '__isnull': True})
+
+
+def keyset_filter(queryset, ordering, values):
+    """
+    rows of queryset after the row with ordering keys values
+    """
+    conditions = []
+    for position, key in enumerate(ordering):
+        condition = Q()
+        for previous, value in zip(ordering[:position], values):
+            previous = previous.lstrip('-')
+            condition &= Q(**{previous + '__isnull': True}) if value is None else Q(**{previous: value})
+        after = after_condition(key.lstrip('-'), values[position], key.startswith('-'))
+        if after is not None:
+            conditions.append(condition & after)
+    if not conditions:
+        return queryset.none()
+    query = conditions[0]
+    for condition in conditions[1:]:
+        query |= condition
+    return queryset.filter(query)
+
+
+def page(queryset, ordering, size):
+    """
+    first size rows of queryset, which must be ordered by ordering
+    :return: (rows, cursor of the next page or None on the last page)
+    """
+    rows = list(queryset[:size + 1])
+    if len(rows) <= size or size <= 0:
+        return rows[:size], None
+    rows = rows[:size]
+    return rows, encode_cursor([row_value(rows[-1], key.lstrip('-')) for key in ordering])
+
+
+def paginate(queryset, ordering, cursor, size):
+    """
+    page of size rows after cursor, the first page if cursor is empty
+    """
+    if cursor:
+        queryset = keyset_filter(queryset, ordering, decode_cursor(cursor, ordering))
+    return page(queryset, ordering, size)
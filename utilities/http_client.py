@@ -0,0 +1,188 @@
+"""
+http client of the media and bot services
+
+every service has one requests session, so a worker keeps its connections alive between calls instead of opening
+a new one per request, every call has a timeout, calls that are safe to repeat are retried with backoff on
+connection errors, timeouts and 5xx responses, the others only when the connection could not be made
+
+after HTTP_CIRCUIT_FAILURES failures in a row the circuit of a service opens and calls fail fast with CircuitOpen
+for HTTP_CIRCUIT_RESET seconds, then one call is let through and closes it again if it succeeds
+
+counts and latencies of calls are added to a redis hash per service, see http_client_metrics
+"""
+import threading
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from django_redis import get_redis_connection
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# upper bounds of the latency histogram in milliseconds
+LATENCY_BUCKETS = [50, 100, 300, 1000, 3000, 10000]
+
+
+class CircuitOpen(requests.ConnectionError):
+    pass
+
+
+def not_sent(error):
+    """
+    the connection could not be made, so the service did not get the request
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def latency_bucket(milliseconds):
+    for bound in LATENCY_BUCKETS:
+        if milliseconds <= bound:
+            return 'le_{}'.format(bound)
+    return 'le_inf'
+
+
+class MultipartStream:
+    """
+    multipart/form-data body that reads the file in chunks while it is sent, requests sends an iterable with a length
+    as a stream with that Content-Length instead of building the whole body in memory like it does for files=
+    """
+
+    def __init__(self, fields, name, file_name, file, content_type, chunk_size=settings.UPLOAD_CHUNK_SIZE):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary={}'.format(self.boundary)
+        self.head = b''.join(self.part_head(key) + str(value).encode() + b'\r\n' for key, value in fields.items())
+        self.head += self.part_head(name, file_name, content_type)
+        self.tail = '\r\n--{}--\r\n'.format(self.boundary).encode()
+        self.file = file
+        self.chunk_size = chunk_size
+        file.seek(0, 2)
+        self.size = file.tell()
+        file.seek(0)
+
+    def part_head(self, name, file_name=None, content_type=None):
+        disposition = 'form-data; name="{}"'.format(name)
+        if file_name is not None:
+            disposition += '; filename="{}"'.format(file_name.replace('"', '%22').replace('\r', '').replace('\n', ''))
+        lines = ['--' + self.boundary, 'Content-Disposition: ' + disposition]
+        if content_type:
+            lines.append('Content-Type: ' + content_type)
+        return '\r\n'.join(lines + ['', '']).encode()
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self):
+        # starts over on every iteration so a retried call sends the whole body again
+        yield self.head
+        self.file.seek(0)
+        chunk = self.file.read(self.chunk_size)
+        while chunk:
+            yield chunk
+            chunk = self.file.read(self.chunk_size)
+        yield self.tail
+
+
+class ServiceClient:
+    def __init__(self, name, timeout=settings.HTTP_TIMEOUT, retries=settings.HTTP_RETRIES,
+                 backoff=settings.HTTP_RETRY_BACKOFF, circuit_failures=settings.HTTP_CIRCUIT_FAILURES,
+                 circuit_reset=settings.HTTP_CIRCUIT_RESET, pool_size=settings.HTTP_POOL_SIZE, metrics=True):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.circuit_failures = circuit_failures
+        self.circuit_reset = circuit_reset
+        self.metrics = metrics
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened = None  # monotonic time the circuit opened, None while closed
+        self.probing = False
+
+    def allow(self):
+        """
+        False while the circuit is open, lets one probe call through once HTTP_CIRCUIT_RESET has passed
+        """
+        with self.lock:
+            if self.opened is None:
+                return True
+            if self.probing or time.monotonic() - self.opened < self.circuit_reset:
+                return False
+            self.probing = True
+            return True
+
+    def succeeded(self):
+        with self.lock:
+            self.failures, self.opened, self.probing = 0, None, False
+
+    def failed(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.circuit_failures:
+                opened = self.opened is None
+                self.opened, self.probing = time.monotonic(), False
+                return opened
+            return False
+
+    def record(self, **counts):
+        if not self.metrics:
+            return
+        try:
+            pipe = get_redis_connection('default').pipeline()
+            for field, count in counts.items():
+                pipe.hincrby(settings.HTTP_METRICS + self.name, field, count)
+            pipe.execute()
+        except Exception:
+            pass  # metrics must not fail the call
+
+    def request(self, method, url, idempotent=False, **kwargs):
+        """
+        :param idempotent: retry timeouts and 5xx responses too, the request may have reached the service
+        :return: response, 5xx responses included once retries are used up
+        :raise CircuitOpen: the service failed too often recently
+        :raise requests.RequestException: connection error or timeout after retries
+        """
+        if not self.allow():
+            self.record(rejected=1)
+            raise CircuitOpen('{} service is unavailable'.format(self.name))
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            start = time.monotonic()
+            error = resp = None
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            milliseconds = int((time.monotonic() - start) * 1000)
+            failed = error is not None or resp.status_code >= 500
+            self.record(calls=1, failures=int(failed), latency_ms=milliseconds, **{latency_bucket(milliseconds): 1})
+            if not failed:
+                self.succeeded()
+                return resp
+            if self.failed():
+                self.record(circuit_opened=1)
+                break
+            repeatable = idempotent or (error is not None and not_sent(error))
+            if attempt >= self.retries or not repeatable or self.opened is not None:
+                break
+            attempt += 1
+            self.record(retries=1)
+            time.sleep(self.backoff * 2 ** (attempt - 1))
+        if error is not None:
+            raise error
+        return resp
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+media = ServiceClient('media')
+bot = ServiceClient('bot')
@@ -0,0 +1,79 @@
+import json
+import random
+import string
+import time
+import timeit
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+
+from utilities import renderers
+
+PERSIAN_LETTERS = 'ابپتثجچحخدذرزژسشصضطظعغفقکگلمنوهی'
+
+
+def random_text(letters, words):
+    return ' '.join(''.join(random.choice(letters) for _ in range(random.randint(2, 8))) for _ in range(words))
+
+
+def company(number):
+    return OrderedDict([
+        ('name', random_text(PERSIAN_LETTERS, 2)), ('company_slug', 'company-{}'.format(number)),
+        ('founded', '2010-01-01'), ('logo', '/media/logo/{}.png'.format(number)),
+        ('city', OrderedDict([('name', random_text(PERSIAN_LETTERS, 1)), ('show_name', random_text(PERSIAN_LETTERS, 1)),
+                              ('city_slug', 'city-{}'.format(number % 30))])),
+        ('description', random_text(PERSIAN_LETTERS, 60)), ('total_review', random.randint(0, 500)),
+        ('total_interview', random.randint(0, 200)), ('salary_min', random.randint(1, 10)),
+        ('salary_max', random.randint(10, 40)), ('over_all_rate', round(random.uniform(1, 5), 1)),
+        ('size', 'M'), ('has_legal_issue', False),
+    ])
+
+
+def review(number):
+    return OrderedDict([
+        ('id', number), ('company', OrderedDict([('name', random_text(PERSIAN_LETTERS, 2)),
+                                                 ('name_en', random_text(string.ascii_lowercase, 2)),
+                                                 ('company_slug', 'company-{}'.format(number)),
+                                                 ('logo', '/media/logo/{}.png'.format(number))])),
+        ('title', random_text(PERSIAN_LETTERS, 6)), ('description', random_text(PERSIAN_LETTERS, 120)),
+        ('over_all_rate', random.randint(1, 5)), ('created', '2020-01-01T10:00:00'),
+        ('has_legal_issue', False), ('approved', True), ('my_review', False), ('type', 'REVIEW'),
+    ])
+
+
+def envelope(data, total):
+    return {'data': data, 'message': None, 'show_type': 'TOAST', 'success': True, 'index': 0, 'total': total,
+            'current_time': round(time.time())}
+
+
+class Command(BaseCommand):
+    help = 'Compare json encoders on company list and home feed responses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=100, help='rows per response')
+        parser.add_argument('--number', type=int, default=200, help='responses encoded per encoder')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        size, number = options['size'], options['number']
+        payloads = {
+            'company list': envelope([company(row) for row in range(size)], size * 10),
+            'home feed': envelope([review(row) for row in range(size)], size * 10),
+        }
+        encoders = [('json.dumps (before)', lambda value: json.dumps(value).encode())]
+        for name in renderers.ENCODERS:
+            encoder = renderers.get_encoder(name)
+            if encoder is None:
+                self.stdout.write('{}: not installed'.format(name))
+            else:
+                encoders.append((name, encoder))
+
+        self.stdout.write('{} rows per response, {} responses, in use: {}'.format(size, number,
+                                                                                renderers.encoder_name))
+        for payload_name, payload in payloads.items():
+            self.stdout.write(payload_name)
+            for name, encoder in encoders:
+                seconds = timeit.timeit(lambda: encoder(payload), number=number)
+                self.stdout.write('  {:<20} {:8.1f} us/response {:8} bytes'.format(
+                    name, seconds / number * 1000000, len(encoder(payload))))
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utilities import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send outbox telegram messages and emails, retry failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help='send what is due and exit')
+
+    def handle(self, *args, **options):
+        purged = 0
+        while True:
+            tried = outbox.deliver_batch(options['batch_size'])
+            if tried:
+                self.stdout.write('{} outbox messages tried'.format(tried))
+                continue
+            if options['once']:
+                return
+            if time.monotonic() - purged > 60 * 60:
+                outbox.purge()
+                purged = time.monotonic()
+            time.sleep(settings.OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from utilities import view_counter
+
+
+class Command(BaseCommand):
+    help = 'Write page views buffered in redis to total_view and view of companies, reviews, interviews and questions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', default=view_counter.COUNTED_MODELS,
+                            help='model labels to flush, e.g. company.Company')
+
+    def handle(self, *args, **options):
+        for label, (totals, viewers) in view_counter.flush_views(options['models']).items():
+            self.stdout.write('{}: views of {} objects, viewers of {} objects'.format(label, totals, viewers))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django_redis import get_redis_connection
+
+from utilities import http_client
+
+
+class Command(BaseCommand):
+    help = 'Show call counts, failures, retries, circuit openings and latency histogram of the media and bot clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='clear the counters after showing them')
+
+    def handle(self, *args, **options):
+        con = get_redis_connection('default')
+        for client in (http_client.media, http_client.bot):
+            key = settings.HTTP_METRICS + client.name
+            metrics = {field.decode(): int(value) for field, value in con.hgetall(key).items()}
+            calls = metrics.get('calls', 0)
+            self.stdout.write('{}: {} calls, {} failures, {} retries, {} rejected, circuit opened {} times'.format(
+                client.name, calls, metrics.get('failures', 0), metrics.get('retries', 0),
+                metrics.get('rejected', 0), metrics.get('circuit_opened', 0)))
+            if calls:
+                self.stdout.write('    mean latency {} ms'.format(metrics.get('latency_ms', 0) // calls))
+            for bound in http_client.LATENCY_BUCKETS + ['inf']:
+                field = 'le_{}'.format(bound)
+                if field in metrics:
+                    self.stdout.write('    <= {} ms: {}'.format(bound, metrics[field]))
+            if options['reset']:
+                con.delete(key)
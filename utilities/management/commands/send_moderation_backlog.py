@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utilities import http_client
+from utilities.send_notif_pre_content import send_notif
+
+
+class Command(BaseCommand):
+    help = 'Send reviews, interviews, comments, questions and answers waiting for moderation to the bot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restart', action='store_true', help='start over instead of resuming the last run')
+        parser.add_argument('--chunk-size', type=int, default=settings.BACKLOG_CHUNK_SIZE)
+        parser.add_argument('--concurrency', type=int, default=settings.BACKLOG_CONCURRENCY)
+
+    def handle(self, *args, **options):
+        try:
+            sent, queued = send_notif(options['restart'], options['chunk_size'], options['concurrency'])
+        except http_client.CircuitOpen as e:
+            raise CommandError('{}, run again to resume'.format(e))
+        self.stdout.write('{} items sent, {} left to deliver_outbox'.format(sent, queued))
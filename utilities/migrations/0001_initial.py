@@ -0,0 +1,33 @@
+# Generated by Django 2.1.5 on 2026-10-18 12:00
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('TELEGRAM', 'TELEGRAM'), ('CHANNEL', 'CHANNEL'), ('EMAIL', 'EMAIL')], max_length=10)),
+                ('payload', django.contrib.postgres.fields.jsonb.JSONField()),
+                ('status', models.CharField(choices=[('PENDING', 'PENDING'), ('SENT', 'SENT'), ('FAILED', 'FAILED')], default='PENDING', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(auto_now_add=True)),
+                ('last_error', models.CharField(blank=True, max_length=1000, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('sent', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='outboxmessage',
+            index_together={('status', 'next_attempt')},
+        ),
+    ]
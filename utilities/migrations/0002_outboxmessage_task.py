@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='kind',
+            field=models.CharField(choices=[('TELEGRAM', 'TELEGRAM'), ('CHANNEL', 'CHANNEL'), ('EMAIL', 'EMAIL'), ('TASK', 'TASK')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+
+
+class OutboxMessage(models.Model):
+    """
+    telegram message, email or task written with the change that causes it and delivered by deliver_outbox
+    """
+    TELEGRAM = 'TELEGRAM'
+    TELEGRAM_CHANNEL = 'CHANNEL'
+    EMAIL = 'EMAIL'
+    TASK = 'TASK'
+    KIND_CHOICES = ((TELEGRAM, TELEGRAM), (TELEGRAM_CHANNEL, TELEGRAM_CHANNEL), (EMAIL, EMAIL), (TASK, TASK))
+    PENDING = 'PENDING'
+    SENT = 'SENT'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = ((PENDING, PENDING), (SENT, SENT), (FAILED, FAILED))
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    payload = JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(auto_now_add=True)
+    last_error = models.CharField(max_length=1000, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True)
+
+    class Meta:
+        index_together = [('status', 'next_attempt')]
+
+    def __str__(self):
+        return '{} {}'.format(self.kind, self.id)
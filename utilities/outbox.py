@@ -0,0 +1,136 @@
+"""
+outbox of telegram messages, emails and tasks
+
+request handlers write messages to the outbox table in their own transaction instead of calling the bot or the
+smtp server, so a slow third party does not hold a gunicorn worker and a rolled back change sends nothing,
+deliver_outbox sends them in batches over kept alive connections and retries failures with exponential backoff
+
+tasks are functions called by deliver_outbox with the kwargs they were queued with, for work derived from a change
+that the request does not need to wait on
+"""
+import datetime
+import random
+
+from django.conf import settings
+from django.core import mail
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from utilities import http_client
+from utilities.models import OutboxMessage
+
+TELEGRAM_URLS = {
+    OutboxMessage.TELEGRAM: 'https://bot.jobguy.work/api/message',
+    OutboxMessage.TELEGRAM_CHANNEL: 'https://bot.jobguy.work/api/public/message',
+}
+
+
+def enqueue(kind, **payload):
+    return OutboxMessage.objects.create(kind=kind, payload=payload)
+
+
+def enqueue_email(subject, html_message, recipient_list):
+    return enqueue(OutboxMessage.EMAIL, subject=subject, html_message=html_message, recipient_list=recipient_list)
+
+
+def enqueue_task(func, **kwargs):
+    """
+    :param func: module level function, called with kwargs by deliver_outbox, kwargs must be json serializable
+    """
+    return enqueue(OutboxMessage.TASK, task='{}.{}'.format(func.__module__, func.__name__), kwargs=kwargs)
+
+
+def retry_delay(attempts):
+    """
+    seconds before the next attempt, doubled on every failure and jittered so failed batches spread out
+    """
+    delay = min(settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), settings.OUTBOX_MAX_RETRY_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+def send_telegram(message):
+    resp = http_client.bot.post(TELEGRAM_URLS[message.kind], headers={'token': settings.TELEGRAM_BOT_TOKEN},
+                                json=message.payload, timeout=settings.OUTBOX_SEND_TIMEOUT)
+    resp.raise_for_status()
+
+
+def send_email(connection, message):
+    email = mail.EmailMultiAlternatives(subject=message.payload['subject'], body='',
+                                        to=message.payload['recipient_list'], connection=connection)
+    email.attach_alternative(message.payload['html_message'], 'text/html')
+    email.send()
+
+
+def run_task(message, now):
+    # in a transaction so that messages queued by a failed task are not sent, marked sent with its changes so that
+    # a worker stopped before the batch is saved does not run it again
+    with transaction.atomic():
+        import_string(message.payload['task'])(**message.payload['kwargs'])
+        OutboxMessage.objects.filter(id=message.id).update(status=OutboxMessage.SENT, sent=now)
+
+
+def claim(now, batch_size):
+    """
+    lease due pending messages to this worker, in a short transaction that is not held while they are sent
+    """
+    from utilities.utilities import bulk_update
+
+    with transaction.atomic():
+        messages = list(OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+            status=OutboxMessage.PENDING, next_attempt__lte=now).order_by('next_attempt', 'id')[:batch_size])
+        for message in messages:
+            message.next_attempt = now + datetime.timedelta(seconds=settings.OUTBOX_LEASE)
+        bulk_update(OutboxMessage, messages, ['next_attempt'])
+    return messages
+
+
+def deliver_batch(batch_size=settings.OUTBOX_BATCH_SIZE):
+    """
+    send due pending messages, leased so that parallel workers skip them, a worker stopped while sending leaves its
+    messages to be tried again when the lease ends
+    :return: number of messages tried
+    """
+    from utilities.utilities import bulk_update
+
+    now = datetime.datetime.now()
+    messages = claim(now, batch_size)
+    if not messages:
+        return 0
+    connection = None
+    try:
+        for message in messages:
+            try:
+                if message.kind == OutboxMessage.EMAIL:
+                    if connection is None:
+                        connection = mail.get_connection()
+                        connection.open()
+                    send_email(connection, message)
+                elif message.kind == OutboxMessage.TASK:
+                    run_task(message, now)
+                else:
+                    send_telegram(message)
+            except http_client.CircuitOpen:
+                # the bot is down, try again without using up attempts
+                message.next_attempt = now + datetime.timedelta(seconds=settings.HTTP_CIRCUIT_RESET)
+            except Exception as e:
+                message.attempts += 1
+                message.last_error = str(e)[:1000]
+                if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    message.status = OutboxMessage.FAILED
+                else:
+                    message.next_attempt = now + datetime.timedelta(seconds=retry_delay(message.attempts))
+            else:
+                message.status, message.sent = OutboxMessage.SENT, now
+    finally:
+        if connection is not None:
+            connection.close()
+        bulk_update(OutboxMessage, messages, ['status', 'attempts', 'next_attempt', 'last_error', 'sent'])
+    return len(messages)
+
+
+def purge(days=settings.OUTBOX_KEEP_DAYS):
+    """
+    delete messages sent more than days ago
+    """
+    return OutboxMessage.objects.filter(status=OutboxMessage.SENT,
+                                        sent__lt=datetime.datetime.now() - datetime.timedelta(days=days)).delete()[0]
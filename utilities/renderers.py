@@ -0,0 +1,74 @@
+"""
+json encoding of responses
+
+response bodies are encoded straight to bytes by the first installed encoder of JSON_ENCODERS, all of them write
+compact utf-8 json like the rest framework renderer, types json does not know (decimal, lazy translations, dates)
+are converted by the rest framework encoder
+"""
+import importlib
+
+from django.conf import settings
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+_default = JSONEncoder().default
+
+
+def orjson_dumps(module):
+    option = module.OPT_NON_STR_KEYS
+    return lambda value: module.dumps(value, default=_default, option=option)
+
+
+def ujson_dumps(module):
+    return lambda value: module.dumps(value, ensure_ascii=False, escape_forward_slashes=False,
+                                      default=_default).encode()
+
+
+def simplejson_dumps(module):
+    return lambda value: module.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_default).encode()
+
+
+ENCODERS = {
+    'orjson': orjson_dumps,
+    'ujson': ujson_dumps,
+    'simplejson': simplejson_dumps,
+    'json': simplejson_dumps,
+}
+
+
+def get_encoder(name):
+    """
+    :return: function encoding a value to json bytes, None if name is not installed
+    """
+    try:
+        module = importlib.import_module(name)
+    except ImportError:
+        return None
+    return ENCODERS[name](module)
+
+
+def first_encoder(names):
+    """
+    :return: (name, encoder) of the first installed of names, stdlib json if none is
+    """
+    for name in names:
+        encoder = get_encoder(name)
+        if encoder is not None:
+            return name, encoder
+    return 'json', get_encoder('json')
+
+
+encoder_name, dumps = first_encoder(settings.JSON_ENCODERS)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    rest framework json renderer with the response encoder, indented output is left to rest framework
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
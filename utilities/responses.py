@@ -1,22 +1,67 @@
 """
 main response handler, some of response handel throw  middleware
 """
+import hashlib
 import time
 import json
 
 from django.http import HttpResponse
 from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
 from django.utils.translation import ugettext as _
 
+from utilities import renderers
+
+
+def make_etag(*parts):
+    return hashlib.md5(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def request_etag(request, *parts):
+    """
+    etag of a response depending on parts (e.g. caching.tag_versions), the url, the api version and the user
+    """
+    return make_etag(request.get_full_path(), request.version, request.user.id, *parts)
+
+
+def not_modified(request, etag):
+    """
+    304 response if the client has etag, so the view can answer before building the response
+    """
+    response = get_conditional_response(request, etag=quote_etag(etag))
+    if response is not None:
+        response['ETag'] = quote_etag(etag)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+    return response
+
 
 class BaseResponse:
-    def send(self):
+    def send(self, request=None, etag=None):
+        """
+        :param request: answer conditional requests with 304, with etag or a hash of the content
+        """
         status = self.__dict__.pop('status')
-        return HttpResponse(
-            json.dumps(self.__dict__),
+        current_time = self.__dict__.pop('current_time')
+        content = renderers.dumps(self.__dict__)
+        if request is not None and status == 200:
+            etag = etag or hashlib.md5(content).hexdigest()
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+        # current_time is appended after hashing, it changes without the content changing, content is always the
+        # json object of the response attributes dumped above, so it ends with the closing brace
+        separator = b'' if content == b'{}' else b','
+        content = b'%s%s"current_time":%d}' % (content[:-1], separator, current_time)
+        response = HttpResponse(
+            content,
             status=status,
             content_type="application/json"
         )
+        if request is not None and status == 200:
+            response['ETag'] = quote_etag(etag)
+            patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
 
 
 class ErrorResponse(BaseResponse):
@@ -39,6 +84,8 @@ class SuccessResponse(BaseResponse):
         self.success = True
         self.index = kwargs['index'] if kwargs.get('index') is not None else None
         self.total = kwargs['total'] if kwargs.get('total') is not None else None
+        if 'next_cursor' in kwargs:
+            self.next_cursor = kwargs['next_cursor']
         self.status = status
 
 
@@ -1,38 +1,98 @@
+"""
+send items waiting for moderation to the moderation bot, e.g. after the bot lost its queue
+
+items are streamed per type in id order and sent in chunks of BACKLOG_CHUNK_SIZE with BACKLOG_CONCURRENCY calls at a
+time, the last id sent of every type is kept in redis after each chunk so that an interrupted run resumes where it
+stopped, messages the bot did not take are left to deliver_outbox
+"""
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+
 from question.models import Question, Answer
 from review.models import CompanyReview, Interview, ReviewComment, InterviewComment
-from utilities import utilities
-
-
-def send_notif():
-    # review
-    for review in CompanyReview.objects.filter(approved=False):
-        utilities.telegram_notify('Previous review: on {}, \n {}'.format(
-            review.company.name, '#pre_review'
-        ), review.id, 'review', review.title, review.description)
-
-    # interview
-    for interview in Interview.objects.filter(approved=False):
-        utilities.telegram_notify('Previous interview: on {}, \n {}'.format(
-            interview.company.name, '#pre_interview'
-        ), interview.id, 'interview', interview.title, interview.description)
-
-    # comment review
-    for comment in ReviewComment.objects.filter(approved=False):
-        utilities.telegram_notify('Previous Review Comment: {}'.format(
-            '#pre_review_comment'
-        ), comment.id, 'review_comment', None, comment.body)
-    # comment interview
-    for comment in InterviewComment.objects.filter(approved=False):
-        utilities.telegram_notify('Previous Interview Comment: {}'.format(
-            '#pre_interview_comment'
-        ), comment.id, 'interview_comment', None, comment.body)
-    # question
-    for question in Question.objects.filter(approved=False):
-        utilities.telegram_notify('Previous Question: on {}, \n {}'.format(
-            question.company.name, '#pre_question'
-        ), question.id, 'question', question.title, question.body)
-    # answer
-    for answer in Answer.objects.filter(approved=False):
-        utilities.telegram_notify('New Answer: on {}, \n {}'.format(
-            answer.question.company.name, '#answer'
-        ), answer.id, 'answer', None, answer.body)
+from utilities import http_client, outbox
+from utilities.models import OutboxMessage
+
+
+def review_payload(review):
+    return {'content': 'Previous review: on {}, \n {}'.format(review.company.name, '#pre_review'),
+            'id': review.id, 'type': 'review', 'title': review.title, 'body': review.description}
+
+
+def interview_payload(interview):
+    return {'content': 'Previous interview: on {}, \n {}'.format(interview.company.name, '#pre_interview'),
+            'id': interview.id, 'type': 'interview', 'title': interview.title, 'body': interview.description}
+
+
+def review_comment_payload(comment):
+    return {'content': 'Previous Review Comment: {}'.format('#pre_review_comment'),
+            'id': comment.id, 'type': 'review_comment', 'title': None, 'body': comment.body}
+
+
+def interview_comment_payload(comment):
+    return {'content': 'Previous Interview Comment: {}'.format('#pre_interview_comment'),
+            'id': comment.id, 'type': 'interview_comment', 'title': None, 'body': comment.body}
+
+
+def question_payload(question):
+    return {'content': 'Previous Question: on {}, \n {}'.format(question.company.name, '#pre_question'),
+            'id': question.id, 'type': 'question', 'title': question.title, 'body': question.body}
+
+
+def answer_payload(answer):
+    return {'content': 'New Answer: on {}, \n {}'.format(answer.question.company.name, '#answer'),
+            'id': answer.id, 'type': 'answer', 'title': None, 'body': answer.body}
+
+
+SOURCES = [
+    ('review', CompanyReview.objects.select_related('company'), review_payload),
+    ('interview', Interview.objects.select_related('company'), interview_payload),
+    ('review_comment', ReviewComment.objects.all(), review_comment_payload),
+    ('interview_comment', InterviewComment.objects.all(), interview_comment_payload),
+    ('question', Question.objects.select_related('company'), question_payload),
+    ('answer', Answer.objects.select_related('question__company'), answer_payload),
+]
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def send(message):
+    try:
+        outbox.send_telegram(message)
+    except Exception as e:
+        message.last_error = str(e)[:1000]
+        return False
+    return True
+
+
+def send_notif(restart=False, chunk_size=settings.BACKLOG_CHUNK_SIZE, concurrency=settings.BACKLOG_CONCURRENCY):
+    """
+    :param restart: start over instead of resuming an interrupted run
+    :return: number of messages sent and number of messages left to deliver_outbox
+    :raise CircuitOpen: the bot is unavailable, the run resumes from the last chunk next time
+    """
+    checkpoint = {} if restart else cache.get(settings.BACKLOG_CHECKPOINT) or {}
+    sent = queued = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for instance_type, queryset, payload in SOURCES:
+            items = queryset.filter(approved=False, id__gt=checkpoint.get(instance_type, 0)).order_by('id')
+            for chunk in chunks(items.iterator(chunk_size=chunk_size), chunk_size):
+                messages = [OutboxMessage(kind=OutboxMessage.TELEGRAM, payload=payload(item)) for item in chunk]
+                failed = [message for message, ok in zip(messages, pool.map(send, messages)) if not ok]
+                OutboxMessage.objects.bulk_create(failed)
+                sent, queued = sent + len(messages) - len(failed), queued + len(failed)
+                checkpoint[instance_type] = chunk[-1].id
+                cache.set(settings.BACKLOG_CHECKPOINT, checkpoint, timeout=None)
+                if http_client.bot.opened is not None:
+                    raise http_client.CircuitOpen('bot service is unavailable, {} sent, {} queued'.format(sent, queued))
+    cache.delete(settings.BACKLOG_CHECKPOINT)
+    return sent, queued
@@ -1,9 +1,11 @@
-import magic
 from django.conf import settings
 from django.utils.translation import ugettext as _
 from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
 
 from config.utilities import get_int_config_value
+from utilities import utilities
 
 
 def file_validator(file):
@@ -16,9 +18,8 @@ def file_validator(file):
     :param file:
     :return:
     """
-    mime = magic.from_buffer(file.read(), mime=True)
+    mime = utilities.sniff_mime(file)
     file_type = settings.KNOWN_EXTENSION.get(mime)
-    file.seek(0)
     if not file_type:
         raise serializers.ValidationError(_('{} type is not supported'.format(mime)))
     max_file_size = get_int_config_value('MAX_FILE_SIZE')
@@ -27,6 +28,51 @@ def file_validator(file):
                                           format(max_file_size, file.size)))
 
 
+class MediaPathsMixin:
+    """
+    validate media paths of a serializer and its nested serializers with one batched check after the other fields,
+    validate_<field> methods call check_media instead of checking the path on their own
+    """
+
+    def media_owner(self):
+        owner, node = self, self.parent
+        while node is not None:
+            if isinstance(node, MediaPathsMixin):
+                owner = node
+            node = node.parent
+        return owner
+
+    def check_media(self, field_name, path):
+        owner = self.media_owner()
+        if not hasattr(owner, '_media_paths'):  # not run by is_valid
+            utilities.check_file_exist(path)
+            return
+        names, node = [field_name], self
+        while node is not owner:
+            if node.field_name:
+                names.insert(0, node.field_name)
+            node = node.parent
+        owner._media_paths.setdefault(path, []).append('.'.join(names))
+
+    def run_validation(self, data=empty):
+        if self.media_owner() is not self:
+            return super().run_validation(data)
+        self._media_paths = {}
+        try:
+            value = super().run_validation(data)
+        finally:
+            media_paths = self._media_paths
+            del self._media_paths
+        try:
+            missing = utilities.check_files_exist(media_paths)
+        except serializers.ValidationError as e:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: e.detail})
+        if missing:
+            raise serializers.ValidationError({name: [_('File does not exist')]
+                                               for path in missing for name in media_paths[path]})
+        return value
+
+
 class FileUploadSerializer(serializers.Serializer):
     file = serializers.FileField(validators=[file_validator])
     slug = serializers.SlugField(max_length=150, min_length=5)
@@ -0,0 +1,326 @@
+import datetime
+import email.parser
+import hashlib
+import json
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import SimpleTestCase, override_settings
+from rest_framework import serializers
+
+from utilities import http_client, outbox, utilities
+from utilities.models import OutboxMessage
+from utilities.serializers import MediaPathsMixin
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.calls += 1
+        status, delay = self.server.replies.pop(0) if self.server.replies else (200, 0)
+        time.sleep(delay)
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(HTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # the client went away after a timeout
+
+
+class ServiceClientTests(SimpleTestCase):
+    """
+    retries, timeouts and the circuit breaker against a local stub of the media server
+    """
+
+    def setUp(self):
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)
+        self.server.calls, self.server.replies = 0, []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/validate/'.format(self.server.server_port)
+        self.client = http_client.ServiceClient('test', timeout=(1, 0.5), retries=2, backoff=0,
+                                                circuit_failures=3, circuit_reset=0.2, metrics=False)
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_idempotent_call_is_retried_on_5xx(self):
+        self.server.replies = [(503, 0), (200, 0)]
+        resp = self.client.post(self.url, json={'path': 'a.png'}, idempotent=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.server.calls, 2)
+
+    def test_other_call_is_not_retried_on_5xx(self):
+        self.server.replies = [(503, 0), (200, 0)]
+        resp = self.client.post(self.url, json={'path': 'a.png'})
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(self.server.calls, 1)
+
+    def test_read_timeout(self):
+        self.server.replies = [(200, 1)]
+        with self.assertRaises(requests.Timeout):
+            self.client.post(self.url, json={'path': 'a.png'})
+        self.assertEqual(self.server.calls, 1)
+
+    def test_connection_refused_is_retried(self):
+        port = self.server.server_port
+        self.server.shutdown()
+        self.server.server_close()
+        self.server = StubServer(('127.0.0.1', 0), StubHandler)  # something for tearDown to stop
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        with self.assertRaises(requests.ConnectionError):
+            self.client.post('http://127.0.0.1:{}/validate/'.format(port), json={'path': 'a.png'})
+        self.assertEqual(self.client.failures, 3)
+
+    def test_circuit_opens_and_fails_fast(self):
+        self.server.replies = [(500, 0)] * 3
+        for _ in range(3):
+            self.client.post(self.url, json={'path': 'a.png'})
+        with self.assertRaises(http_client.CircuitOpen):
+            self.client.post(self.url, json={'path': 'a.png'})
+        self.assertEqual(self.server.calls, 3)
+
+    def test_circuit_closes_after_successful_probe(self):
+        self.server.replies = [(500, 0)] * 3
+        for _ in range(3):
+            self.client.post(self.url, json={'path': 'a.png'})
+        time.sleep(0.3)
+        self.assertEqual(self.client.post(self.url, json={'path': 'a.png'}).status_code, 200)
+        self.assertIsNone(self.client.opened)
+        self.assertEqual(self.client.post(self.url, json={'path': 'a.png'}).status_code, 200)
+        self.assertEqual(self.server.calls, 5)
+
+    def test_failed_probe_opens_circuit_again(self):
+        self.server.replies = [(500, 0)] * 4
+        for _ in range(3):
+            self.client.post(self.url, json={'path': 'a.png'})
+        time.sleep(0.3)
+        self.assertEqual(self.client.post(self.url, json={'path': 'a.png'}).status_code, 500)
+        with self.assertRaises(http_client.CircuitOpen):
+            self.client.post(self.url, json={'path': 'a.png'})
+        self.assertEqual(self.server.calls, 4)
+
+
+class LogoSerializer(MediaPathsMixin, serializers.Serializer):
+    logo = serializers.CharField()
+
+    def validate_logo(self, logo):
+        self.check_media('logo', logo)
+        return logo
+
+
+class CoverSerializer(MediaPathsMixin, serializers.Serializer):
+    cover = serializers.CharField()
+    benefit = LogoSerializer(many=True)
+    gallery = serializers.ListField(child=LogoSerializer())
+
+    def validate_cover(self, cover):
+        self.check_media('cover', cover)
+        return cover
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MediaPathsTests(SimpleTestCase):
+    """
+    media paths of a serializer and its nested serializers are validated together and found paths are cached
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.statuses = {}
+        patcher = mock.patch.object(utilities, 'media_file_status', side_effect=lambda path: self.statuses[path])
+        self.media_file_status = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def data(self):
+        return {'cover': 'cover.png', 'benefit': [{'logo': 'a.png'}, {'logo': 'b.png'}],
+                'gallery': [{'logo': 'a.png'}, {'logo': 'c.png'}]}
+
+    def test_one_batch_per_serializer(self):
+        self.statuses = {'cover.png': 200, 'a.png': 200, 'b.png': 200, 'c.png': 200}
+        with mock.patch.object(utilities, 'check_files_exist', wraps=utilities.check_files_exist) as check:
+            self.assertTrue(CoverSerializer(data=self.data()).is_valid())
+        check.assert_called_once()
+        self.assertEqual(self.media_file_status.call_count, 4)
+
+    def test_missing_paths(self):
+        self.statuses = {'cover.png': 200, 'a.png': 404, 'b.png': 200, 'c.png': 200}
+        serializer = CoverSerializer(data=self.data())
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(set(serializer.errors), {'benefit.logo', 'gallery.logo'})
+
+    def test_found_paths_are_cached(self):
+        self.statuses = {'cover.png': 200, 'a.png': 200, 'b.png': 404, 'c.png': 200}
+        self.assertFalse(CoverSerializer(data=self.data()).is_valid())
+        self.media_file_status.reset_mock()
+        self.assertFalse(CoverSerializer(data=self.data()).is_valid())
+        self.assertEqual([args[0][0] for args in self.media_file_status.call_args_list], ['b.png'])
+
+    def test_connection_error(self):
+        self.statuses = {'cover.png': 200, 'a.png': None, 'b.png': 200, 'c.png': 200}
+        serializer = CoverSerializer(data=self.data())
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('non_field_errors', serializer.errors)
+
+    def test_standalone_serializer(self):
+        self.statuses = {'a.png': 404}
+        serializer = LogoSerializer(data={'logo': 'a.png'})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors, {'logo': ['File does not exist']})
+
+
+PNG_HEAD = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x01\x00\x00\x00\x01\x00\x08\x06\x00\x00\x00'
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        digest, size, body = hashlib.md5(), 0, b''
+        length = int(self.headers['Content-Length'])
+        while size < length:
+            chunk = self.rfile.read(min(64 * 1024, length - size))
+            digest.update(chunk)
+            size += len(chunk)
+            if length < 64 * 1024:
+                body += chunk
+        self.server.received = {'content_type': self.headers['Content-Type'], 'size': size, 'body': body,
+                                'md5': digest.hexdigest()}
+        content = json.dumps({'path': '/company/snapp/logo.png'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class FileUploadTests(SimpleTestCase):
+    """
+    uploads are streamed to the media server in chunks
+    """
+
+    def setUp(self):
+        self.server = StubServer(('127.0.0.1', 0), UploadHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        media = http_client.ServiceClient('media', metrics=False)
+        self.addCleanup(media.session.close)
+        patcher = mock.patch.object(http_client, 'media', media)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        upload_path = override_settings(MEDIA_UPLOAD_PATH='http://127.0.0.1:{}/company'.format(self.server.server_port))
+        upload_path.enable()
+        self.addCleanup(upload_path.disable)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_multipart_body(self):
+        file = SimpleUploadedFile('logo.png', PNG_HEAD + b'\0' * 1000)
+        self.assertEqual(utilities.file_check_name('user', file, 'snapp'), '/company/snapp/logo.png')
+        received = self.server.received
+        message = email.parser.BytesParser().parsebytes(
+            'Content-Type: {}\r\n\r\n'.format(received['content_type']).encode() + received['body'])
+        parts = {part.get_param('name', header='content-disposition'): part for part in message.get_payload()}
+        self.assertEqual(parts['slug'].get_payload(decode=True), b'snapp')
+        self.assertEqual(parts['uploadfile'].get_filename(), 'logo')
+        self.assertEqual(parts['uploadfile'].get_content_type(), 'image/png')
+        self.assertEqual(parts['uploadfile'].get_payload(decode=True), PNG_HEAD + b'\0' * 1000)
+
+    def test_peak_memory(self):
+        size = 20 * 1024 * 1024
+        file = TemporaryUploadedFile('logo.png', 'image/png', size, None)
+        file.write(PNG_HEAD)
+        for _ in range(size // (1024 * 1024)):
+            file.write(b'\0' * 1024 * 1024)
+        self.addCleanup(file.close)
+        tracemalloc.start()
+        try:
+            utilities.file_check_name('user', file, 'snapp')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(self.server.received['size'], size)
+        self.assertLess(peak, 1024 * 1024)
+
+
+class OutboxTests(SimpleTestCase):
+    """
+    leasing and retries of deliver_batch, the database and the bot are mocked
+    """
+
+    def setUp(self):
+        self.now = datetime.datetime(2020, 3, 1, 10, 30)
+        self.message = OutboxMessage(id=1, kind=OutboxMessage.TELEGRAM, payload={'content': 'test'})
+
+    def deliver(self, error):
+        with mock.patch.object(outbox, 'claim', return_value=[self.message]), \
+                mock.patch.object(outbox, 'send_telegram', side_effect=error), \
+                mock.patch.object(utilities, 'bulk_update') as bulk_update:
+            self.assertEqual(outbox.deliver_batch(), 1)
+        bulk_update.assert_called_once_with(OutboxMessage, [self.message],
+                                            ['status', 'attempts', 'next_attempt', 'last_error', 'sent'])
+
+    def test_claimed_messages_are_leased(self):
+        messages = [self.message, OutboxMessage(id=2, kind=OutboxMessage.EMAIL, payload={})]
+        objects = mock.MagicMock()
+        queryset = objects.select_for_update.return_value.filter.return_value.order_by.return_value
+        queryset.__getitem__.return_value = messages
+        with mock.patch.object(OutboxMessage, 'objects', objects), mock.patch.object(outbox, 'transaction'), \
+                mock.patch.object(utilities, 'bulk_update') as bulk_update:
+            self.assertEqual(outbox.claim(self.now, 10), messages)
+        objects.select_for_update.assert_called_once_with(skip_locked=True)
+        objects.select_for_update.return_value.filter.assert_called_once_with(status=OutboxMessage.PENDING,
+                                                                              next_attempt__lte=self.now)
+        queryset.__getitem__.assert_called_once_with(slice(None, 10))
+        lease = self.now + datetime.timedelta(seconds=settings.OUTBOX_LEASE)
+        self.assertEqual([message.next_attempt for message in messages], [lease, lease])
+        bulk_update.assert_called_once_with(OutboxMessage, messages, ['next_attempt'])
+
+    def test_sent(self):
+        self.deliver(None)
+        self.assertEqual(self.message.status, OutboxMessage.SENT)
+        self.assertIsNotNone(self.message.sent)
+
+    def test_failure_is_retried_with_backoff(self):
+        before = datetime.datetime.now()
+        self.deliver(ValueError('bad request'))
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.PENDING, 1))
+        self.assertEqual(self.message.last_error, 'bad request')
+        delay = (self.message.next_attempt - before).total_seconds()
+        self.assertGreaterEqual(delay, settings.OUTBOX_RETRY_DELAY * 0.5 - 1)
+        self.assertLessEqual(delay, settings.OUTBOX_RETRY_DELAY + 1)
+
+        self.message.attempts = 3
+        before = datetime.datetime.now()
+        self.deliver(ValueError('bad request'))
+        delay = (self.message.next_attempt - before).total_seconds()
+        self.assertGreaterEqual(delay, settings.OUTBOX_RETRY_DELAY * 8 * 0.5 - 1)
+        self.assertLessEqual(delay, settings.OUTBOX_RETRY_DELAY * 8 + 1)
+
+    def test_failed_after_max_attempts(self):
+        self.message.attempts = settings.OUTBOX_MAX_ATTEMPTS - 1
+        self.deliver(ValueError('bad request'))
+        self.assertEqual((self.message.status, self.message.attempts),
+                         (OutboxMessage.FAILED, settings.OUTBOX_MAX_ATTEMPTS))
+
+    def test_circuit_open_is_rescheduled_without_an_attempt(self):
+        before = datetime.datetime.now()
+        self.deliver(http_client.CircuitOpen('bot'))
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.PENDING, 0))
+        delay = (self.message.next_attempt - before).total_seconds()
+        self.assertAlmostEqual(delay, settings.HTTP_CIRCUIT_RESET, delta=1)
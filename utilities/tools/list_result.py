@@ -2,10 +2,12 @@ from django.core.exceptions import FieldError
 from rest_framework import generics
 from querystring_parser import parser
 
+from utilities import cursor
 from utilities import responses
 from job.models import Job
 from company.models import City, Province, Company, Gallery, Industry, Benefit
 from utilities import permissions
+from utilities import utilities
 from review.models import Pros, Cons, CompanyReview, Interview
 
 MODELS_HAVE_IS_DELETED = [Job, City, Province, Company, Gallery, Industry, Benefit, CompanyReview, Interview]
@@ -34,8 +36,8 @@ class ListView(generics.ListAPIView):
             result = self.model.objects.filter(**arguments)
             if sort:
                 result = result.order_by(sort)
-            result = result.all()
-            total = len(result)
+            total = result.count()
+            result = utilities.setup_eager_loading(self.get_serializer_class(), result, request.user)
             result = result[index:size]
             data = self.get_serializer(result, many=True)
             return responses.SuccessResponse(data.data, index=index, total=total).send()
@@ -48,6 +50,7 @@ class UserListView(generics.ListAPIView):
     list of items for admins api
 
     with order by, size, index
+    or cursor instead of index, empty for the first page then next_cursor of the previous page
     """
 
     def get(self, request, *args, **kwargs):
@@ -55,6 +58,7 @@ class UserListView(generics.ListAPIView):
             arguments = parser.parse(request.GET.urlencode())
             size = int(arguments.pop('size', 20))
             index = int(arguments.pop('index', 0))
+            page_cursor = arguments.pop('cursor', None)
             size, index = permissions.pagination_permission(request.user, size, index)
             size = index + size
 
@@ -75,8 +79,17 @@ class UserListView(generics.ListAPIView):
             if self.model in [City, Pros, Cons]:
                 result = result.order_by('-priority')
 
-            result = result.all()
-            total = len(result)
+            if page_cursor is not None:
+                ordering = cursor.cursor_ordering(list(result.query.order_by or self.model._meta.ordering))
+                total = None if page_cursor else result.count()
+                result = utilities.setup_eager_loading(self.get_serializer_class(), result.order_by(*ordering),
+                                                       request.user)
+                result, next_cursor = cursor.paginate(result, ordering, page_cursor, size - index)
+                data = self.get_serializer(result, many=True)
+                return responses.SuccessResponse(data.data, total=total, next_cursor=next_cursor).send()
+
+            total = result.count()
+            result = utilities.setup_eager_loading(self.get_serializer_class(), result, request.user)
             result = result[index:size]
             data = self.get_serializer(result, many=True)
             return responses.SuccessResponse(data.data, index=index, total=total).send()
@@ -1,24 +1,33 @@
-from django.contrib.auth.models import AnonymousUser
 from rest_framework import generics
 
 from utilities import responses
+from utilities import utilities, view_counter
 from review.models import CompanyReview, Interview
 from question.models import Question
 
 
+VIEW_FIELDS = ['total_view', 'view_count']
+
+
 class RetrieveView(generics.RetrieveAPIView):
 
     def get(self, request, id, *args, **kwargs):
         try:
-            instance = self.model.objects.get(id=id, is_deleted=False)
+            queryset = utilities.setup_eager_loading(self.get_serializer_class(), self.model.objects.all(), request.user)
+            instance = queryset.get(id=id, is_deleted=False)
             if instance.approved or request.user == instance.creator or (not request.user.is_anonymous and request.user.is_staff):
+                pending = 0
                 if self.model in [CompanyReview, Question, Interview]:
-                    if not isinstance(request.user, AnonymousUser):  # view of company review, question
-                        instance.view.add(request.user)
-                    instance.total_view += 1
-                    instance.save()
-                serialize_data = self.get_serializer(instance)
-                return responses.SuccessResponse(serialize_data.data).send()
+                    pending = view_counter.register_view(instance, request.user)  # view of company review, question
+                data = self.get_serializer(instance).data
+                # etag without the view counts, they change on every hit
+                etag = responses.request_etag(request, {key: value for key, value in data.items()
+                                                        if key not in VIEW_FIELDS})
+                # with the views not flushed yet, like when total_view was saved here
+                for key in VIEW_FIELDS:
+                    if key in data:
+                        data[key] += pending
+                return responses.SuccessResponse(data).send(request, etag)
             else:
                 return responses.ErrorResponse(message='Instance does not Found.', status=404).send()
         except self.model.DoesNotExist as e:
@@ -5,13 +5,14 @@ import random
 import requests
 import re
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from django.core.validators import EmailValidator, ValidationError
 from django.core.cache import cache
 from django.conf import settings
+from django.db.models import BooleanField, Case, Exists, OuterRef, Q, Value, When
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.core.mail import send_mail
 from django.contrib.sites.shortcuts import get_current_site
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
@@ -21,7 +22,8 @@ from django.utils.translation import ugettext as _
 from rest_framework.schemas import AutoSchema
 from rest_framework import serializers
 
-from utilities import exceptions
+from utilities import exceptions, http_client, outbox
+from utilities.models import OutboxMessage
 from config.utilities import get_int_config_value
 
 
@@ -107,7 +109,7 @@ def send_email_confirm(user, request):
         'uid': urlsafe_base64_encode(force_bytes(user.pk)).decode(),
         'token': account_activation_token.make_token(user),
     })
-    resp = send_mail(subject=subject, message='', from_email=None, recipient_list=[user.email], html_message=message)
+    outbox.enqueue_email(subject, message, [user.email])
 
 
 def send_password_forget_token_email(user, request, forgot_password_token):
@@ -118,23 +120,55 @@ def send_password_forget_token_email(user, request, forgot_password_token):
         'domain': current_site.domain,
         'token': forgot_password_token,
     })
-    send_mail(subject=subject, message='', from_email=None, recipient_list=[user.email], html_message=message)
+    outbox.enqueue_email(subject, message, [user.email])
 
 
-def check_file_exist(path):
-    resp = requests.post('https://upload.jobguy.work/validate/', json={'path': path})
-    if resp.status_code == 404:
-        raise serializers.ValidationError(_('File does not exist'))
-    elif resp.status_code == 200:
-        return
+def media_file_status(path):
+    """
+    :return: status code of the media server validation of path, None when it could not be reached
+    """
+    try:
+        return http_client.media.post(settings.MEDIA_VALIDATE_PATH, json={'path': path}, idempotent=True).status_code
+    except requests.RequestException:
+        return None
+
+
+def check_files_exist(paths):
+    """
+    validate media paths, the media server takes one path per call so paths not found in the cache are validated
+    concurrently, paths that exist are cached for MEDIA_EXISTS_TIMEOUT so default logos and covers are not
+    validated again
+    :return: set of paths that do not exist
+    :raise ValidationError: media server connection error
+    """
+    keys = {settings.MEDIA_EXISTS_CACHE + path: path for path in set(paths)}
+    if not keys:
+        return set()
+    found = cache.get_many(list(keys))
+    paths = [path for key, path in keys.items() if key not in found]
+    if len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(paths), settings.HTTP_POOL_SIZE)) as pool:
+            statuses = list(pool.map(media_file_status, paths))
     else:
+        statuses = [media_file_status(path) for path in paths]
+    if any(status not in (200, 404) for status in statuses):
         raise serializers.ValidationError(_('There is an error with media server connection...'))
+    existing = [path for path, status in zip(paths, statuses) if status == 200]
+    cache.set_many({settings.MEDIA_EXISTS_CACHE + path: True for path in existing}, settings.MEDIA_EXISTS_TIMEOUT)
+    return set(paths) - set(existing)
+
+
+def check_file_exist(path):
+    if check_files_exist([path]):
+        raise serializers.ValidationError(_('File does not exist'))
 
 
 CUSTOM_PAGINATION_SCHEMA = AutoSchema(manual_fields=[
     coreapi.Field("index", required=False, location="query", type="integer", description="pagination index"),
     coreapi.Field("size", required=False, location="query", type="integer", description="pagination size"),
     coreapi.Field("order_by", required=False, location="query", type="string", description="sort list"),
+    coreapi.Field("cursor", required=False, location="query", type="string",
+                  description="cursor pagination, empty for the first page then next_cursor of the previous page"),
 ])
 
 
@@ -170,7 +204,11 @@ def check_slug_available(model, key, slug_base):
 
 def file_uploader(user_uid, path):
     if path:
-        resp = requests.post('https://upload.jobguy.work/download/', json={'url': path, 'uid': user_uid})
+        try:
+            resp = http_client.media.post('https://upload.jobguy.work/download/', json={'url': path, 'uid': user_uid},
+                                          timeout=settings.HTTP_UPLOAD_TIMEOUT)
+        except requests.RequestException:
+            raise serializers.ValidationError(_('There is an error with media server connection...'))
         if resp.status_code == 200:
             return resp.json()['path']
         else:
@@ -179,52 +217,119 @@ def file_uploader(user_uid, path):
         return '/user/2e8d9375bbdb401e46d2251c71752b10/image_2019_3_2_11_914343084.jpeg'
 
 
-def file_check_name(user_name, file, slug):
+def sniff_mime(file):
+    """
+    mime type of an uploaded file from its first MIME_SNIFF_SIZE bytes
+    """
     file.seek(0)
-    file_mime = magic.from_buffer(file.read(), mime=True)
+    mime = magic.from_buffer(file.read(settings.MIME_SNIFF_SIZE), mime=True)
     file.seek(0)
-    file_data = {
-        'uploadfile': (''.join(file.name.split('.')[:-1]), file.read(), file_mime),
-    }
+    return mime
+
+
+def file_check_name(user_name, file, slug):
     data = {
         'slug': slug,
         'token': settings.MEDIA_UPLOAD_TOKEN,
     }
-    resp = requests.post(settings.MEDIA_UPLOAD_PATH, files=file_data, data=data)
+    body = http_client.MultipartStream(data, 'uploadfile', ''.join(file.name.split('.')[:-1]), file, sniff_mime(file))
+    try:
+        resp = http_client.media.post(settings.MEDIA_UPLOAD_PATH, data=body, headers={'Content-Type': body.content_type},
+                                      timeout=settings.HTTP_UPLOAD_TIMEOUT)
+    except requests.RequestException:
+        raise serializers.ValidationError(_('There is an error with media server connection...'))
     if resp.status_code == 200:
         return resp.json()['path']
     raise serializers.ValidationError(_('There is an error with media server connection...'))
 
 
 def telegram_notify(content, id=None, type=None, title=None, body=None):
-    try:
-
-        resp = requests.post('https://bot.jobguy.work/api/message', headers={'token': settings.TELEGRAM_BOT_TOKEN},
-                             json={'content': content, 'id': id, 'type': type, 'title': title,
-                                   'body': body})
-    except Exception as e:
-        pass
+    """
+    message to the moderation bot, sent by deliver_outbox after the current transaction commits
+    """
+    outbox.enqueue(OutboxMessage.TELEGRAM, content=content, id=id, type=type, title=title, body=body)
 
 
 def telegram_notify_channel(content):
-    try:
-        resp = requests.post('https://bot.jobguy.work/api/public/message',
-                             headers={'token': settings.TELEGRAM_BOT_TOKEN}, json={'content': content})
-    except Exception as e:
-        pass
+    """
+    post to the public channel, sent by deliver_outbox after the current transaction commits
+    """
+    outbox.enqueue(OutboxMessage.TELEGRAM_CHANNEL, content=content)
 
 
 def uuid_str():
     return ''.join(str(uuid.uuid4()).split('-'))
 
 
+def setup_eager_loading(serializer_class, queryset, user):
+    """
+    let the serializer prepare its queryset (joins, prefetches, annotations) if it knows how
+    """
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        return serializer_class.setup_eager_loading(queryset, user)
+    return queryset
+
+
+def vote_exists_subquery(model, field_name, user):
+    """
+    EXISTS on the vote/down_vote through table for the outer row and user, uses the (object, user) unique index
+    """
+    field = model._meta.get_field(field_name)
+    return Exists(field.remote_field.through.objects.filter(**{field.m2m_field_name(): OuterRef('pk'),
+                                                               field.m2m_reverse_field_name(): user.id}))
+
+
+def annotate_vote_state(queryset, user):
+    """
+    annotate voted_up and voted_down of user, read by check_vote_status
+    """
+    if user.is_anonymous:
+        return queryset.annotate(voted_up=Value(False, output_field=BooleanField()),
+                                 voted_down=Value(False, output_field=BooleanField()))
+    return queryset.annotate(voted_up=vote_exists_subquery(queryset.model, 'vote', user),
+                             voted_down=vote_exists_subquery(queryset.model, 'down_vote', user))
+
+
+def get_vote_states(model, ids, user):
+    """
+    vote state of user for a batch of objects in one query
+    :param model: model with vote and down_vote m2m to user
+    :param ids: object ids
+    :param user: request user
+    :return: {id: 'UP' | 'DOWN' | 'NONE'}
+    """
+    states = dict.fromkeys(ids, 'NONE')
+    if user.is_anonymous or not states:
+        return states
+    rows = annotate_vote_state(model.objects.filter(id__in=states.keys()), user).filter(
+        Q(voted_up=True) | Q(voted_down=True)).values_list('id', 'voted_up')
+    for object_id, voted_up in rows:
+        states[object_id] = 'UP' if voted_up else 'DOWN'
+    return states
+
+
 def check_vote_status(instance, user):
-    if user in instance.vote.all():
-        return 'UP'
-    elif user in instance.down_vote.all():
-        return 'DOWN'
-    else:
-        return 'NONE'
+    if getattr(instance, 'voted_up', None) is not None:  # annotated by annotate_vote_state
+        return 'UP' if instance.voted_up else 'DOWN' if instance.voted_down else 'NONE'
+    return get_vote_states(type(instance), [instance.pk], user)[instance.pk]
+
+
+def bulk_update(model, instances, fields, batch_size=500):
+    """
+    save fields of instances with one CASE WHEN update per batch, QuerySet.bulk_update comes with django 2.2
+    :return: number of updated rows
+    """
+    updated = 0
+    for start in range(0, len(instances), batch_size):
+        batch = instances[start:start + batch_size]
+        updates = {}
+        for name in fields:
+            field = model._meta.get_field(name)
+            updates[field.attname] = Case(*[When(pk=instance.pk, then=Value(getattr(instance, field.attname),
+                                                                             output_field=field))
+                                            for instance in batch], output_field=field)
+        updated += model.objects.filter(pk__in=[instance.pk for instance in batch]).update(**updates)
+    return updated
 
 
 def get_client_ip(request):
@@ -0,0 +1,129 @@
+"""
+write-behind page view counter
+
+views are buffered in redis and written to total_view and the view m2m of the model by flush_views
+(manage.py flush_view_counters), so public pages do not write to the database on every hit
+"""
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+
+COUNTED_MODELS = ['company.Company', 'review.CompanyReview', 'review.Interview', 'question.Question']
+
+
+def total_key(model):
+    return '{}{}'.format(settings.VIEW_COUNTER_TOTAL, model._meta.label_lower)
+
+
+def dirty_key(model):
+    return '{}{}'.format(settings.VIEW_COUNTER_DIRTY, model._meta.label_lower)
+
+
+def viewers_key(model, object_id):
+    return '{}{}_{}'.format(settings.VIEW_COUNTER_VIEWERS, model._meta.label_lower, object_id)
+
+
+def register_view(instance, user, count=True):
+    """
+    buffer one view of instance, and its viewer if user is authenticated
+    :param count: add the view to total_view, admin pages only record the viewer
+    :return: views of instance not flushed to total_view yet, being flushed included, this one included if counted
+    """
+    model = type(instance)
+    pipe = get_redis_connection('default').pipeline()
+    if count:
+        pipe.hincrby(total_key(model), instance.id, 1)
+    else:
+        pipe.hget(total_key(model), instance.id)
+    pipe.hget(total_key(model) + settings.VIEW_COUNTER_FLUSHING, instance.id)
+    if not user.is_anonymous:
+        pipe.sadd(viewers_key(model, instance.id), user.id)
+        pipe.sadd(dirty_key(model), instance.id)
+    pending, flushing = pipe.execute()[:2]
+    return int(pending or 0) + int(flushing or 0)
+
+
+def take(connection, key):
+    """
+    move key aside for flushing, a leftover of a failed flush is taken first so it is not lost
+    """
+    flushing_key = key + settings.VIEW_COUNTER_FLUSHING
+    if not connection.exists(flushing_key):
+        try:
+            connection.rename(key, flushing_key)
+        except ResponseError:  # no such key, nothing buffered
+            return None
+    return flushing_key
+
+
+def flush_totals(connection, model):
+    flushing_key = take(connection, total_key(model))
+    if flushing_key is None:
+        return 0
+    ids_by_count = {}
+    for object_id, count in connection.hgetall(flushing_key).items():
+        ids_by_count.setdefault(int(count), []).append(int(object_id))
+    with transaction.atomic():
+        for count, ids in ids_by_count.items():  # one update per distinct increment
+            model.objects.filter(id__in=ids).update(total_view=F('total_view') + count)
+    connection.delete(flushing_key)
+    return sum(len(ids) for ids in ids_by_count.values())
+
+
+def flush_object_viewers(connection, model, object_id):
+    """
+    :return: whether the viewers of object_id were written, they are kept in redis for the next flush if not
+    """
+    # a leftover of a failed flush is taken first, then the viewers buffered since
+    viewers_flushing_key = take(connection, viewers_key(model, object_id))
+    while viewers_flushing_key is not None:
+        user_ids = [int(user_id) for user_id in connection.smembers(viewers_flushing_key)]
+        # viewers deleted since their view would fail the insert
+        user_ids = list(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        try:
+            with transaction.atomic():
+                model(id=object_id).view.add(*user_ids)  # add skips users that already viewed
+        except DatabaseError:
+            return False
+        connection.delete(viewers_flushing_key)
+        viewers_flushing_key = take(connection, viewers_key(model, object_id))
+    return True
+
+
+def flush_viewers(connection, model):
+    flushing_key = take(connection, dirty_key(model))
+    if flushing_key is None:
+        return 0
+    object_ids = [int(object_id) for object_id in connection.smembers(flushing_key)]
+    existing_ids = set(model.objects.filter(id__in=object_ids).values_list('id', flat=True))
+    failed = []
+    for object_id in object_ids:
+        if object_id not in existing_ids:
+            connection.delete(viewers_key(model, object_id), viewers_key(model, object_id) +
+                              settings.VIEW_COUNTER_FLUSHING)
+        elif not flush_object_viewers(connection, model, object_id):
+            failed.append(object_id)
+    pipe = connection.pipeline()
+    if failed:
+        # one object failing does not hold back the others, it is tried again on the next flush
+        pipe.sadd(dirty_key(model), *failed)
+    pipe.delete(flushing_key)
+    pipe.execute()
+    return len(object_ids) - len(failed)
+
+
+def flush_views(model_labels=COUNTED_MODELS):
+    """
+    write buffered views to the database
+    :return: {model label: (objects with new views, objects with new viewers)}
+    """
+    connection = get_redis_connection('default')
+    result = {}
+    for label in model_labels:
+        model = apps.get_model(label)
+        result[label] = (flush_totals(connection, model), flush_viewers(connection, model))
+    return result
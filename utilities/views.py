@@ -15,6 +15,7 @@ import pandas as pd
 from utilities import responses
 from config.models import IntegerConfig
 from company.models import Company
+from company.statics import recompute_company_statics
 from utilities.permissions import SuperUserPermission
 from utilities.utilities import CUSTOM_UPLOAD_SCHEMA, file_check_name
 from utilities.serializers import FileUploadSerializer, MergeCompanySerializer
@@ -66,10 +67,11 @@ class MergeCompanyView(generics.CreateAPIView):
                     question.company = des
                     question.save()
 
+                # moved reviews and interviews still have has_legal_issue of src
+                des.propagate_legal_issue()
                 src.is_deleted = True
                 src.save()
-                des.handle_company_review_statics()
-                des.handle_company_interview_statics()
+                recompute_company_statics([des.id])
             return responses.SuccessResponse({}, status=200).send()
         return responses.ErrorResponse(message="not valid data",
                                        status=400).send()